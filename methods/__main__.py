@@ -0,0 +1,47 @@
+"""
+Single entry point for the reports, e.g.:
+
+    python -m methods instances --profile prod --state running
+    python -m methods volumes --help
+
+Only the script of the chosen report is imported, and boto3/botocore load the models of the
+services that report calls, so small scheduled reports do not pay for the other ones.
+"""
+
+import argparse
+import importlib
+import sys
+
+# Subcommand: (module holding the report's main(argv), description)
+COMMANDS = {
+    "instances": ("scripts.list_all_instances", "EC2 instances with tags and total EBS size."),
+    "volumes": ("scripts.list_available_volumes", "Available (unattached) EBS volumes with snapshot and cost estimates."),
+    "resources": ("scripts.list_all_resources", "S3, VPC, security group, load balancer, route table and Lambda resources."),
+    "nightly": ("scripts.ec2_nightly_sweep", "Nightly EC2 reports from a single sweep of EC2."),
+    "retag-costcode": ("scripts.retag_costcode", "Retag EC2 instances whose costcode tag is longer than 6 characters."),
+    "delete-volumes": ("scripts.delete_volumes", "Snapshot and delete the volumes listed in a CSV file."),
+    "compile-prices": ("scripts.compile_price_catalog", "Compile AWS Price List offer files into the price catalog.")
+}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        prog = "python -m methods",
+        description = "Run one of the AWS reports.",
+        epilog = "\n".join(f"  {command:<16}{description}" for command, (module_name, description) in COMMANDS.items()),
+        formatter_class = argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", choices = COMMANDS, metavar = "command", help = "Report to run, see below.")
+    parser.add_argument("arguments", nargs = argparse.REMAINDER, help = "Arguments of the report, see 'python -m methods <command> --help'.")
+    args = parser.parse_args(argv)
+
+    module_name, description = COMMANDS[args.command]
+
+    # The report's own parser shows "python -m methods <command>" in its usage
+    sys.argv[0] = f"python -m methods {args.command}"
+    report = importlib.import_module(module_name)
+
+    return report.main(args.arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
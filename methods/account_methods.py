@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import copy
+from methods import aws_methods
+from methods.aws_methods import configure_role_source, configure_client_pool, get_account_label
+from methods.cache_methods import cache_settings, configure_cache
+from methods.metrics_methods import export_call_stats, merge_call_stats, clear_metrics
+from methods.pricing_methods import price_catalog_settings, configure_price_catalog
+from methods.rate_methods import RATE_LIMITS, configure_rate_limits
+from methods.ec2_methods import get_all_regions
+
+def get_process_settings():
+    """
+    :return: The module settings of this process that account processes have to start with.
+    """
+    return {
+        "cache": dict(cache_settings),
+        "role_source_profile": aws_methods.ROLE_SOURCE_PROFILE,
+        "role_session_name": aws_methods.ROLE_SESSION_NAME,
+        "max_pool_connections": aws_methods.MAX_POOL_CONNECTIONS,
+        "tcp_keepalive": aws_methods.TCP_KEEPALIVE,
+        "rate_limits": copy.deepcopy(RATE_LIMITS),
+        "price_catalog": price_catalog_settings["path"]
+    }
+
+def init_account_process(settings):
+    """
+    Apply the settings of the parent process, see get_process_settings, in a freshly started account process.
+    """
+    configure_cache(**settings["cache"])
+    configure_role_source(settings["role_source_profile"], settings["role_session_name"])
+    configure_client_pool(settings["max_pool_connections"], settings["tcp_keepalive"])
+    for family, limits in settings["rate_limits"].items():
+        configure_rate_limits(family, **limits)
+    configure_price_catalog(settings["price_catalog"])
+
+def run_account(collector, aws_profile, regions, args):
+    """
+    Collect one account inside its worker process, with its own client pool and credentials.
+
+    :param collector: Function called as collector(aws_profile, regions, *args, failures = {}) returning a list of rows.
+    :param regions: List of region names to query; None queries every region enabled in the account.
+    :return: Tuple of (rows of the account, {(account label, region): exception} for every region that failed,
+             API calls recorded in the process as returned by export_call_stats).
+    """
+    if regions is None:
+        regions = get_all_regions(aws_profile)
+
+    region_failures = {}
+    rows = collector(aws_profile, regions, *args, failures = region_failures)
+
+    account_label = get_account_label(aws_profile)
+    failures = {(account_label, region): error for region, error in region_failures.items()}
+
+    # Worker processes are reused across accounts, so every account hands over only its own calls
+    exported_calls = export_call_stats()
+    clear_metrics()
+
+    return rows, failures, exported_calls
+
+def add_account_column(account_label, rows):
+    """
+    Put the account in front of every row; (row, tags_dict) pairs keep their tags.
+
+    :return: List of rows starting with the account.
+    """
+    return [
+        ([account_label] + row[0], row[1]) if isinstance(row, tuple) else [account_label] + row
+        for row in rows
+    ]
+
+def run_accounts(collector, accounts, *args, regions = None, max_processes = None, failures = None):
+    """
+    Run a collector for several accounts at once, each account in its own worker process, and merge the rows.
+    Every process has its own client pool and rate limits, so each account uses its own API quotas and all cores.
+
+    :param collector: Module level function called as collector(aws_profile, regions, *args, failures = {}) that returns
+                      a list of rows and records failed regions in failures, e.g. methods.ec2_methods.get_instance_inventory.
+    :param accounts: List of AWS CLI profile names and/or role ARNs (see methods.aws_methods.configure_role_source).
+    :param args: Extra arguments passed through to collector.
+    :param regions: List of region names to query in every account; None queries every region enabled in each account.
+    :param max_processes: Maximum number of accounts collected at the same time; defaults to the number of cores.
+    :param failures: Optional dictionary that receives {account label: exception} for every account that failed
+                     and {(account label, region): exception} for every region that failed in an account.
+    :return: List of rows from all accounts, in the same order as accounts, each starting with the account
+             (the account ID for role ARNs, the profile name otherwise).
+    """
+    if failures is None:
+        failures = {}
+
+    merged_rows = []
+    if not accounts:
+        return merged_rows
+
+    worker_count = max(1, min(max_processes or os.cpu_count() or 1, len(accounts)))
+
+    # spawn starts clean interpreters, so no boto3 client or lock of this process is copied into the workers
+    with ProcessPoolExecutor(
+        max_workers = worker_count,
+        mp_context = multiprocessing.get_context("spawn"),
+        initializer = init_account_process,
+        initargs = (get_process_settings(),)
+    ) as executor:
+        futures = [(account, executor.submit(run_account, collector, account, regions, args)) for account in accounts]
+
+        for account, future in futures:
+            account_label = get_account_label(account)
+            try:
+                rows, region_failures, exported_calls = future.result()
+                merged_rows.extend(add_account_column(account_label, rows))
+                failures.update(region_failures)
+                # API metrics of the account's process, reported with the ones of this process
+                merge_call_stats(exported_calls)
+            except Exception as e:
+                # A failing account is reported but does not stop the other accounts
+                print(f"Error collecting data in account {account_label}: {e}")
+                failures[account_label] = e
+
+    return merged_rows
+
+def add_account_arguments(parser):
+    """
+    Add the --accounts, --role-source-profile and --max-processes switches to a script's argument parser.
+
+    :param parser: argparse.ArgumentParser of the script.
+    """
+    parser.add_argument("--accounts", nargs = "+", default = None, metavar = "PROFILE_OR_ROLE_ARN",
+                        help = "Collect these accounts in parallel and merge them into one report with an Account column.")
+    parser.add_argument("--role-source-profile", default = None,
+                        help = "Profile used to assume the role ARNs given with --accounts.")
+    parser.add_argument("--max-processes", type = int, default = None,
+                        help = "Maximum number of accounts collected at the same time (default: number of cores).")
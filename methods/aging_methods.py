@@ -0,0 +1,98 @@
+import calendar
+import re
+import time
+from datetime import datetime, timezone
+
+# Stop time in a StateTransitionReason such as "User initiated (2024-11-19 08:15:02 GMT)"
+STOP_TIME_PATTERN = re.compile(r"\((\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2}) GMT\)")
+
+# Default age buckets in days: <30, 30-59, 60-89, 90-179 and >=180 days
+AGE_THRESHOLDS = (30, 60, 90, 180)
+
+# Error of the instances whose StateTransitionReason holds no stop time
+STOP_TIME_ERROR = "No stop time in StateTransitionReason"
+
+def parse_stop_time(state_transition_reason):
+    """
+    :param state_transition_reason: StateTransitionReason of a stopped instance.
+    :return: Stop time in seconds since the epoch, or None when the reason holds no stop time.
+    """
+    match = STOP_TIME_PATTERN.search(state_transition_reason)
+    if match is None:
+        return None
+
+    return calendar.timegm(tuple(int(part) for part in match.groups()))
+
+def get_age_bucket_labels(thresholds = AGE_THRESHOLDS):
+    """
+    :param thresholds: Ascending bucket thresholds in days.
+    :return: Label of every bucket, e.g. ["<30 days", "30-59 days", ..., ">=180 days"].
+    """
+    labels = [f"<{thresholds[0]} days"]
+    labels += [f"{low}-{high - 1} days" for low, high in zip(thresholds, thresholds[1:])]
+    labels.append(f">={thresholds[-1]} days")
+
+    return labels
+
+def compute_ages(stop_times, thresholds = AGE_THRESHOLDS, current_time = None):
+    """
+    Compute the age of many resources at once and the bucket each one falls into.
+
+    :param stop_times: Sequence of stop times in seconds since the epoch; None for unknown stop times.
+    :param thresholds: Ascending bucket thresholds in days.
+    :param current_time: Time the ages are measured at, in seconds since the epoch; defaults to now.
+    :return: Tuple of numpy arrays (age in seconds, bucket index into get_age_bucket_labels); unknown
+             stop times get a NaN age and bucket -1.
+    """
+    import numpy as np
+
+    if current_time is None:
+        current_time = time.time()
+
+    ages = current_time - np.array(stop_times, dtype = float).reshape(-1)
+    buckets = np.searchsorted(np.asarray(thresholds, dtype = float) * 86400, ages, side = "right")
+    buckets[np.isnan(ages)] = -1
+
+    return ages, buckets
+
+def age_stopped_instances(records, thresholds = None, min_days = 0, current_time = None):
+    """
+    Turn stopped instance records into report rows, computing every age in one pass.
+
+    :param records: List of (row, stop time) pairs, see methods.ec2_methods.get_stopped_instance_records_from_pages.
+    :param thresholds: Ascending bucket thresholds in days, e.g. AGE_THRESHOLDS; adds the Stopped_Days and Age_Bucket columns.
+    :param min_days: Only keep instances stopped for at least this many days; instances without a stop time are always kept.
+    :param current_time: Time the ages are measured at, in seconds since the epoch; defaults to now.
+    :return: List of rows: the record row followed by Report_RunTime, Time_Since_Last_Started and Error,
+             and Stopped_Days and Age_Bucket when thresholds are given.
+    """
+    import numpy as np
+
+    if current_time is None:
+        current_time = time.time()
+
+    ages, buckets = compute_ages([stop_time for row, stop_time in records], thresholds or AGE_THRESHOLDS, current_time)
+    kept_indexes = np.flatnonzero(np.isnan(ages) | (ages >= min_days * 86400))
+
+    seconds = np.nan_to_num(ages).astype(np.int64)
+    days, remainder = np.divmod(seconds, 86400)
+    hours, remainder = np.divmod(remainder, 3600)
+    minutes = remainder // 60
+
+    bucket_labels = get_age_bucket_labels(thresholds) if thresholds else []
+    report_runtime = datetime.fromtimestamp(current_time, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+    aged_rows = []
+    for index in kept_indexes.tolist():
+        row, stop_time = records[index]
+        if stop_time is None:
+            aged_row = row + [report_runtime, "", STOP_TIME_ERROR]
+            if thresholds:
+                aged_row += ["", ""]
+        else:
+            aged_row = row + [report_runtime, f"{days[index]} days, {hours[index]} hours, {minutes[index]} minutes", ""]
+            if thresholds:
+                aged_row += [int(days[index]), bucket_labels[buckets[index]]]
+        aged_rows.append(aged_row)
+
+    return aged_rows
@@ -0,0 +1,79 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from methods.file_methods import write_to_csv
+
+# Upper bound on the number of (service, region) units talking to AWS at the same time
+MAX_CONCURRENT_UNITS = 16
+
+async def run_unit(executor, semaphore, unit_name, worker, *args):
+    """
+    Run one blocking collector unit on the executor once a slot under the global limit is free.
+
+    :param executor: Executor the blocking boto3 calls run on.
+    :param semaphore: asyncio.Semaphore holding the global concurrency limit.
+    :param unit_name: Name used when reporting a failure, e.g. "vpcs/us-east-1".
+    :param worker: Blocking function returning a list of rows.
+    :param args: Arguments passed to worker.
+    :return: List of rows; empty when the unit failed.
+    """
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, worker, *args)
+        except Exception as e:
+            # A failing unit is reported but does not stop the other units
+            print(f"Error collecting {unit_name}: {e}")
+            return []
+
+async def run_report(executor, semaphore, report, aws_profile, regions):
+    """
+    Collect every unit of one report and write its CSV file as soon as the last unit finished.
+
+    :param report: Dictionary with "name", "header", "output_file" and either "region_worker"
+                   (called as region_worker(aws_profile, region)) or "account_worker" (called as account_worker(aws_profile)).
+    :return: Number of rows written.
+    """
+    if "region_worker" in report:
+        units = [
+            run_unit(executor, semaphore, f"{report['name']}/{region}", report["region_worker"], aws_profile, region)
+            for region in regions
+        ]
+    else:
+        units = [run_unit(executor, semaphore, report["name"], report["account_worker"], aws_profile)]
+
+    # gather keeps the unit order, so rows stay in region order
+    rows = [row for unit_rows in await asyncio.gather(*units) for row in unit_rows]
+
+    if rows:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, write_to_csv, report["output_file"], report["header"], rows)
+        print(f"CSV file '{report['output_file']}' created successfully.")
+
+    return len(rows)
+
+async def run_reports_async(reports, aws_profile, regions, max_concurrency = MAX_CONCURRENT_UNITS):
+    """
+    Schedule every (report, region) unit of every report at once behind a global concurrency limit.
+
+    :param reports: List of report dictionaries, see run_report.
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param max_concurrency: Maximum number of units running at the same time.
+    :return: Dictionary of {report name: number of rows written}.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    with ThreadPoolExecutor(max_workers = max_concurrency) as executor:
+        row_counts = await asyncio.gather(*[
+            run_report(executor, semaphore, report, aws_profile, regions) for report in reports
+        ])
+
+    return {report["name"]: row_count for report, row_count in zip(reports, row_counts)}
+
+def run_reports(reports, aws_profile, regions, max_concurrency = MAX_CONCURRENT_UNITS):
+    """
+    Blocking entry point for run_reports_async, for use from a script's main().
+
+    :return: Dictionary of {report name: number of rows written}.
+    """
+    return asyncio.run(run_reports_async(reports, aws_profile, regions, max_concurrency))
@@ -1,16 +1,350 @@
-import boto3
-import boto3.session
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from methods.cache_methods import cache_enabled, read_cached_pages, cache_live_pages
+from methods.rate_methods import RETRY_CONFIG, attach_rate_limiter
+from methods.metrics_methods import attach_metrics
+
+# Upper bound on the number of regions scanned at the same time
+MAX_REGION_WORKERS = 8
+
+# Streaming regions hand their rows over in chunks of this many rows, holding at most this many chunks ahead of the consumer
+REGION_CHUNK_ROWS = 500
+REGION_QUEUE_CHUNKS = 8
+
+# Connection settings applied to every pooled client
+MAX_POOL_CONNECTIONS = 50
+TCP_KEEPALIVE = True
+
+# Profile used to assume the roles given as role ARNs instead of profile names; None uses the default credential chain
+ROLE_SOURCE_PROFILE = None
+ROLE_SESSION_NAME = "aws-inventory"
+
+# One session per profile and one client per (profile, region, service), shared by all methods and scripts
+session_pool = {}
+client_pool = {}
+pool_lock = threading.Lock()
+
+# botocore model loader shared by every session, so a service model is read and parsed once per process
+# however many profiles, role sessions and clients use it. boto3/botocore are imported on first use only.
+model_loader = None
+
+def configure_client_pool(max_pool_connections = None, tcp_keepalive = None):
+    """
+    Change the connection settings used for pooled clients. Clients already in the pool are dropped
+    so the next get_credentials call picks up the new settings.
+
+    :param max_pool_connections: Maximum number of HTTP connections kept open per client.
+    :param tcp_keepalive: Enable TCP keep-alive on the client connections.
+    """
+    global MAX_POOL_CONNECTIONS, TCP_KEEPALIVE
+
+    with pool_lock:
+        if max_pool_connections is not None:
+            MAX_POOL_CONNECTIONS = max_pool_connections
+        if tcp_keepalive is not None:
+            TCP_KEEPALIVE = tcp_keepalive
+        client_pool.clear()
+
+def clear_client_pool():
+    """
+    Drop every pooled session and client, e.g. after the credentials of a profile changed.
+    Loaded service models are kept.
+    """
+    with pool_lock:
+        client_pool.clear()
+        session_pool.clear()
+
+def configure_role_source(source_profile = None, session_name = None):
+    """
+    Set the profile whose credentials assume the roles passed as role ARNs.
+
+    :param source_profile: AWS CLI profile name; None uses the default credential chain.
+    :param session_name: RoleSessionName shown in CloudTrail for the assumed roles.
+    """
+    global ROLE_SOURCE_PROFILE, ROLE_SESSION_NAME
+
+    ROLE_SOURCE_PROFILE = source_profile
+    if session_name is not None:
+        ROLE_SESSION_NAME = session_name
+
+def is_role_arn(aws_profile):
+    return bool(aws_profile) and aws_profile.startswith("arn:") and ":role/" in aws_profile
+
+def get_account_label(aws_profile):
+    """
+    :param aws_profile: AWS CLI profile name or role ARN.
+    :return: Account ID for a role ARN, the profile name otherwise.
+    """
+    if is_role_arn(aws_profile):
+        return aws_profile.split(":")[4]
+    return aws_profile
+
+def get_assume_role_session(role_arn):
+    """
+    Create a session for a role. The role is assumed through botocore's credential chain on the first
+    request, not here, and the STS credentials are refreshed automatically shortly before they expire,
+    so long scans never run on expired credentials.
+
+    :param role_arn: ARN of the role to assume.
+    :return: boto3 session object.
+    """
+    from botocore.credentials import AssumeRoleCredentialFetcher, CredentialProvider, DeferredRefreshableCredentials
+
+    source_session = get_session(ROLE_SOURCE_PROFILE)
+
+    def create_sts_client(service, **kwargs):
+        # The source session is pooled and boto3 sessions are not thread safe, see get_credentials
+        with pool_lock:
+            return source_session.client(service, **kwargs)
+
+    fetcher = AssumeRoleCredentialFetcher(
+        client_creator = create_sts_client,
+        source_credentials = source_session.get_credentials(),
+        role_arn = role_arn,
+        extra_args = {"RoleSessionName": ROLE_SESSION_NAME}
+    )
+
+    class RoleArnProvider(CredentialProvider):
+        METHOD = "assume-role"
+
+        def load(self):
+            return DeferredRefreshableCredentials(refresh_using = fetcher.fetch_credentials, method = self.METHOD)
+
+    return create_boto3_session(credential_provider = RoleArnProvider())
+
+def get_model_loader():
+    """
+    :return: botocore Loader shared by every session of the process, created on first use.
+    """
+    global model_loader
+
+    if model_loader is None:
+        from botocore.loaders import create_loader
+        model_loader = create_loader(os.environ.get("AWS_DATA_PATH"))
+
+    return model_loader
+
+def create_boto3_session(aws_profile = None, credential_provider = None):
+    """
+    Create a boto3 session that loads its service models through the shared model loader.
+
+    :param aws_profile: The AWS CLI profile name to use; None uses the default credential chain.
+    :param credential_provider: Optional botocore CredentialProvider tried before the rest of the credential chain.
+    :return: boto3 session object.
+    """
+    import boto3.session
+    import botocore.session
+
+    core_session = botocore.session.Session(profile = aws_profile or None)
+    loader = get_model_loader()
+    core_session.register_component("data_loader", loader)
+    if credential_provider is not None:
+        core_session.get_component("credential_provider").insert_before("env", credential_provider)
+
+    aws_con = boto3.session.Session(botocore_session = core_session)
+
+    # Every boto3 session appends its resource model directory to the loader's search paths
+    loader.search_paths[:] = list(dict.fromkeys(loader.search_paths))
+
+    return aws_con
+
+def get_session(aws_profile):
+    """
+    Get the pooled boto3 session for a profile, creating it on first use.
+
+    :param aws_profile: The AWS CLI profile name to use, or the ARN of a role to assume (see configure_role_source).
+    :return: boto3 session object shared by every client of that profile.
+    """
+    aws_con = session_pool.get(aws_profile)
+    if aws_con is not None:
+        return aws_con
+
+    # Role sessions resolve their source credentials, so they are built outside the lock
+    # and other threads keep getting their clients meanwhile
+    role_session = get_assume_role_session(aws_profile) if is_role_arn(aws_profile) else None
+
+    with pool_lock:
+        # Another thread may have created the session while we were building ours
+        aws_con = session_pool.get(aws_profile)
+        if aws_con is None:
+            aws_con = role_session or create_boto3_session(aws_profile)
+            session_pool[aws_profile] = aws_con
+
+    return aws_con
 
 def get_credentials(aws_profile, region = "us-east-1", service = "ec2"):
     """
-    Get the AWS credentials for local runs
+    Get a pooled client for local runs. The credential chain, the service model and the connection pool
+    are loaded once per (profile, region, service) and the same client is returned on later calls.
     
     :param profile_name: The AWS CLI profile name to use.
     :param region: region to use.
     :param service: client service to connect to.
-    :return: List of region names (e.g., ['us-east-1', 'us-west-2']).
+    :return: boto3 client for the service in the region.
     """
-    aws_con = boto3.session.Session(profile_name = aws_profile, region_name = region)
-    service_client = aws_con.client(service)
+    key = (aws_profile, region, service)
+
+    service_client = client_pool.get(key)
+    if service_client is not None:
+        return service_client
+
+    aws_con = get_session(aws_profile)
+
+    with pool_lock:
+        # Another thread may have created the client while we waited for the lock
+        service_client = client_pool.get(key)
+        if service_client is None:
+            from botocore.config import Config
+
+            client_config = Config(
+                max_pool_connections = MAX_POOL_CONNECTIONS,
+                tcp_keepalive = TCP_KEEPALIVE,
+                retries = RETRY_CONFIG
+            )
+            # boto3 sessions are not thread safe, so clients are only created while holding the lock
+            service_client = aws_con.client(service, region_name = region, config = client_config)
+            # Every request waits for the shared (account, region, API family) token bucket
+            attach_rate_limiter(service_client, aws_profile, region, service)
+            # Count, latency, retries and bytes of every call, see methods.metrics_methods.print_metrics_summary
+            attach_metrics(service_client, region, service)
+            client_pool[key] = service_client
 
     return service_client
+
+def paginate(aws_profile, region, operation, service = "ec2", **request_params):
+    """
+    Yield the response pages of a paginated operation, served from the inventory cache when it is
+    enabled and holds a fresh enough copy (see methods.cache_methods.configure_cache).
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: region to use.
+    :param operation: Paginated operation name, e.g. "describe_instances".
+    :param service: client service to connect to.
+    :param request_params: Parameters passed to the operation, e.g. Filters.
+    :return: Generator of response pages.
+    """
+    if cache_enabled():
+        cached_pages = read_cached_pages(aws_profile, region, service, operation, request_params)
+        if cached_pages is not None:
+            yield from cached_pages
+            return
+
+    service_client = get_credentials(aws_profile, region, service)
+    live_pages = service_client.get_paginator(operation).paginate(**request_params)
+
+    if cache_enabled():
+        live_pages = cache_live_pages(aws_profile, region, service, operation, request_params, live_pages)
+
+    yield from live_pages
+
+def fan_out_regions(region_worker, aws_profile, regions, *args, max_workers = MAX_REGION_WORKERS, failures = None):
+    """
+    Run a per-region collector for every region in parallel and merge the results.
+
+    :param region_worker: Function called as region_worker(aws_profile, region, *args) that returns a list of rows.
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param args: Extra arguments passed through to region_worker.
+    :param max_workers: Maximum number of regions queried at the same time.
+    :param failures: Optional dictionary that receives {region: exception} for every region that failed.
+    :return: List of rows from all regions, merged in the same order as regions.
+    """
+    if failures is None:
+        failures = {}
+
+    merged_rows = []
+    if not regions:
+        return merged_rows
+
+    worker_count = max(1, min(max_workers, len(regions)))
+
+    with ThreadPoolExecutor(max_workers = worker_count) as executor:
+        futures = [(region, executor.submit(region_worker, aws_profile, region, *args)) for region in regions]
+
+        # Collect in region order so the output is the same on every run
+        for region, future in futures:
+            try:
+                merged_rows.extend(future.result())
+            except Exception as e:
+                # A failing region is reported but does not stop the other regions
+                print(f"Error collecting data in region {region}: {e}")
+                failures[region] = e
+
+    return merged_rows
+
+
+def iter_regions(region_iter, aws_profile, regions, *args, max_workers = MAX_REGION_WORKERS, failures = None):
+    """
+    Yield the rows of a per-region generator for every region. Regions are collected in parallel like
+    fan_out_regions, but each region only runs a few chunks of rows ahead of the consumer, so memory
+    stays flat however many rows a region has.
+
+    :param region_iter: Generator function called as region_iter(aws_profile, region, *args).
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param args: Extra arguments passed through to region_iter.
+    :param max_workers: Maximum number of regions queried at the same time.
+    :param failures: Optional dictionary that receives {region: exception} for every region that failed.
+    :return: Generator of rows from all regions, in the same order as regions. Unlike fan_out_regions, a region
+             that fails after some of its rows were yielded is recorded in failures with those rows already
+             handed out; consumers that must leave failed regions out check failures once the generator is
+             exhausted, e.g. methods.file_methods.stream_tagged_rows_to_csv and methods.delta_methods.diff_tagged_rows.
+    """
+    if failures is None:
+        failures = {}
+
+    if not regions:
+        return
+
+    stop = threading.Event()
+    region_queues = [queue.Queue(maxsize = REGION_QUEUE_CHUNKS) for region in regions]
+
+    def put(region_queue, item):
+        # Give up once the consumer stopped reading, instead of blocking the worker forever
+        while not stop.is_set():
+            try:
+                region_queue.put(item, timeout = 0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(region, region_queue):
+        try:
+            chunk = []
+            for row in region_iter(aws_profile, region, *args):
+                chunk.append(row)
+                if len(chunk) >= REGION_CHUNK_ROWS:
+                    if not put(region_queue, ("rows", chunk)):
+                        return
+                    chunk = []
+            put(region_queue, ("rows", chunk))
+            put(region_queue, ("done", None))
+        except Exception as e:
+            put(region_queue, ("error", e))
+
+    worker_count = max(1, min(max_workers, len(regions)))
+    executor = ThreadPoolExecutor(max_workers = worker_count)
+
+    try:
+        for region, region_queue in zip(regions, region_queues):
+            executor.submit(produce, region, region_queue)
+
+        # Regions are read in order; the ones further down the list fill their queue in the meantime
+        for region, region_queue in zip(regions, region_queues):
+            while True:
+                kind, value = region_queue.get()
+                if kind == "rows":
+                    yield from value
+                elif kind == "error":
+                    # A failing region is reported but does not stop the other regions
+                    print(f"Error collecting data in region {region}: {value}")
+                    failures[region] = value
+                    break
+                else:
+                    break
+    finally:
+        stop.set()
+        executor.shutdown(wait = True, cancel_futures = True)
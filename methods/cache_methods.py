@@ -0,0 +1,228 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Default location of the inventory cache, can be overridden with AWS_INVENTORY_CACHE_DIR
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aws_inventory")
+
+# The cache is off until configure_cache is called with a max_age
+cache_settings = {
+    "directory": os.environ.get("AWS_INVENTORY_CACHE_DIR", DEFAULT_CACHE_DIR),
+    "max_age": None,
+    "refresh": False
+}
+
+# sqlite connections cannot be shared between threads, so each region worker gets its own
+connection_store = threading.local()
+
+def configure_cache(directory = None, max_age = None, refresh = False):
+    """
+    Turn the on-disk inventory cache on or off for every collector in methods/.
+
+    :param directory: Directory holding the cache database; defaults to AWS_INVENTORY_CACHE_DIR or ~/.cache/aws_inventory.
+    :param max_age: Maximum age in seconds of cached pages that may be reused; None turns the cache off.
+    :param refresh: Ignore cached pages and fetch everything again, storing the fresh pages.
+    """
+    if directory is not None:
+        cache_settings["directory"] = directory
+    cache_settings["max_age"] = max_age
+    cache_settings["refresh"] = refresh
+
+def cache_enabled():
+    """
+    :return: True when collectors should read and write the inventory cache.
+    """
+    return cache_settings["max_age"] is not None
+
+def parse_max_age(value):
+    """
+    Parse a max age such as "90", "90s", "15m", "6h" or "2d" into seconds.
+
+    :param value: Max age string; a plain number is read as seconds.
+    :return: Max age in seconds.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", str(value))
+    if not match:
+        raise ValueError(f"Invalid max age '{value}', expected e.g. 90, 15m, 6h or 2d")
+
+    multiplier = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+
+    return float(match.group(1)) * multiplier
+
+def add_cache_arguments(parser):
+    """
+    Add the --max-age, --refresh and --cache-dir switches to a script's argument parser.
+
+    :param parser: argparse.ArgumentParser of the script.
+    """
+    parser.add_argument("--max-age", type = parse_max_age, default = None,
+                        help = "Reuse cached AWS responses younger than this (e.g. 15m, 6h). Off by default.")
+    parser.add_argument("--refresh", action = "store_true",
+                        help = "Fetch everything again and refresh the cache.")
+    parser.add_argument("--cache-dir", default = None,
+                        help = "Directory of the inventory cache database.")
+
+def apply_cache_arguments(args):
+    """
+    Configure the cache from arguments added by add_cache_arguments.
+
+    :param args: Parsed argparse namespace.
+    """
+    max_age = args.max_age
+    if args.refresh and max_age is None:
+        # A forced refresh still has to write the cache so the next run can use it
+        max_age = 0
+
+    configure_cache(directory = args.cache_dir, max_age = max_age, refresh = args.refresh)
+
+def get_cache_connection():
+    """
+    Get this thread's connection to the cache database, creating the schema on first use.
+
+    :return: sqlite3 connection.
+    """
+    cache_path = os.path.join(cache_settings["directory"], "inventory_cache.sqlite")
+
+    connection = getattr(connection_store, "connection", None)
+    if connection is not None and connection_store.path == cache_path:
+        return connection
+
+    os.makedirs(cache_settings["directory"], exist_ok = True)
+
+    connection = sqlite3.connect(cache_path, timeout = 30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            profile TEXT, region TEXT, service TEXT, operation TEXT, filter_key TEXT,
+            fetched_at REAL, page_count INTEGER,
+            PRIMARY KEY (profile, region, service, operation, filter_key)
+        )""")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            profile TEXT, region TEXT, service TEXT, operation TEXT, filter_key TEXT,
+            page_number INTEGER, body TEXT,
+            PRIMARY KEY (profile, region, service, operation, filter_key, page_number)
+        )""")
+    connection.commit()
+
+    connection_store.connection = connection
+    connection_store.path = cache_path
+
+    return connection
+
+def encode_value(value):
+    # Response pages hold datetime objects that json cannot store on its own
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+def decode_object(value):
+    if "__datetime__" in value and len(value) == 1:
+        return datetime.fromisoformat(value["__datetime__"])
+    return value
+
+def make_filter_key(request_params):
+    """
+    :param request_params: Parameters passed to the paginated operation.
+    :return: Stable text key for the parameters.
+    """
+    return json.dumps(request_params, sort_keys = True, default = encode_value)
+
+def read_cached_pages(aws_profile, region, service, operation, request_params):
+    """
+    Read the cached pages of an operation if they are younger than the configured max age.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name of the request.
+    :param service: Client service, e.g. "ec2".
+    :param operation: Paginated operation name, e.g. "describe_instances".
+    :param request_params: Parameters passed to the operation.
+    :return: Generator of response pages, or None when the cache has no usable entry.
+    """
+    if cache_settings["refresh"]:
+        return None
+
+    key = (aws_profile or "", region, service, operation, make_filter_key(request_params))
+    connection = get_cache_connection()
+
+    entry = connection.execute(
+        "SELECT fetched_at, page_count FROM responses WHERE profile=? AND region=? AND service=? AND operation=? AND filter_key=?",
+        key
+    ).fetchone()
+
+    if entry is None or time.time() - entry[0] > cache_settings["max_age"]:
+        return None
+
+    (stored_pages,) = connection.execute(
+        "SELECT COUNT(*) FROM pages WHERE profile=? AND region=? AND service=? AND operation=? AND filter_key=?",
+        key
+    ).fetchone()
+
+    if stored_pages != entry[1]:
+        return None
+
+    bodies = connection.execute(
+        "SELECT body FROM pages WHERE profile=? AND region=? AND service=? AND operation=? AND filter_key=? ORDER BY page_number",
+        key
+    )
+
+    # Pages are decoded one at a time so large entries are not loaded into memory at once
+    return (json.loads(body, object_hook = decode_object) for (body,) in bodies)
+
+def cache_live_pages(aws_profile, region, service, operation, request_params, live_pages):
+    """
+    Pass freshly fetched pages through while writing them to the cache, one page at a time.
+    The entry only becomes visible to readers once the last page has been stored.
+
+    :param live_pages: Iterable of response pages from the paginator.
+    :return: Generator of the same pages.
+    """
+    key = (aws_profile or "", region, service, operation, make_filter_key(request_params))
+    connection = get_cache_connection()
+
+    with connection:
+        connection.execute(
+            "DELETE FROM responses WHERE profile=? AND region=? AND service=? AND operation=? AND filter_key=?",
+            key
+        )
+        connection.execute(
+            "DELETE FROM pages WHERE profile=? AND region=? AND service=? AND operation=? AND filter_key=?",
+            key
+        )
+
+    page_count = 0
+    for page in live_pages:
+        page.pop("ResponseMetadata", None)
+        with connection:
+            connection.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                key + (page_count, json.dumps(page, default = encode_value))
+            )
+        page_count += 1
+        yield page
+
+    with connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            key + (time.time(), page_count)
+        )
+
+def clear_cache(aws_profile = None):
+    """
+    Remove cached responses, for one profile or for all of them.
+
+    :param aws_profile: Profile whose entries are removed; None removes everything.
+    """
+    connection = get_cache_connection()
+
+    with connection:
+        if aws_profile is None:
+            connection.execute("DELETE FROM pages")
+            connection.execute("DELETE FROM responses")
+        else:
+            connection.execute("DELETE FROM pages WHERE profile=?", (aws_profile,))
+            connection.execute("DELETE FROM responses WHERE profile=?", (aws_profile,))
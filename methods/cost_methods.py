@@ -0,0 +1,165 @@
+from methods.pricing_methods import get_price_catalog, CatalogPriceTable
+
+# Storage prices in USD per GB-month, by (region, volume type). "*" holds the price used for
+# regions without their own entry (us-east-1 list prices). When a price catalog was compiled
+# (see methods.pricing_methods) its regional prices take precedence over these.
+VOLUME_PRICES = {
+    ("*", "gp2"): 0.10,
+    ("*", "gp3"): 0.08,
+    ("*", "io1"): 0.125,
+    ("*", "io2"): 0.125,
+    ("*", "st1"): 0.045,
+    ("*", "sc1"): 0.015,
+    ("*", "standard"): 0.05
+}
+
+# Snapshot storage prices in USD per GB-month, by (region, storage tier), with the same "*" fallback
+SNAPSHOT_PRICES = {
+    ("*", "standard"): 0.05,
+    ("*", "archive"): 0.0125
+}
+
+# Price of volume types missing from the price table
+DEFAULT_VOLUME_PRICE = 0.08
+
+def get_volume_price_table():
+    """
+    :return: Volume price table of the compiled price catalog with VOLUME_PRICES as fallback, or VOLUME_PRICES without a catalog.
+    """
+    catalog = get_price_catalog()
+    if catalog is None:
+        return VOLUME_PRICES
+
+    return CatalogPriceTable(catalog, "volume", VOLUME_PRICES)
+
+def get_snapshot_price_table():
+    """
+    :return: Snapshot price table of the compiled price catalog with SNAPSHOT_PRICES as fallback, or SNAPSHOT_PRICES without a catalog.
+    """
+    catalog = get_price_catalog()
+    if catalog is None:
+        return SNAPSHOT_PRICES
+
+    return CatalogPriceTable(catalog, "snapshot", SNAPSHOT_PRICES)
+
+def get_price(price_table, region, key, default_price):
+    """
+    :return: Price of one (region, key) pair, with the same "*" fallback as lookup_prices.
+    """
+    return price_table.get((region, key), price_table.get(("*", key), default_price))
+
+def lookup_prices(price_table, regions, keys, default_price):
+    """
+    Look up the price of every (region, key) pair of two columns.
+    The table is only consulted once per distinct pair, the rows are filled by indexing.
+
+    :param price_table: Dictionary of {(region, key): price}; ("*", key) applies to every region.
+    :param regions: Sequence of region names, one per row.
+    :param keys: Sequence of price keys such as volume types, one per row.
+    :param default_price: Price of the pairs missing from the table.
+    :return: numpy array of prices, one per row.
+    """
+    import numpy as np
+
+    region_names, region_index = np.unique(np.asarray(regions, dtype = str), return_inverse = True)
+    key_names, key_index = np.unique(np.asarray(keys, dtype = str), return_inverse = True)
+
+    price_matrix = np.array([
+        [get_price(price_table, region, key, default_price) for key in key_names]
+        for region in region_names
+    ], dtype = float).reshape(len(region_names), len(key_names))
+
+    return price_matrix[region_index, key_index]
+
+def estimate_volume_costs(sizes, volume_types, regions, has_snapshots, price_table = None, snapshot_price_table = None,
+                          default_price = DEFAULT_VOLUME_PRICE, utilization_percentage = .5, change_rate_per_day = 0.03, days = 30):
+    """
+    Estimate the monthly volume, snapshot and incremental snapshot cost of many volumes at once.
+    Same estimates as calculate_storage_costs and estimate_snapshot_cost, with the prices of each
+    volume's region and type.
+
+    :param sizes: Sequence of volume sizes in GB.
+    :param volume_types: Sequence of volume types, e.g. "gp3".
+    :param regions: Sequence of region names.
+    :param has_snapshots: Sequence of booleans, True for the volumes that have snapshots; the others get no snapshot costs.
+    :param price_table: Volume prices, see VOLUME_PRICES; defaults to get_volume_price_table().
+    :param snapshot_price_table: Snapshot prices, see SNAPSHOT_PRICES; defaults to get_snapshot_price_table(). The standard tier is used.
+    :param default_price: Price of the volume types missing from price_table.
+    :param utilization_percentage: Fraction of each volume that is actively used.
+    :param change_rate_per_day: Fraction of the used data that changes per day.
+    :param days: Number of days of incremental snapshots.
+    :return: Dictionary of numpy arrays rounded to cents: "volume_cost", "snapshot_cost" (first, full
+             snapshot) and "incremental_cost" (changed data over the given days).
+    """
+    import numpy as np
+
+    if price_table is None:
+        price_table = get_volume_price_table()
+    if snapshot_price_table is None:
+        snapshot_price_table = get_snapshot_price_table()
+
+    sizes = np.asarray(sizes, dtype = float)
+    has_snapshots = np.asarray(has_snapshots, dtype = bool)
+
+    volume_prices = lookup_prices(price_table, regions, volume_types, default_price)
+    snapshot_prices = lookup_prices(snapshot_price_table, regions, np.full(len(sizes), "standard"), SNAPSHOT_PRICES[("*", "standard")])
+
+    used_data = sizes * utilization_percentage * has_snapshots
+    changed_data = used_data * change_rate_per_day * days
+
+    return {
+        "volume_cost": np.round(sizes * volume_prices, 2),
+        "snapshot_cost": np.round(used_data * snapshot_prices, 2),
+        "incremental_cost": np.round(changed_data * snapshot_prices, 2)
+    }
+
+def rollup_costs(keys, cost_columns):
+    """
+    Total cost columns per key, e.g. per region or per tag value.
+
+    :param keys: Sequence of group keys, one per row.
+    :param cost_columns: Dictionary of {column name: sequence of costs, one per row}.
+    :return: Dictionary of {key: {"Count": number of rows, column name: total}}, sorted by key.
+    """
+    import numpy as np
+
+    key_names, key_index = np.unique(np.asarray(keys, dtype = str), return_inverse = True)
+
+    totals = {"Count": np.bincount(key_index, minlength = len(key_names))}
+    for name, costs in cost_columns.items():
+        totals[name] = np.round(np.bincount(key_index, weights = np.asarray(costs, dtype = float), minlength = len(key_names)), 2)
+
+    return {
+        key: {name: column[index].item() for name, column in totals.items()}
+        for index, key in enumerate(key_names.tolist())
+    }
+
+def get_cost_rollup_rows(tagged_rows, header, group_by, cost_names):
+    """
+    Rows of a cost rollup report built from the rows of a report.
+
+    :param tagged_rows: List of (row, tags_dict) pairs.
+    :param header: Column names of the rows.
+    :param group_by: "region", or "tag:<key>" to group by the value of a tag.
+    :param cost_names: Names of the cost columns to total, e.g. ["Estimate_Volume_Cost"]; empty values count as 0.
+    :return: Tuple of (header, rows) of the rollup, one row per group.
+    """
+    if group_by.startswith("tag:"):
+        tag_key = group_by[len("tag:"):]
+        keys = [tags_dict.get(tag_key, "") for row, tags_dict in tagged_rows]
+        key_column = tag_key
+    else:
+        keys = [row[0] for row, tags_dict in tagged_rows]
+        key_column = "Region"
+
+    cost_columns = {}
+    for name in cost_names:
+        column = header.index(name)
+        cost_columns[name] = [row[column] or 0 for row, tags_dict in tagged_rows]
+
+    totals = rollup_costs(keys, cost_columns)
+
+    rollup_header = [key_column, "Count"] + list(cost_names)
+    rollup_rows = [[key] + [key_totals[name] for name in rollup_header[1:]] for key, key_totals in totals.items()]
+
+    return rollup_header, rollup_rows
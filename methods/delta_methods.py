@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+from methods.cache_methods import cache_settings
+from methods.file_methods import get_region_key, is_failed_region
+from methods.filter_methods import normalize_filter_spec
+
+# Columns put in front of the report columns in delta mode
+DELTA_COLUMNS = ["Change", "Changed_Columns"]
+
+def get_state_connection(state_path = None):
+    """
+    Open the database holding the inventory of the previous runs, creating the schema on first use.
+
+    :param state_path: Path of the state database; defaults to inventory_state.sqlite in the cache directory.
+    :return: sqlite3 connection.
+    """
+    if state_path is None:
+        state_path = os.path.join(cache_settings["directory"], "inventory_state.sqlite")
+
+    state_directory = os.path.dirname(state_path)
+    if state_directory:
+        os.makedirs(state_directory, exist_ok = True)
+
+    connection = sqlite3.connect(state_path, timeout = 30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_state (
+            report TEXT, resource_id TEXT, region TEXT, row_hash TEXT, record TEXT,
+            PRIMARY KEY (report, resource_id)
+        )""")
+    connection.commit()
+
+    return connection
+
+def encode_record(row, tags_dict):
+    """
+    :return: Stable JSON text of a row and its tags; datetimes and other values are stored as text.
+    """
+    return json.dumps({"row": list(row), "tags": tags_dict}, sort_keys = True, default = str)
+
+def get_changed_columns(header, old_record, new_record):
+    """
+    Describe the differences between the stored and the current version of a resource.
+
+    :param header: Column names of the rows.
+    :param old_record: Decoded record of the previous run.
+    :param new_record: Decoded record of this run.
+    :return: Text such as "Instance_State: running -> stopped; tag:owner: alice -> bob".
+    """
+    changes = []
+
+    for column, old_value, new_value in zip(header, old_record["row"], new_record["row"]):
+        if old_value != new_value:
+            changes.append(f"{column}: {old_value} -> {new_value}")
+
+    old_tags, new_tags = old_record["tags"], new_record["tags"]
+    for key in sorted(set(old_tags) | set(new_tags)):
+        if old_tags.get(key) != new_tags.get(key):
+            changes.append(f"tag:{key}: {old_tags.get(key, '')} -> {new_tags.get(key, '')}")
+
+    return "; ".join(changes)
+
+def get_delta_report_name(report_type, scope, filter_spec = None, regions = None):
+    """
+    Name the inventory a delta run is compared with. Runs with other filters or regions see a different
+    part of the account, so they keep their own state instead of reporting everything outside it as removed.
+
+    :param report_type: Kind of report, e.g. "instances".
+    :param scope: Profile or accounts of the run.
+    :param filter_spec: Filter spec of the run, see methods.filter_methods.build_filter_spec.
+    :param regions: Regions of the run; None when they are looked up per account.
+    :return: Report name such as "instances:prod" or "instances:prod:3f2a9c01b7de".
+    """
+    filter_text = normalize_filter_spec(filter_spec)
+    region_text = ",".join(sorted(regions)) if regions is not None else ""
+
+    if not filter_text and not region_text:
+        return f"{report_type}:{scope}"
+
+    digest = hashlib.sha1(f"{filter_text}|{region_text}".encode("utf-8")).hexdigest()[:12]
+
+    return f"{report_type}:{scope}:{digest}"
+
+def diff_tagged_rows(report, header, tagged_rows, id_column = 1, region_column = 0, state_path = None, failures = None):
+    """
+    Compare tagged rows with the inventory of the previous run and yield only the resources that
+    were added, changed or removed. The stored inventory is updated once every row has been read,
+    and only for the resources that changed, so a run that fails halfway leaves it untouched.
+    A streamed region can fail after some of its rows were yielded (see methods.aws_methods.iter_regions);
+    the state of a failed region is left as it was, and writing the delta with stream_tagged_rows_to_csv
+    and the same failures drops the rows yielded for it.
+
+    :param report: Name of the inventory, e.g. "instances:<profile>"; every report keeps its own state.
+    :param header: Column names of the rows, used to name the changed columns.
+    :param tagged_rows: Iterable of (row, tags_dict) pairs, e.g. a collector generator.
+    :param id_column: Index of the resource ID in each row.
+    :param region_column: Index of the region in each row, or a tuple of indexes such as (account, region).
+    :param state_path: Path of the state database, see get_state_connection.
+    :param failures: Dictionary of failures filled by the collector, keyed like region_column, e.g. {region: exception}
+                     or {(account, region): exception}; resources of failed regions are not reported as removed.
+    :return: Generator of (row, tags_dict) pairs whose rows start with the DELTA_COLUMNS.
+    """
+    connection = get_state_connection(state_path)
+
+    # Only the hashes are loaded up front, full records are read for the resources that changed
+    previous_hashes = dict(connection.execute(
+        "SELECT resource_id, row_hash FROM inventory_state WHERE report=?", (report,)
+    ))
+
+    seen_ids = set()
+    upserts = []
+
+    for row, tags_dict in tagged_rows:
+        resource_id = str(row[id_column])
+        seen_ids.add(resource_id)
+
+        record = encode_record(row, tags_dict)
+        row_hash = hashlib.sha1(record.encode("utf-8")).hexdigest()
+        previous_hash = previous_hashes.get(resource_id)
+
+        if previous_hash == row_hash:
+            continue
+
+        if previous_hash is None:
+            yield ["added", ""] + row, tags_dict
+        else:
+            (old_record,) = connection.execute(
+                "SELECT record FROM inventory_state WHERE report=? AND resource_id=?", (report, resource_id)
+            ).fetchone()
+            yield ["changed", get_changed_columns(header, json.loads(old_record), json.loads(record))] + row, tags_dict
+
+        region_key = get_region_key(row, region_column)
+        upserts.append((region_key, (report, resource_id, "/".join(region_key) if isinstance(region_key, tuple) else str(region_key), row_hash, record)))
+
+    removed_ids = []
+
+    for resource_id in previous_hashes.keys() - seen_ids:
+        (old_record,) = connection.execute(
+            "SELECT record FROM inventory_state WHERE report=? AND resource_id=?", (report, resource_id)
+        ).fetchone()
+        old_record = json.loads(old_record)
+        if is_failed_region(get_region_key(old_record["row"], region_column), failures):
+            continue
+
+        removed_ids.append((report, resource_id))
+        yield ["removed", ""] + old_record["row"], old_record["tags"]
+
+    # Regions that failed after yielding part of their rows keep their previous state
+    upserts = [values for region_key, values in upserts if not is_failed_region(region_key, failures)]
+
+    with connection:
+        connection.executemany("INSERT OR REPLACE INTO inventory_state VALUES (?, ?, ?, ?, ?)", upserts)
+        connection.executemany("DELETE FROM inventory_state WHERE report=? AND resource_id=?", removed_ids)
+
+    connection.close()
+
+def add_delta_arguments(parser):
+    """
+    Add the --delta and --delta-state switches to a script's argument parser.
+
+    :param parser: argparse.ArgumentParser of the script.
+    """
+    parser.add_argument("--delta", action = "store_true",
+                        help = "Only write the resources added, changed or removed since the previous --delta run.")
+    parser.add_argument("--delta-state", default = None,
+                        help = "Database holding the previous inventory; defaults to the cache directory.")
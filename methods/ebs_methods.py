@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from methods.aws_methods import get_credentials
+from methods.cache_methods import cache_settings
+
+# The EBS direct APIs return at most this many blocks per call
+MAX_BLOCKS_PER_PAGE = 10000
+
+# Snapshot block size of the EBS direct APIs, used until a response reports it
+DEFAULT_BLOCK_SIZE = 524288
+
+# Block indexes in one GiB of volume at the default block size
+BLOCK_INDEXES_PER_GIB = 1024 ** 3 // DEFAULT_BLOCK_SIZE
+
+# Block indexes listed by one call chain; larger volumes are split into segments listed in parallel
+SEGMENT_BLOCKS = 131072
+
+# Number of segments listed at the same time
+MAX_BLOCK_WORKERS = 16
+
+def get_block_cache_connection(cache_path = None):
+    """
+    Open the database holding the measured snapshot sizes, creating the schema on first use.
+    Snapshots never change, so a measurement stays valid as long as the snapshot before it in the lineage is the same.
+
+    :param cache_path: Path of the database; defaults to snapshot_blocks.sqlite in the cache directory.
+    :return: sqlite3 connection.
+    """
+    if cache_path is None:
+        cache_path = os.path.join(cache_settings["directory"], "snapshot_blocks.sqlite")
+
+    cache_directory = os.path.dirname(cache_path)
+    if cache_directory:
+        os.makedirs(cache_directory, exist_ok = True)
+
+    connection = sqlite3.connect(cache_path, timeout = 30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_blocks (
+            snapshot_id TEXT PRIMARY KEY, parent_snapshot_id TEXT, block_count INTEGER, block_size INTEGER, measured_at REAL
+        )""")
+    connection.commit()
+
+    return connection
+
+def get_snapshot_lineages(snapshot_index, volume_ids):
+    """
+    Order the completed snapshots of each volume from oldest to newest; each snapshot only stores
+    the blocks that changed since the one before it.
+
+    :param snapshot_index: Snapshot lookup of a region, see methods.ec2_methods.build_snapshot_index.
+    :param volume_ids: Volume IDs whose snapshots to order.
+    :return: Dictionary of {volume_id: [snapshot, ...]} for the volumes that have completed snapshots.
+    """
+    lineages = {}
+
+    for volume_id in volume_ids:
+        snapshots = [snapshot for snapshot in snapshot_index.get(volume_id, []) if snapshot.get("State", "completed") == "completed"]
+        if snapshots:
+            lineages[volume_id] = sorted(snapshots, key = lambda snapshot: snapshot["StartTime"])
+
+    return lineages
+
+def get_block_segments(volume_size):
+    """
+    Split the block indexes of a volume into segments that can be listed in parallel.
+
+    :param volume_size: Volume size in GiB.
+    :return: List of (first block index, end block index) pairs; the last end is None so no block is missed.
+    """
+    block_count = max(1, volume_size) * BLOCK_INDEXES_PER_GIB
+    starts = list(range(0, block_count, SEGMENT_BLOCKS))
+
+    return [(start, end) for start, end in zip(starts, starts[1:] + [None])]
+
+def count_segment_blocks(ebs_client, snapshot_id, parent_snapshot_id, first_index, end_index):
+    """
+    Count the blocks a snapshot stores in one segment of block indexes: every block of the first
+    snapshot of a lineage, the blocks that changed since the parent for the others.
+
+    :param ebs_client: boto3 "ebs" client, or any object with the same list_snapshot_blocks/list_changed_blocks calls.
+    :param snapshot_id: Snapshot to measure.
+    :param parent_snapshot_id: Previous snapshot of the lineage, or None for the first one.
+    :param first_index: First block index of the segment.
+    :param end_index: Block index after the segment, or None for the end of the volume.
+    :return: Tuple of (block count, block size in bytes).
+    """
+    if parent_snapshot_id is None:
+        list_blocks = ebs_client.list_snapshot_blocks
+        request_params = {"SnapshotId": snapshot_id}
+        blocks_key = "Blocks"
+    else:
+        list_blocks = ebs_client.list_changed_blocks
+        request_params = {"FirstSnapshotId": parent_snapshot_id, "SecondSnapshotId": snapshot_id}
+        blocks_key = "ChangedBlocks"
+
+    request_params.update(StartingBlockIndex = first_index, MaxResults = MAX_BLOCKS_PER_PAGE)
+
+    block_count = 0
+    block_size = DEFAULT_BLOCK_SIZE
+
+    while True:
+        response = list_blocks(**request_params)
+        block_size = response.get("BlockSize", block_size)
+
+        for block in response.get(blocks_key, []):
+            if end_index is not None and block["BlockIndex"] >= end_index:
+                return block_count, block_size
+            # A changed block without a second token was cleared in the newer snapshot and takes no space
+            if parent_snapshot_id is None or block.get("SecondBlockToken"):
+                block_count += 1
+
+        next_token = response.get("NextToken")
+        if not next_token:
+            return block_count, block_size
+        request_params["NextToken"] = next_token
+
+def measure_snapshot_lineages(aws_profile, region, lineages, ebs_client = None, max_workers = MAX_BLOCK_WORKERS, cache_path = None, failures = None):
+    """
+    Measure the bytes each snapshot adds to its volume's lineage with the EBS direct APIs: ListSnapshotBlocks
+    for the first snapshot, ListChangedBlocks against the previous snapshot for the others. Every segment of
+    every snapshot is listed in parallel. Measurements are cached per snapshot ID, so reruns only list new
+    snapshots and snapshots whose predecessor was deleted.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region of the snapshots.
+    :param lineages: Dictionary of {volume_id: [snapshot, ...]} as returned by get_snapshot_lineages.
+    :param ebs_client: Client used for the block listings, e.g. a stubbed client; defaults to the pooled "ebs" client.
+    :param max_workers: Maximum number of segments listed at the same time.
+    :param cache_path: Path of the measurement cache, see get_block_cache_connection.
+    :param failures: Optional dictionary that receives {snapshot_id: exception} for every snapshot that could not be measured.
+    :return: Dictionary of {snapshot_id: {"ParentSnapshotId": id or None, "BlockCount": blocks, "UniqueBytes": bytes}}.
+    """
+    if failures is None:
+        failures = {}
+
+    if ebs_client is None:
+        ebs_client = get_credentials(aws_profile, region, "ebs")
+
+    parents = {}
+    volume_sizes = {}
+    for snapshots in lineages.values():
+        parent_snapshot_id = None
+        for snapshot in snapshots:
+            parents[snapshot["SnapshotId"]] = parent_snapshot_id
+            volume_sizes[snapshot["SnapshotId"]] = snapshot.get("VolumeSize", 0)
+            parent_snapshot_id = snapshot["SnapshotId"]
+
+    connection = get_block_cache_connection(cache_path)
+    measurements = {}
+
+    for snapshot_id, parent_snapshot_id, block_count, block_size in connection.execute(
+        "SELECT snapshot_id, parent_snapshot_id, block_count, block_size FROM snapshot_blocks"
+    ):
+        # A cached measurement only counts when it was taken against the same previous snapshot
+        if snapshot_id in parents and parents[snapshot_id] == parent_snapshot_id:
+            measurements[snapshot_id] = {"ParentSnapshotId": parent_snapshot_id, "BlockCount": block_count, "UniqueBytes": block_count * block_size}
+
+    pending_ids = [snapshot_id for snapshot_id in parents if snapshot_id not in measurements]
+    new_rows = []
+
+    if pending_ids:
+        with ThreadPoolExecutor(max_workers = max_workers) as executor:
+            segment_futures = {
+                snapshot_id: [
+                    executor.submit(count_segment_blocks, ebs_client, snapshot_id, parents[snapshot_id], first_index, end_index)
+                    for first_index, end_index in get_block_segments(volume_sizes[snapshot_id])
+                ]
+                for snapshot_id in pending_ids
+            }
+
+            for snapshot_id, futures in segment_futures.items():
+                try:
+                    segment_counts = [future.result() for future in futures]
+                except Exception as e:
+                    # A snapshot that cannot be listed is reported but does not stop the others
+                    print(f"Error measuring snapshot {snapshot_id} in region {region}: {e}")
+                    failures[snapshot_id] = e
+                    continue
+
+                block_count = sum(count for count, size in segment_counts)
+                block_size = segment_counts[0][1]
+                measurements[snapshot_id] = {"ParentSnapshotId": parents[snapshot_id], "BlockCount": block_count, "UniqueBytes": block_count * block_size}
+                new_rows.append((snapshot_id, parents[snapshot_id], block_count, block_size, time.time()))
+
+    with connection:
+        connection.executemany("INSERT OR REPLACE INTO snapshot_blocks VALUES (?, ?, ?, ?, ?)", new_rows)
+    connection.close()
+
+    return measurements
+
+def measure_volume_snapshots(aws_profile, region, snapshot_index, volume_ids, ebs_client = None, cache_path = None):
+    """
+    Measure the bytes stored by the snapshots of each volume, summed over the whole lineage.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region of the volumes.
+    :param snapshot_index: Snapshot lookup of the region, see methods.ec2_methods.build_snapshot_index.
+    :param volume_ids: Volume IDs to measure.
+    :param ebs_client: Client used for the block listings, see measure_snapshot_lineages.
+    :param cache_path: Path of the measurement cache, see get_block_cache_connection.
+    :return: Dictionary of {volume_id: unique bytes of all its snapshots, or None when a snapshot could not be measured};
+             volumes without completed snapshots are left out.
+    """
+    lineages = get_snapshot_lineages(snapshot_index, volume_ids)
+    measurements = measure_snapshot_lineages(aws_profile, region, lineages, ebs_client = ebs_client, cache_path = cache_path)
+
+    volume_bytes = {}
+    for volume_id, snapshots in lineages.items():
+        snapshot_ids = [snapshot["SnapshotId"] for snapshot in snapshots]
+        if all(snapshot_id in measurements for snapshot_id in snapshot_ids):
+            volume_bytes[volume_id] = sum(measurements[snapshot_id]["UniqueBytes"] for snapshot_id in snapshot_ids)
+        else:
+            volume_bytes[volume_id] = None
+
+    return volume_bytes
@@ -1,4 +1,58 @@
-from methods.aws_methods import *
+from concurrent.futures import ThreadPoolExecutor
+from methods.aws_methods import get_credentials, paginate, fan_out_regions, iter_regions
+from methods.file_methods import layout_tag_columns
+from methods.filter_methods import filter_request_params, matches_filter_spec
+from methods.row_methods import InstanceRow, VolumeRow, ColumnRegistry
+from methods.pricing_methods import get_instance_price
+from methods.ebs_methods import measure_volume_snapshots
+from methods.aging_methods import parse_stop_time, age_stopped_instances, AGE_THRESHOLDS
+from methods.cost_methods import (
+    estimate_volume_costs, get_price, get_volume_price_table, get_snapshot_price_table, DEFAULT_VOLUME_PRICE, SNAPSHOT_PRICES
+)
+
+# EC2 CreateTags accepts up to 1000 resource IDs per call
+CREATE_TAGS_BATCH_SIZE = 1000
+
+# Number of snapshot IDs checked per describe_snapshots call while waiting for snapshots
+SNAPSHOT_POLL_BATCH_SIZE = 200
+
+# Consecutive failed polls of a region after which its pending snapshots are given up
+MAX_SNAPSHOT_POLL_ERRORS = 10
+
+# Polls a snapshot may come back as not found before it is given up. EC2 is eventually consistent,
+# so describe_snapshots can miss a snapshot for a while right after create_snapshot returned its ID.
+MAX_SNAPSHOT_NOT_FOUND_POLLS = 4
+
+# Server side filter for the costcode tag. Tag-key filter values are case sensitive, but "?" matches any
+# character, so eight of them select every spelling of "costcode" (and other 8 character keys) in one filter
+COSTCODE_TAG_KEY_FILTER = {'Name': 'tag-key', 'Values': ['?' * len("costcode")]}
+
+# Filtered instance reports only describe the volumes of the matched instances up to this many instances
+# (describe_volumes calls of 200 attachment IDs each); above it one pass over the region's volumes is cheaper
+MAX_ATTACHMENT_FILTER_INSTANCES = 2000
+
+def select_from_pages(pages, operation, predicate):
+    """
+    Keep only the items of response pages that match a predicate, e.g. to apply a server-side
+    filter to unfiltered pages that are shared by several reports.
+
+    :param pages: Iterable of describe_instances, describe_volumes or describe_snapshots response pages.
+    :param operation: Operation the pages come from.
+    :param predicate: Function called with an instance, volume or snapshot; True keeps it.
+    :return: Generator of filtered pages.
+    """
+    for page in pages:
+        if operation == "describe_instances":
+            reservations = []
+            for reservation in page['Reservations']:
+                instances = [instance for instance in reservation['Instances'] if predicate(instance)]
+                if instances:
+                    reservations.append(dict(reservation, Instances = instances))
+            yield {'Reservations': reservations}
+        elif operation == "describe_volumes":
+            yield {'Volumes': [vol for vol in page['Volumes'] if predicate(vol)]}
+        else:
+            yield {'Snapshots': [snapshot for snapshot in page['Snapshots'] if predicate(snapshot)]}
 
 def get_all_regions(aws_profile):
     """
@@ -13,142 +67,415 @@ def get_all_regions(aws_profile):
 
     return regions
 
-def get_instance_tags(aws_profile, regions):
+def get_instance_tags(aws_profile, regions, filter_spec = None):
     """
     Collect all unique tag keys across all EC2 instances in the provided regions.
     
     :param aws_con: The boto3 session object.
     :param regions: List of region names to query.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
     :return: Sorted list of unique tag keys.
     """
     # Prepare to collect all unique tag keys across all instances
-    tag_keys = set()
+    tag_keys = set(fan_out_regions(get_instance_tags_in_region, aws_profile, regions, filter_spec))
 
-    # First pass to collect unique tag keys
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_instances")
-
-        for page in paginator.paginate():
-            for each_item in page["Reservations"]:
-                for instance in each_item["Instances"]:
-                    for each_tag in instance.get("Tags", []):
-                        tag_keys.add(each_tag['Key'])
     tag_keys = sorted(tag_keys)
     return tag_keys
 
-def get_ebs_tags(aws_profile, regions, vol_filter):
+def get_instance_tags_in_region(aws_profile, region, filter_spec = None):
+    """
+    Collect the tag keys used by the EC2 instances of a single region.
 
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: List of unique tag keys found in the region.
+    """
     tag_keys = set()
 
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_volumes")
+    for page in paginate(aws_profile, region, "describe_instances", **filter_request_params(filter_spec, "instance")):
+        for each_item in page["Reservations"]:
+            for instance in each_item["Instances"]:
+                if not matches_filter_spec(instance, filter_spec, "instance"):
+                    continue
+                for each_tag in instance.get("Tags", []):
+                    tag_keys.add(each_tag['Key'])
+
+    return list(tag_keys)
+
+def get_ebs_tags(aws_profile, regions, vol_filter, filter_spec = None):
 
-        for page in paginator.paginate(Filters=[vol_filter]):
-            for vol in page["Volumes"]:
-                for tags in vol.get("Tags", []):
-                    tag_keys.add(tags["Key"])
+    tag_keys = set(fan_out_regions(get_ebs_tags_in_region, aws_profile, regions, vol_filter, filter_spec))
     
     tag_keys = sorted(tag_keys)
     
     return tag_keys
 
+def get_ebs_tags_in_region(aws_profile, region, vol_filter, filter_spec = None):
+    """
+    Collect the tag keys used by the EBS volumes of a single region.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param vol_filter: describe_volumes filter applied to the volumes.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: List of unique tag keys found in the region.
+    """
+    tag_keys = set()
+
+    for page in paginate(aws_profile, region, "describe_volumes", **filter_request_params(filter_spec, "volume", [vol_filter] if vol_filter else None)):
+        for vol in page["Volumes"]:
+            if not matches_filter_spec(vol, filter_spec, "volume"):
+                continue
+            for tags in vol.get("Tags", []):
+                tag_keys.add(tags["Key"])
+
+    return list(tag_keys)
 
-def get_instance_details(aws_profile, regions, tag_keys):
+
+def get_instance_details(aws_profile, regions, tag_keys, filter_spec = None):
     """
     Retrieve details of all EC2 instances including tags, across multiple regions.
     
     :param aws_con: The boto3 session object.
     :param regions: List of region names to query.
     :param tag_keys: List of tag keys to extract from instances.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
     :return: List of rows with instance details and corresponding tag values.
     """    
-    instance_details = []
+    instance_details = fan_out_regions(get_instance_details_in_region, aws_profile, regions, tag_keys, filter_spec)
 
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_instances")
+    return instance_details
 
-        for page in paginator.paginate():
-            for reservation in page['Reservations']:
-                for instance in reservation['Instances']:
+def get_instance_details_in_region(aws_profile, region, tag_keys, filter_spec = None):
+    """
+    Retrieve details of all EC2 instances including tags for a single region.
 
-                   # Start with the basic instance details
-                    row = [
-                        region,
-                        instance["InstanceId"],
-                        instance["InstanceType"],
-                        instance["State"]["Name"],
-                        instance["LaunchTime"].strftime('%Y-%m-%d %H:%M:%S'),  # Formatting LaunchTime
-                        instance.get("ImageId", ""),
-                        instance.get("VpcId", ""),
-                        instance.get("SubnetId", ""),
-                        instance.get("PrivateIpAddress", ""),
-                        instance.get("PublicIpAddress", "")
-                    ]
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param tag_keys: List of tag keys to extract from instances.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: List of rows with instance details and corresponding tag values.
+    """
+    tagged_rows = get_tagged_instance_rows_in_region(aws_profile, region, filter_spec)
 
-                    # Step to calculate the total size of all EBS volumes attached to this instance
-                    total_ebs_size = calculate_total_ebs_size(ec2_client, instance["InstanceId"])
-                    row.append(total_ebs_size)
+    instance_details = list(layout_tag_columns(tagged_rows, tag_keys))
 
-                    # Create a dictionary of tags for easy lookup
-                    tags_dict = {tag['Key']: tag['Value'] for tag in instance.get("Tags", [])}
+    return instance_details
 
-                    # Add tag values to the row; if tag doesn't exist, leave it empty
-                    row.extend(tags_dict.get(key, '') for key in tag_keys)                    
+def get_instance_inventory(aws_profile, regions, filter_spec = None, failures = None):
+    """
+    Retrieve details of all EC2 instances and their tags in a single describe_instances pass.
+    The tag columns are laid out at write time, e.g. with write_tagged_rows_to_csv.
 
-                    instance_details.append(row)
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :param failures: Optional dictionary that receives {region: exception} for every region that failed.
+    :return: List of (row, tags_dict) pairs with the instance details and the instance tags.
+    """
+    tagged_rows = fan_out_regions(get_tagged_instance_rows_in_region, aws_profile, regions, filter_spec, failures = failures)
 
-    return instance_details
+    return tagged_rows
+
+def get_tagged_instance_rows_in_region(aws_profile, region, filter_spec = None):
+    """
+    Retrieve details of all EC2 instances for a single region, keeping the tags next to each row.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: List of (row, tags_dict) pairs with the instance details and the instance tags.
+    """
+    tagged_rows = list(iter_tagged_instance_rows_in_region(aws_profile, region, filter_spec))
+
+    return tagged_rows
+
+def iter_tagged_instance_rows_in_region(aws_profile, region, filter_spec = None):
+    """
+    Yield details of all EC2 instances for a single region page by page, keeping the tags next to each row.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: Generator of (row, tags_dict) pairs with the instance details and the instance tags.
+    """
+    instance_pages = paginate(aws_profile, region, "describe_instances", **filter_request_params(filter_spec, "instance"))
+
+    if not filter_spec:
+        # Volume sizes for the whole region come from one describe_volumes pass
+        volume_index = build_volume_index(aws_profile, region)
+        return iter_instance_rows_from_pages(region, instance_pages, volume_index, filter_spec)
+
+    # A filtered report reads its instances first, so only the volumes attached to them are described
+    instance_pages = list(instance_pages)
+    instance_ids = [
+        instance["InstanceId"]
+        for page in instance_pages
+        for reservation in page['Reservations']
+        for instance in reservation['Instances']
+        if matches_filter_spec(instance, filter_spec, "instance")
+    ]
+    if len(instance_ids) > MAX_ATTACHMENT_FILTER_INSTANCES:
+        instance_ids = None
+
+    volume_index = build_volume_index(aws_profile, region, instance_ids)
+
+    return iter_instance_rows_from_pages(region, instance_pages, volume_index, filter_spec)
+
+def iter_instance_rows_from_pages(region, instance_pages, volume_index, filter_spec = None):
+    """
+    Build the instance rows of a region from describe_instances pages, e.g. pages shared by several reports.
+
+    :param region: Region name of the pages.
+    :param instance_pages: Iterable of describe_instances response pages.
+    :param volume_index: Volume lookup of the region, see build_volume_index.
+    :param filter_spec: Optional filter spec; only its client-side part is checked here.
+    :return: Generator of (row, tags_dict) pairs with the instance details and the instance tags.
+    """
+    for page in instance_pages:
+        for reservation in page['Reservations']:
+            for instance in reservation['Instances']:
+                if not matches_filter_spec(instance, filter_spec, "instance"):
+                    continue
+
+                # Step to calculate the total size of all EBS volumes attached to this instance
+                total_ebs_size = sum_attached_volume_sizes(instance, volume_index)
+
+                row = InstanceRow(
+                    region,
+                    instance["InstanceId"],
+                    instance["InstanceType"],
+                    instance["State"]["Name"],
+                    instance["LaunchTime"].strftime('%Y-%m-%d %H:%M:%S'),  # Formatting LaunchTime
+                    instance.get("ImageId", ""),
+                    instance.get("VpcId", ""),
+                    instance.get("SubnetId", ""),
+                    instance.get("PrivateIpAddress", ""),
+                    instance.get("PublicIpAddress", ""),
+                    total_ebs_size
+                )
+
+                # Create a dictionary of tags for easy lookup
+                tags_dict = {tag['Key']: tag['Value'] for tag in instance.get("Tags", [])}
+
+                yield row, tags_dict
+
+def iter_instance_inventory(aws_profile, regions, filter_spec = None, failures = None):
+    """
+    Yield the EC2 instances of every region with their tags, page by page, without holding them in memory.
+    Pair with stream_tagged_rows_to_csv to write the report with a flat memory profile.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :param failures: Optional dictionary that receives {region: exception} for every region that failed.
+    :return: Generator of (row, tags_dict) pairs.
+    """
+    return iter_regions(iter_tagged_instance_rows_in_region, aws_profile, regions, filter_spec, failures = failures)
 
-def get_ebs_details(aws_profile, regions, tag_keys):
+def get_ebs_details(aws_profile, regions, tag_keys, filter_spec = None):
     """
     Retrieve details of all EBS volumes including tags, across multiple regions.
     
     :param aws_con: The boto3 session object.
     :param regions: List of region names to query.
     :param tag_keys: List of tag keys to extract from instances.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
     :return: List of rows with ebs details and corresponding tag values.
     """    
 
     vol_filter = {'Name': 'status','Values': ['available']}
 
-    ebs_details = []
+    ebs_details = fan_out_regions(get_ebs_details_in_region, aws_profile, regions, tag_keys, vol_filter, filter_spec)
 
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_volumes")
+    return ebs_details
 
-        for page in paginator.paginate(Filters=[vol_filter]):
-            for vol in page["Volumes"]:
-                row = [
-                    region,
-                    vol["VolumeId"],
-                    vol["VolumeType"],
-                    vol["Size"],                    
-                    vol["Encrypted"],
-                    vol["State"],
-                    vol.get("SnapshotId", ""),
-                    vol["CreateTime"].strftime('%Y-%m-%d %H:%M:%S')
+def get_ebs_details_in_region(aws_profile, region, tag_keys, vol_filter, filter_spec = None):
+    """
+    Retrieve details of the EBS volumes matching vol_filter for a single region.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param tag_keys: List of tag keys to extract from volumes.
+    :param vol_filter: describe_volumes filter applied to the volumes.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: List of rows with ebs details and corresponding tag values.
+    """
+    tagged_rows = get_tagged_ebs_rows_in_region(aws_profile, region, vol_filter, filter_spec)
+
+    ebs_details = list(layout_tag_columns(tagged_rows, tag_keys))
+
+    return ebs_details
+
+def get_ebs_inventory(aws_profile, regions, vol_filter, filter_spec = None, failures = None):
+    """
+    Retrieve details of the EBS volumes matching vol_filter and their tags in a single describe_volumes pass.
+    The tag columns are laid out at write time, e.g. with write_tagged_rows_to_csv.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param vol_filter: describe_volumes filter applied to the volumes.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :param failures: Optional dictionary that receives {region: exception} for every region that failed.
+    :return: List of (row, tags_dict) pairs with the ebs details and the volume tags.
+    """
+    tagged_rows = fan_out_regions(get_tagged_ebs_rows_in_region, aws_profile, regions, vol_filter, filter_spec, failures = failures)
+
+    return tagged_rows
+
+def get_tagged_ebs_rows_in_region(aws_profile, region, vol_filter, filter_spec = None):
+    """
+    Retrieve details of the EBS volumes matching vol_filter for a single region, keeping the tags next to each row.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param vol_filter: describe_volumes filter applied to the volumes.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: List of (row, tags_dict) pairs with the ebs details and the volume tags.
+    """
+    tagged_rows = list(iter_tagged_ebs_rows_in_region(aws_profile, region, vol_filter, filter_spec))
+
+    return tagged_rows
+
+def iter_tagged_ebs_rows_in_region(aws_profile, region, vol_filter, filter_spec = None):
+    """
+    Yield details of the EBS volumes matching vol_filter for a single region, keeping the tags next to each row.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param vol_filter: describe_volumes filter applied to the volumes.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: Generator of (row, tags_dict) pairs with the ebs details and the volume tags.
+    """
+    volume_pages = paginate(aws_profile, region, "describe_volumes", **filter_request_params(filter_spec, "volume", [vol_filter] if vol_filter else None))
+
+    return iter_ebs_rows_from_pages(region, volume_pages, filter_spec)
+
+def iter_ebs_rows_from_pages(region, volume_pages, filter_spec = None):
+    """
+    Build the volume rows of a region from describe_volumes pages, e.g. pages shared by several reports.
+
+    :param region: Region name of the pages.
+    :param volume_pages: Iterable of describe_volumes response pages.
+    :param filter_spec: Optional filter spec; only its client-side part is checked here.
+    :return: Generator of (row, tags_dict) pairs with the ebs details and the volume tags.
+    """
+    for page in volume_pages:
+        for vol in page["Volumes"]:
+            if not matches_filter_spec(vol, filter_spec, "volume"):
+                continue
+            row = VolumeRow(
+                region,
+                vol["VolumeId"],
+                vol["VolumeType"],
+                vol["Size"],
+                vol["Encrypted"],
+                vol["State"],
+                vol.get("SnapshotId", ""),
+                vol["CreateTime"].strftime('%Y-%m-%d %H:%M:%S')
+            )
+
+            tags_dict = { tag['Key']: tag['Value'] for tag in vol.get("Tags", [])}
+
+            yield row, tags_dict
+
+def iter_ebs_inventory(aws_profile, regions, vol_filter, filter_spec = None):
+    """
+    Yield the EBS volumes matching vol_filter of every region with their tags, page by page, without holding them in memory.
+    Pair with stream_tagged_rows_to_csv to write the report with a flat memory profile.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param vol_filter: describe_volumes filter applied to the volumes.
+    :param filter_spec: Optional filter spec from methods.filter_methods.build_filter_spec.
+    :return: Generator of (row, tags_dict) pairs.
+    """
+    return iter_regions(iter_tagged_ebs_rows_in_region, aws_profile, regions, vol_filter, filter_spec)
+
+def build_volume_index(aws_profile, region, instance_ids = None):
+    """
+    Build a lookup of the EBS volumes in a region from one paginated describe_volumes pass.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param instance_ids: Optional list of instance IDs; only volumes attached to them are indexed.
+    :return: Dictionary of {VolumeId: {"Size": GiB, "VolumeType": type, "Attachments": [...]}}.
+    """
+    volume_index = {}
+
+    if instance_ids is None:
+        request_sets = [{}]
+    else:
+        # The attachment filter accepts at most 200 values per request
+        request_sets = [
+            {'Filters': [{'Name': 'attachment.instance-id', 'Values': instance_ids[i:i + 200]}]}
+            for i in range(0, len(instance_ids), 200)
+        ]
+
+    for request_params in request_sets:
+        volume_index.update(index_volume_pages(paginate(aws_profile, region, "describe_volumes", **request_params)))
+
+    return volume_index
+
+def index_volume_pages(volume_pages):
+    """
+    Build a volume lookup from describe_volumes pages.
+
+    :param volume_pages: Iterable of describe_volumes response pages.
+    :return: Dictionary of {VolumeId: {"Size": GiB, "VolumeType": type, "Attachments": [...]}}.
+    """
+    volume_index = {}
+
+    for page in volume_pages:
+        for vol in page["Volumes"]:
+            volume_index[vol["VolumeId"]] = {
+                "Size": vol["Size"],
+                "VolumeType": vol["VolumeType"],
+                "Attachments": [
+                    {
+                        "InstanceId": attachment.get("InstanceId", ""),
+                        "Device": attachment.get("Device", ""),
+                        "State": attachment.get("State", "")
+                    }
+                    for attachment in vol.get("Attachments", [])
                 ]
+            }
 
-                tags_dict = { tag['Key']: tag['Value'] for tag in vol.get("Tags", [])}
+    return volume_index
 
-                row.extend(tags_dict.get(key, '') for key in tag_keys)               
+def sum_attached_volume_sizes(instance, volume_index):
+    """
+    Calculate the total size of the EBS volumes attached to an instance from a volume index.
 
-                ebs_details.append(row)
+    :param instance: Instance dictionary as returned by describe_instances.
+    :param volume_index: Volume lookup returned by build_volume_index for the instance's region.
+    :return: The total size of all attached EBS volumes in GiB.
+    """
+    total_size = 0
 
-    return ebs_details
+    for block_device in instance.get('BlockDeviceMappings', []):
+        volume_id = block_device.get('Ebs', {}).get('VolumeId')
+        volume = volume_index.get(volume_id)
+        if volume:
+            total_size += volume['Size']
 
-def calculate_total_ebs_size(aws_profile, region_id, instance_id):
+    return total_size
+
+def calculate_total_ebs_size(aws_profile, region_id, instance_id, volume_index = None):
     """
     Calculate the total sum of all EBS volumes attached to an EC2 instance.
+    For many instances, build the volume index once per region with build_volume_index and pass it in.
     
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region_id: The AWS region where the instance is located.
     :param instance_id: The ID of the EC2 instance.
-    :param region: The AWS region where the instance is located.
+    :param volume_index: Optional volume lookup returned by build_volume_index.
     :return: The total size of all attached EBS volumes in GiB.
     """
+    if volume_index is None:
+        volume_index = build_volume_index(aws_profile, region_id, [instance_id])
+
     ec2_client = get_credentials(aws_profile, region_id)
     # Get the list of volumes attached to the EC2 instance
     response = ec2_client.describe_instances(InstanceIds=[instance_id])
@@ -156,46 +483,50 @@ def calculate_total_ebs_size(aws_profile, region_id, instance_id):
     # Initialize total size variable
     total_size = 0
 
-    # Iterate over each instance to get the attached volumes
     for reservation in response['Reservations']:
         for instance in reservation['Instances']:
-            # Check for the 'BlockDeviceMappings' field (attached volumes)
-            if 'BlockDeviceMappings' in instance:
-                for block_device in instance['BlockDeviceMappings']:
-                    # Get the volume ID from the block device mapping
-                    volume_id = block_device['Ebs']['VolumeId']
-                    
-                    # Get the volume's size
-                    volume_response = ec2_client.describe_volumes(VolumeIds=[volume_id])
-                    for volume in volume_response['Volumes']:
-                        total_size += volume['Size']  # Add the size of this volume
+            total_size += sum_attached_volume_sizes(instance, volume_index)
 
     return total_size
 
-def get_invalid_ec2_costcodes(aws_profile, regions):
+def get_invalid_ec2_costcodes(aws_profile, regions, filter_spec = None):
 
     # Compiles a list of instances that have a costcode longer than 6 characters
 
+    instances_info = fan_out_regions(get_invalid_ec2_costcodes_in_region, aws_profile, regions, filter_spec)
+
+    return instances_info
+
+def get_invalid_ec2_costcodes_in_region(aws_profile, region, filter_spec = None):
+
+    # Compiles the instances of a single region that have a costcode longer than 6 characters
+
+    instance_pages = paginate(aws_profile, region, "describe_instances", **filter_request_params(filter_spec, "instance", [COSTCODE_TAG_KEY_FILTER]))
+
+    return get_invalid_ec2_costcodes_from_pages(region, instance_pages, filter_spec)
+
+def get_invalid_ec2_costcodes_from_pages(region, instance_pages, filter_spec = None):
+
+    # Compiles the instances with a costcode longer than 6 characters from describe_instances pages
+
     instances_info = []
 
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_instances")
+    for page in instance_pages:
+        for reservation in page['Reservations']:
+            for instance in reservation['Instances']:
+                if not matches_filter_spec(instance, filter_spec, "instance"):
+                    continue
+                tags = {tag['Key'].lower(): tag['Value'] for tag in instance.get('Tags', [])}
 
-        for page in paginator.paginate():
-            for reservation in page['Reservations']:
-                for instance in reservation['Instances']:
-                    tags = {tag['Key'].lower(): tag['Value'] for tag in instance.get('Tags', [])}                    
-                    
-                    costcode_value = tags.get("costcode", "")
+                costcode_value = tags.get("costcode", "")
 
-                    if len(costcode_value) > 6:
+                if len(costcode_value) > 6:
 
-                        instances_info.append({
-                            "instanceId": instance['InstanceId'],
-                            "region": region,
-                            "invalid_costcode": costcode_value
-                })
+                    instances_info.append({
+                        "instanceId": instance['InstanceId'],
+                        "region": region,
+                        "invalid_costcode": costcode_value
+            })
     return instances_info
 
 
@@ -231,8 +562,83 @@ def assign_costcodes(ec2_client, instanceId, valid_costcode):
             ]
         )
 
+def apply_tags_in_batches(aws_profile, tag_requests, tag_key, dry_run = False):
+    """
+    Apply one tag to many resources with as few create_tags calls as possible.
+    Targets are grouped by region and by tag value, each call carries up to CREATE_TAGS_BATCH_SIZE
+    resources and the regions are tagged in parallel.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param tag_requests: List of {"region": ..., "resource_id": ..., "value": ...} dictionaries.
+    :param tag_key: Key of the tag to set, e.g. "costcode".
+    :param dry_run: Only check permissions (EC2 DryRun), nothing is changed.
+    :return: List of {"region", "resource_id", "value", "status", "error"} results, one per resource.
+    """
+    requests_by_region = {}
+    for tag_request in tag_requests:
+        requests_by_region.setdefault(tag_request["region"], []).append(tag_request)
+
+    results = fan_out_regions(apply_tags_in_region, aws_profile, sorted(requests_by_region), requests_by_region, tag_key, dry_run)
+
+    return results
+
+def apply_tags_in_region(aws_profile, region, requests_by_region, tag_key, dry_run = False):
+    """
+    Apply the tag requests of a single region, see apply_tags_in_batches.
+
+    :return: List of per-resource results for the region.
+    """
+    ec2_client = get_credentials(aws_profile, region)
+
+    # Group the resources of the region by the value they need
+    resources_by_value = {}
+    for tag_request in requests_by_region[region]:
+        resources_by_value.setdefault(tag_request["value"], []).append(tag_request["resource_id"])
+
+    results = []
+
+    for value, resource_ids in resources_by_value.items():
+        for i in range(0, len(resource_ids), CREATE_TAGS_BATCH_SIZE):
+            batch = resource_ids[i:i + CREATE_TAGS_BATCH_SIZE]
+            error = create_tags_batch(ec2_client, batch, tag_key, value, dry_run)
+
+            if error is None:
+                results.extend(tag_result(region, resource_id, value, "success") for resource_id in batch)
+            elif len(batch) == 1:
+                results.append(tag_result(region, batch[0], value, "failed", error))
+            else:
+                # One bad ID (e.g. a terminated instance) fails the whole call, so isolate it
+                for resource_id in batch:
+                    single_error = create_tags_batch(ec2_client, [resource_id], tag_key, value, dry_run)
+                    status = "success" if single_error is None else "failed"
+                    results.append(tag_result(region, resource_id, value, status, single_error))
+
+    return results
+
+def create_tags_batch(ec2_client, resource_ids, tag_key, value, dry_run = False):
+    """
+    Send one create_tags call.
+
+    :return: None when the call succeeded, otherwise the error message.
+    """
+    try:
+        ec2_client.create_tags(
+            DryRun=dry_run,
+            Resources=resource_ids,
+            Tags=[{'Key': tag_key, 'Value': value}]
+        )
+    except Exception as e:
+        # A dry run that would have succeeded is reported as a DryRunOperation error
+        if getattr(e, "response", {}).get("Error", {}).get("Code") == "DryRunOperation":
+            return None
+        return str(e)
+
+    return None
 
-def get_instance_details_from_file(aws_profile, tag_keys, file_path):
+def tag_result(region, resource_id, value, status, error = ""):
+    return {"region": region, "resource_id": resource_id, "value": value, "status": status, "error": error or ""}
+
+def get_instance_details_from_file(aws_profile, tag_keys, file_path, filter_spec = None):
     instance_details = []
 
     # Read region and instance IDs from the text file
@@ -247,12 +653,14 @@ def get_instance_details_from_file(aws_profile, tag_keys, file_path):
         instances_by_region[region].append(instance_id)
 
     for region, instance_ids in instances_by_region.items():
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_instances")
+        # Only the volumes attached to the requested instances are indexed
+        volume_index = build_volume_index(aws_profile, region, instance_ids)
 
-        for page in paginator.paginate(InstanceIds=instance_ids):
+        for page in paginate(aws_profile, region, "describe_instances", InstanceIds=instance_ids, **filter_request_params(filter_spec, "instance")):
             for reservation in page['Reservations']:
                 for instance in reservation['Instances']:
+                    if not matches_filter_spec(instance, filter_spec, "instance"):
+                        continue
 
                     # Start with the basic instance details
                     row = [
@@ -269,7 +677,7 @@ def get_instance_details_from_file(aws_profile, tag_keys, file_path):
                     ]
 
                     # Step to calculate the total size of all EBS volumes attached to this instance
-                    total_ebs_size = calculate_total_ebs_size(ec2_client, instance["InstanceId"])
+                    total_ebs_size = sum_attached_volume_sizes(instance, volume_index)
                     row.append(total_ebs_size)
 
                     # Create a dictionary of tags for easy lookup
@@ -282,99 +690,163 @@ def get_instance_details_from_file(aws_profile, tag_keys, file_path):
 
     return instance_details
 
-def get_stopped_instances_grt_90days(aws_profile, regions, stopped_days = 90):
-    from datetime import datetime, timedelta, timezone
+def get_stopped_instances_grt_90days(aws_profile, regions, stopped_days = 90, filter_spec = None):
     
-    current_time = datetime.now(timezone.utc)
-    stopped_filter = {'Name': 'instance-state-name', 'Values': ['stopped']}
-    instance_details = []
-
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_instances")
+    records = fan_out_regions(get_stopped_instance_records_in_region, aws_profile, regions, filter_spec)
 
-        # Loop through all reservations and instances
-        for page in paginator.paginate(Filters=[stopped_filter]):
-            for reservation in page['Reservations']:
-                for instance in reservation['Instances']:
-                    instance_id = instance['InstanceId']
-                    state_transition_reason = instance.get('StateTransitionReason', '')
-                try:
-                    # The state transition reason will look like: "User initiated (yyyy-mm-dd hh:mm:ss GMT)"
-                    # Extract the stop time from the reason string
-                    if state_transition_reason:
-                            stop_time_str = state_transition_reason.split('(')[-1].strip(')')  # Extract time inside parentheses
-                            stop_time = datetime.strptime(stop_time_str, "%Y-%m-%d %H:%M:%S GMT")
-
-                            # Make stop_time format the same UTC format as current time
-                            stop_time = stop_time.replace(tzinfo=timezone.utc)
-
-                            # Calculate how long the instance has been stopped
-                            time_diff = current_time - stop_time
-                            
-                            # Make time_diff more readable for output
-                            days = time_diff.days
-                            hours, remainder = divmod(time_diff.seconds, 3600)
-                            minutes, seconds = divmod(remainder, 60)
-                            readable_time_diff = f"{days} days, {hours} hours, {minutes} minutes"
-
-                            # Get Tags for instance
-                            tags = {tag["Key"].lower(): tag["Value"] for tag in instance.get("Tags", [])}
-
-                            if time_diff >= timedelta(days = stopped_days):  # 90 days in timedelta
-                                row = [
-                                    region,
-                                    instance["InstanceId"],
-                                    tags.get("name", ""),
-                                    tags.get("nextgen.cost-center", ""),                                    
-                                    instance["InstanceType"],
-                                    instance["State"]["Name"],
-                                    instance["LaunchTime"].strftime('%Y-%m-%d %H:%M:%S'),  # Formatting LaunchTime
-                                    instance.get("PrivateIpAddress", ""),
-                                    state_transition_reason, 
-                                    current_time.strftime('%Y-%m-%d %H:%M:%S'),
-                                    str(readable_time_diff),
-                                    ""
-                                ]
-
-                                instance_details.append(row)
-                                # print(f"Instance {instance_id} has been stopped for more than 90 days (Stopped on {stop_time_str})")                        
-                except Exception as e:
-                    # Error instances are outputted with error code
-                    print(f"Error parsing stop time for instance {instance_id}")
-                    row = [
-                            region,
-                            instance["InstanceId"],
-                            tags.get("name", ""),
-                            tags.get("nextgen.cost-center", ""),                            
-                            instance["InstanceType"],
-                            instance["State"]["Name"],
-                            instance["LaunchTime"].strftime('%Y-%m-%d %H:%M:%S'),  # Formatting LaunchTime
-                            instance.get("PrivateIpAddress", ""),
-                            state_transition_reason, 
-                            current_time.strftime('%Y-%m-%d %H:%M:%S'),
-                            "",                      
-                            e
-                        ]
-                                                                
-                    instance_details.append(row)
+    # Ages of all regions are computed together
+    instance_details = age_stopped_instances(records, min_days = stopped_days)
     
     return instance_details
 
-def get_ebs_snapshots(resource, aws_profile, region_id):
+def get_stopped_instance_aging(aws_profile, regions, thresholds = AGE_THRESHOLDS, filter_spec = None, failures = None):
+    """
+    Bucket the stopped instances of every region by how long they have been stopped, all thresholds at once.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param thresholds: Ascending bucket thresholds in days, e.g. (30, 60, 90, 180).
+    :param filter_spec: Optional filter specification, see methods.filter_methods.
+    :param failures: Optional dictionary that receives {region: exception} for every region that failed.
+    :return: List of stopped instance rows followed by the Stopped_Days and Age_Bucket columns.
+    """
+    records = fan_out_regions(get_stopped_instance_records_in_region, aws_profile, regions, filter_spec, failures = failures)
+
+    return age_stopped_instances(records, thresholds)
+
+def get_stopped_instances_in_region(aws_profile, region, stopped_days = 90, filter_spec = None):
+
+    records = get_stopped_instance_records_in_region(aws_profile, region, filter_spec)
+
+    return age_stopped_instances(records, min_days = stopped_days)
+
+def get_stopped_instance_records_in_region(aws_profile, region, filter_spec = None):
+    """
+    Region worker returning the stopped instance records of a region, served from the inventory cache when it is enabled.
+
+    :return: List of (row, stop time) pairs, see get_stopped_instance_records_from_pages.
+    """
+    stopped_filter = {'Name': 'instance-state-name', 'Values': ['stopped']}
+    instance_pages = paginate(aws_profile, region, "describe_instances", **filter_request_params(filter_spec, "instance", [stopped_filter]))
+
+    return get_stopped_instance_records_from_pages(region, instance_pages, filter_spec)
+
+def get_stopped_instances_from_pages(region, instance_pages, stopped_days = 90, filter_spec = None):
+
+    records = get_stopped_instance_records_from_pages(region, instance_pages, filter_spec)
+
+    return age_stopped_instances(records, min_days = stopped_days)
+
+def get_stopped_instance_records_from_pages(region, instance_pages, filter_spec = None):
+    """
+    Collect the stopped instances of describe_instances pages with the time they were stopped.
+    Ages are left to methods.aging_methods.age_stopped_instances, which computes them for all records at once.
+
+    :param region: Region of the pages.
+    :param instance_pages: Iterable of describe_instances response pages.
+    :param filter_spec: Optional filter specification, see methods.filter_methods.
+    :return: List of (row, stop time) pairs; the stop time is in seconds since the epoch, None when
+             the StateTransitionReason holds none.
+    """
+    records = []
+
+    # Loop through all reservations and instances
+    for page in instance_pages:
+        for reservation in page['Reservations']:
+            for instance in reservation['Instances']:
+                if instance["State"]["Name"] != "stopped" or not matches_filter_spec(instance, filter_spec, "instance"):
+                    continue
+
+                # The state transition reason will look like: "User initiated (yyyy-mm-dd hh:mm:ss GMT)"
+                state_transition_reason = instance.get('StateTransitionReason', '')
+                if not state_transition_reason:
+                    continue
+
+                # Get Tags for instance
+                tags = {tag["Key"].lower(): tag["Value"] for tag in instance.get("Tags", [])}
+
+                row = [
+                    region,
+                    instance["InstanceId"],
+                    tags.get("name", ""),
+                    tags.get("nextgen.cost-center", ""),
+                    instance["InstanceType"],
+                    instance["State"]["Name"],
+                    instance["LaunchTime"].strftime('%Y-%m-%d %H:%M:%S'),  # Formatting LaunchTime
+                    instance.get("PrivateIpAddress", ""),
+                    state_transition_reason
+                ]
+                records.append((row, parse_stop_time(state_transition_reason)))
+
+    return records
+
+def build_snapshot_index(aws_profile, region):
+    """
+    Build a lookup of the account's own snapshots in a region from one paginated describe_snapshots pass.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :return: Dictionary of {VolumeId: [{"SnapshotId": id, "VolumeSize": GiB, "StartTime": datetime, "State": state}, ...]}.
+    """
+    return index_snapshot_pages(paginate(aws_profile, region, "describe_snapshots", OwnerIds=['self']))
+
+def index_snapshot_pages(snapshot_pages):
+    """
+    Build a snapshot lookup from describe_snapshots pages.
+
+    :param snapshot_pages: Iterable of describe_snapshots response pages.
+    :return: Dictionary of {VolumeId: [{"SnapshotId": id, "VolumeSize": GiB, "StartTime": datetime, "State": state}, ...]}.
+    """
+    snapshot_index = {}
+
+    for page in snapshot_pages:
+        for snapshot in page['Snapshots']:
+            snapshot_index.setdefault(snapshot.get('VolumeId', ''), []).append({
+                "SnapshotId": snapshot['SnapshotId'],
+                "VolumeSize": snapshot.get('VolumeSize', 0),
+                "StartTime": snapshot.get('StartTime'),
+                "State": snapshot.get('State', '')
+            })
+
+    return snapshot_index
+
+def build_snapshot_indexes(aws_profile, regions):
+    """
+    Build the snapshot index of every region in parallel.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :return: Dictionary of {region: snapshot index as returned by build_snapshot_index}.
+    """
+    region_indexes = fan_out_regions(get_snapshot_index_in_region, aws_profile, regions)
+
+    return dict(region_indexes)
+
+def get_snapshot_index_in_region(aws_profile, region):
+    """
+    Region worker for build_snapshot_indexes.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :return: List holding a single (region, snapshot index) pair.
+    """
+    return [(region, build_snapshot_index(aws_profile, region))]
+
+def get_ebs_snapshots(resource, aws_profile, region_id, snapshot_index = None):
     """
     Retrieve all snapshots for a specified resource. This function can be extended in the future to support additional AWS resources.
+    When looking up many resources, build the snapshot index once per region with build_snapshot_index and pass it in.
 
-    :param instance_id: The resource ID (Instance id, volume ID, ...) for which to find the snapshots.
+    :param resource: The resource ID (Instance id, volume ID, ...) for which to find the snapshots.
     :param aws_profile: The AWS profile to use for credentials.
-    :return: A tuple containing:
-             - A list of snapshot IDs
+    :param region_id: The AWS region where the resource is located.
+    :param snapshot_index: Optional snapshot lookup returned by build_snapshot_index.
+    :return: A list of snapshot IDs
     """
     # Create a session with the specified AWS profile
     ec2_client = get_credentials(aws_profile, region_id)
 
-    # Initialize lists for snapshot IDs and snapshot sizes
-    snapshot_ids = []
+    volume_ids = []
 
     if resource.startswith("i-"):
         instance_id = resource
@@ -382,46 +854,112 @@ def get_ebs_snapshots(resource, aws_profile, region_id):
 
         for reservation in response['Reservations']:
             for instance in reservation['Instances']:
-                # Check for the 'BlockDeviceMappings' field (attached volumes)
-                if 'BlockDeviceMappings' in instance:
-                    for block_device in instance['BlockDeviceMappings']:
-                        # Get the volume ID from the block device mapping
-                        volume_id = block_device['Ebs']['VolumeId']
-                        
-                        # Fetch snapshots for this volume
-                        snapshots_response = ec2_client.describe_snapshots(Filters=[
-                            {'Name': 'volume-id', 'Values': [volume_id]}
-                        ])
-                        
-                        for snapshot in snapshots_response['Snapshots']:
-                            snapshot_ids.append(snapshot['SnapshotId'])    
+                # Get the volume IDs from the block device mappings (attached volumes)
+                for block_device in instance.get('BlockDeviceMappings', []):
+                    volume_id = block_device.get('Ebs', {}).get('VolumeId')
+                    if volume_id:
+                        volume_ids.append(volume_id)
     elif resource.startswith("vol-"):
-        volume_id = resource
+        volume_ids.append(resource)
+
+    # Initialize lists for snapshot IDs
+    snapshot_ids = []
+
+    if not volume_ids:
+        return snapshot_ids
+
+    if snapshot_index is None:
+        # Fetch the snapshots of just these volumes, paginated so nothing is truncated
+        snapshot_index = {}
+        for page in paginate(aws_profile, region_id, "describe_snapshots", Filters=[{'Name': 'volume-id', 'Values': volume_ids}]):
+            for snapshot in page['Snapshots']:
+                snapshot_index.setdefault(snapshot['VolumeId'], []).append({"SnapshotId": snapshot['SnapshotId']})
+
+    for volume_id in volume_ids:
+        for snapshot in snapshot_index.get(volume_id, []):
+            snapshot_ids.append(snapshot['SnapshotId'])
 
-        # Fetch snapshots for this volume
-        snapshots_response = ec2_client.describe_snapshots(Filters=[
-            {'Name': 'volume-id', 'Values': [volume_id]}
-        ])
-        
-        for snapshot in snapshots_response['Snapshots']:
-            snapshot_ids.append(snapshot['SnapshotId'])  
-    
     return snapshot_ids
 
 
-def calculate_storage_costs(size_in_gb, cost_per_gb_per_month):
+def get_available_volume_columns(aws_profile, snapshot_indexes, volume_cost_per_gb_per_month = DEFAULT_VOLUME_PRICE, price_table = None, measure_snapshots = False):
+    """
+    Snapshot and cost columns of the available volumes report, computed after the volume columns.
+    The cost columns are estimated for all volumes at once with the price of each volume's region and type.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param snapshot_indexes: Dictionary of {region: snapshot index}, see build_snapshot_indexes.
+    :param volume_cost_per_gb_per_month: Storage price of the volume types missing from the price table.
+    :param price_table: Volume prices by (region, volume type); defaults to the price catalog with methods.cost_methods.VOLUME_PRICES as fallback.
+    :param measure_snapshots: Add the size and cost of the snapshots measured block by block with the EBS direct APIs,
+                              see methods.ebs_methods.measure_volume_snapshots.
+    :return: ColumnRegistry for VolumeRow rows.
+    """
+    def estimate_costs(rows, columns):
+        costs = estimate_volume_costs(
+            [row.size for row in rows],
+            [row.volume_type for row in rows],
+            [row.region for row in rows],
+            [bool(snapshots) for snapshots in columns["Snapshots"]],
+            price_table = price_table,
+            default_price = volume_cost_per_gb_per_month
+        )
+        snapshot_costs = [cost if snapshots else "" for cost, snapshots in zip(costs["snapshot_cost"].tolist(), columns["Snapshots"])]
+
+        return snapshot_costs, costs["volume_cost"].tolist()
+
+    volume_columns = ColumnRegistry(VolumeRow)
+    volume_columns.register("Snapshots", lambda row, values: get_ebs_snapshots(row.volume_id, aws_profile, row.region, snapshot_indexes.get(row.region, {})))
+    volume_columns.register("Total_EBS_Size_GB", lambda row, values: row.size)
+    volume_columns.register_batch(["Estimate_Snapshot_Cost", "Estimate_Volume_Cost"], estimate_costs)
+
+    def measure_snapshots_per_region(rows, columns):
+        region_volume_ids = {}
+        for row, snapshots in zip(rows, columns["Snapshots"]):
+            if snapshots:
+                region_volume_ids.setdefault(row.region, []).append(row.volume_id)
+
+        volume_bytes = {}
+        for region, volume_ids in region_volume_ids.items():
+            volume_bytes.update(measure_volume_snapshots(aws_profile, region, snapshot_indexes.get(region, {}), volume_ids))
+
+        stored_gb = []
+        measured_costs = []
+        for row in rows:
+            stored_bytes = volume_bytes.get(row.volume_id)
+            if stored_bytes is None:
+                stored_gb.append("")
+                measured_costs.append("")
+            else:
+                stored_gb.append(round(stored_bytes / 1024 ** 3, 2))
+                measured_costs.append(round(stored_bytes / 1024 ** 3 * get_price(get_snapshot_price_table(), row.region, "standard", SNAPSHOT_PRICES[("*", "standard")]), 2))
+
+        return stored_gb, measured_costs
+
+    if measure_snapshots:
+        volume_columns.register_batch(["Snapshot_Stored_GB", "Measured_Snapshot_Cost"], measure_snapshots_per_region)
+
+    return volume_columns
+
+def calculate_storage_costs(size_in_gb, cost_per_gb_per_month = None, region = "*", volume_type = None):
     """
     Calculate the storage cost based on size and cost rate.
 
     :param size_in_gb: The size of the storage in GB.
-    :param cost_per_gb_per_month: The cost per GB per month.
+    :param cost_per_gb_per_month: The cost per GB per month; None looks up the price of the region and
+                                  volume type in the price catalog or methods.cost_methods.VOLUME_PRICES.
+    :param region: Region of the volume, used when cost_per_gb_per_month is None.
+    :param volume_type: Type of the volume (e.g. "gp3"), used when cost_per_gb_per_month is None.
     :return: The total cost of the storage.
     """
+    if cost_per_gb_per_month is None:
+        cost_per_gb_per_month = get_price(get_volume_price_table(), region, volume_type or "", DEFAULT_VOLUME_PRICE)
+
     cost = size_in_gb * cost_per_gb_per_month
 
     return round(cost, 2)
 
-def estimate_snapshot_cost(total_ebs_gb, utilization_percentage=.5, calculate_incremental = False, change_rate_per_day=0.03, days=30, backup_price_per_gb=0.05):
+def estimate_snapshot_cost(total_ebs_gb, utilization_percentage=.5, calculate_incremental = False, change_rate_per_day=0.03, days=30, backup_price_per_gb=None, region = "*"):
     """
     Estimate the cost of EBS snapshots considering full and incremental snapshots.
     
@@ -430,10 +968,14 @@ def estimate_snapshot_cost(total_ebs_gb, utilization_percentage=.5, calculate_in
     :param calculate_incremental: Dictates if incremental cost estimate will be done
     :param change_rate_per_day: Percentage of data that changes per day (e.g., 3% as 0.03)
     :param days: Number of days to consider for the estimate (typically 30 for monthly)
-    :param backup_price_per_gb: Cost per GB per month for backup storage
+    :param backup_price_per_gb: Cost per GB per month for backup storage; None looks up the snapshot price of the region
+    :param region: Region of the snapshots, used when backup_price_per_gb is None
     
     :return: Estimated cost for snapshots
     """
+    if backup_price_per_gb is None:
+        backup_price_per_gb = get_price(get_snapshot_price_table(), region, "standard", SNAPSHOT_PRICES[("*", "standard")])
+
     # Calculate the used data (total * utilization percentage)
     used_data = total_ebs_gb * utilization_percentage
     
@@ -453,6 +995,22 @@ def estimate_snapshot_cost(total_ebs_gb, utilization_percentage=.5, calculate_in
     
     return round(total_cost, 2)
 
+def estimate_instance_cost(region, instance_type, operating_system = "Linux", hours = 730):
+    """
+    Estimate the on-demand cost of running an instance, from the compiled price catalog.
+
+    :param region: Region of the instance.
+    :param instance_type: Instance type, e.g. "m5.large".
+    :param operating_system: Operating system as named in the price list, e.g. "Linux", "Windows" or "RHEL".
+    :param hours: Number of hours to estimate (730 for a month).
+    :return: Estimated cost, or "" when the catalog has no price for the instance.
+    """
+    hourly_price = get_instance_price(region, instance_type, operating_system)
+    if hourly_price is None:
+        return ""
+
+    return round(hourly_price * hours, 2)
+
 def create_snapshot(aws_profile, region, volume_id, description, tags):
     
     resources = [] 
@@ -485,4 +1043,252 @@ def create_snapshot(aws_profile, region, volume_id, description, tags):
     resources.append(volume_id)
     resources.append(snapshot_id)
 
-    return resources
\ No newline at end of file
+    return resources
+
+def start_snapshot(aws_profile, region, volume_id, description, tags):
+    """
+    Start a snapshot of a volume without waiting for it, tagging it at creation time.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: The AWS region of the volume.
+    :param volume_id: The ID of the volume to snapshot.
+    :param description: Snapshot description.
+    :param tags: List of {'Key': ..., 'Value': ...} tags for the snapshot.
+    :return: The ID of the new snapshot.
+    """
+    ec2_client = get_credentials(aws_profile, region)
+
+    request_params = {"VolumeId": volume_id, "Description": description}
+    if tags:
+        request_params["TagSpecifications"] = [{'ResourceType': 'snapshot', 'Tags': tags}]
+
+    snapshot = ec2_client.create_snapshot(**request_params)
+
+    return snapshot['SnapshotId']
+
+def get_snapshot_states(aws_profile, region, snapshot_ids):
+    """
+    Get the state of many snapshots of a region with batched describe_snapshots calls.
+    This always asks AWS and never reads the inventory cache.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: The AWS region of the snapshots.
+    :param snapshot_ids: List of snapshot IDs.
+    :return: Dictionary of {SnapshotId: state}, e.g. "pending", "completed" or "error"; snapshots that
+             no longer exist are left out.
+    """
+    ec2_client = get_credentials(aws_profile, region)
+    snapshot_states = {}
+
+    for i in range(0, len(snapshot_ids), SNAPSHOT_POLL_BATCH_SIZE):
+        batch = snapshot_ids[i:i + SNAPSHOT_POLL_BATCH_SIZE]
+        try:
+            snapshots = ec2_client.describe_snapshots(SnapshotIds=batch)['Snapshots']
+        except Exception as e:
+            if not is_snapshot_not_found(e):
+                raise
+            # One missing snapshot fails the whole batch, so the batch is asked again one ID at a time
+            snapshots = []
+            for snapshot_id in batch:
+                try:
+                    snapshots.extend(ec2_client.describe_snapshots(SnapshotIds=[snapshot_id])['Snapshots'])
+                except Exception as e:
+                    if not is_snapshot_not_found(e):
+                        raise
+
+        for snapshot in snapshots:
+            snapshot_states[snapshot['SnapshotId']] = snapshot['State']
+
+    return snapshot_states
+
+def is_snapshot_not_found(error):
+    """
+    :return: True when a describe_snapshots error means one of the requested snapshots does not exist.
+    """
+    return getattr(error, "response", {}).get("Error", {}).get("Code") == "InvalidSnapshot.NotFound"
+
+def read_volume_pipeline_log(log_path):
+    """
+    Read the last recorded step of every volume from a snapshot-then-delete log.
+
+    :param log_path: Path of the JSON lines log written by snapshot_and_delete_volumes.
+    :return: Dictionary of {VolumeId: last log entry}.
+    """
+    import json
+    import os
+
+    last_steps = {}
+    if not os.path.exists(log_path):
+        return last_steps
+
+    with open(log_path, mode='r') as log_file:
+        for line in log_file:
+            if line.strip():
+                entry = json.loads(line)
+                last_steps[entry["volume_id"]] = entry
+
+    return last_steps
+
+def snapshot_and_delete_volumes(aws_profile, volume_rows, description, tags, log_path, max_in_flight = 50, max_workers = 8, poll_interval = 15, dry_run = True,
+                                max_poll_errors = MAX_SNAPSHOT_POLL_ERRORS, max_not_found_polls = MAX_SNAPSHOT_NOT_FOUND_POLLS, max_wait = None):
+    """
+    Snapshot a list of volumes and delete each volume as soon as its snapshot has completed.
+
+    All snapshots are started up front (up to max_in_flight at a time) and tagged at creation. Completion is
+    polled with one batched describe_snapshots call per region. Every step is appended to log_path, so
+    running again with the same log skips deleted volumes and picks up pending snapshots where they were.
+    A snapshot that failed for another reason than its error state (not found, polling failed) is polled
+    again on the next run before a new snapshot of the volume is started, so no duplicate snapshot is made.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param volume_rows: List of [region, volume_id, ...] rows, e.g. from import_csv_file.
+    :param description: Snapshot description.
+    :param tags: List of {'Key': ..., 'Value': ...} tags for the snapshots.
+    :param log_path: Path of the resumable JSON lines log.
+    :param max_in_flight: Maximum number of snapshots pending at the same time.
+    :param max_workers: Number of create/delete calls sent at the same time.
+    :param poll_interval: Seconds between completion polls.
+    :param dry_run: Only check the delete_volume permission (EC2 DryRun), no volume is deleted.
+    :param max_poll_errors: Consecutive failed polls of a region after which its pending snapshots are marked as failed.
+    :param max_not_found_polls: Polls a snapshot may be reported as not found before it is marked as failed.
+    :param max_wait: Seconds after which the run stops waiting; None waits until every snapshot is done.
+                     Rerunning with the same log picks up the pending snapshots and the volumes not started yet.
+    :return: Dictionary of {VolumeId: last log entry} after the run.
+    """
+    import json
+    import threading
+    import time
+
+    log_lock = threading.Lock()
+    last_steps = read_volume_pipeline_log(log_path)
+
+    def log_step(region, volume_id, step, snapshot_id = "", error = ""):
+        entry = {
+            "time": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "region": region,
+            "volume_id": volume_id,
+            "step": step,
+            "snapshot_id": snapshot_id,
+            "error": str(error)
+        }
+        with log_lock:
+            with open(log_path, mode='a') as log_file:
+                log_file.write(json.dumps(entry) + "\n")
+            last_steps[volume_id] = entry
+        print("Region: {} Volume: {} Step: {} Snapshot_ID: {} {}".format(region, volume_id, step, snapshot_id, error))
+
+    def start(region, volume_id):
+        try:
+            snapshot_id = start_snapshot(aws_profile, region, volume_id, description, tags)
+        except Exception as e:
+            log_step(region, volume_id, "snapshot_failed", error = e)
+            return None
+        log_step(region, volume_id, "snapshot_started", snapshot_id)
+        return snapshot_id
+
+    def delete(region, volume_id, snapshot_id):
+        ec2_client = get_credentials(aws_profile, region)
+        try:
+            ec2_client.delete_volume(VolumeId=volume_id, DryRun=dry_run)
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") == "DryRunOperation":
+                log_step(region, volume_id, "delete_dry_run", snapshot_id)
+            else:
+                log_step(region, volume_id, "delete_failed", snapshot_id, e)
+            return
+        log_step(region, volume_id, "volume_deleted", snapshot_id)
+
+    # Work out where each volume stands, resuming from the log of an earlier run
+    to_start = []
+    in_flight = {}
+    to_delete = []
+    # Snapshots of an earlier run that were given up without being in the error state; if they still
+    # cannot be found after the not found polls, a new snapshot of the volume is started
+    resumed_failures = set()
+    for row in volume_rows:
+        region, volume_id = row[0], row[1]
+        last_entry = last_steps.get(volume_id, {})
+        last_step = last_entry.get("step")
+
+        if last_step == "volume_deleted" or (last_step == "delete_dry_run" and dry_run):
+            continue
+        elif last_step == "snapshot_started":
+            in_flight[last_entry["snapshot_id"]] = (region, volume_id)
+        elif last_step == "snapshot_failed" and last_entry.get("snapshot_id") and last_entry.get("error") != "error":
+            in_flight[last_entry["snapshot_id"]] = (region, volume_id)
+            resumed_failures.add(last_entry["snapshot_id"])
+        elif last_step in ("snapshot_completed", "delete_failed", "delete_dry_run"):
+            to_delete.append((region, volume_id, last_steps[volume_id]["snapshot_id"]))
+        else:
+            to_start.append((region, volume_id))
+
+    poll_errors = {}
+    not_found_polls = {}
+    started_at = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        list(executor.map(lambda item: delete(*item), to_delete))
+
+        while to_start or in_flight:
+            # Top up the snapshots in flight
+            batch = to_start[:max(0, max_in_flight - len(in_flight))]
+            to_start = to_start[len(batch):]
+            for (region, volume_id), snapshot_id in zip(batch, executor.map(lambda item: start(*item), batch)):
+                if snapshot_id:
+                    in_flight[snapshot_id] = (region, volume_id)
+
+            if not in_flight:
+                continue
+
+            time.sleep(poll_interval)
+
+            # One describe_snapshots call per region (per batch of IDs) for every pending snapshot
+            snapshots_by_region = {}
+            for snapshot_id, (region, volume_id) in in_flight.items():
+                snapshots_by_region.setdefault(region, []).append(snapshot_id)
+
+            completed = []
+            for region, snapshot_ids in snapshots_by_region.items():
+                try:
+                    snapshot_states = get_snapshot_states(aws_profile, region, snapshot_ids)
+                except Exception as e:
+                    print(f"Error polling snapshots in region {region}: {e}")
+                    poll_errors[region] = poll_errors.get(region, 0) + 1
+                    if poll_errors[region] >= max_poll_errors:
+                        # Give up on the region instead of polling it forever
+                        for snapshot_id in snapshot_ids:
+                            log_step(region, in_flight.pop(snapshot_id)[1], "snapshot_failed", snapshot_id, f"polling failed: {e}")
+                    continue
+
+                poll_errors[region] = 0
+
+                for snapshot_id in snapshot_ids:
+                    state = snapshot_states.get(snapshot_id)
+                    volume_id = in_flight[snapshot_id][1]
+                    if state == "completed":
+                        log_step(region, volume_id, "snapshot_completed", snapshot_id)
+                        completed.append((region, volume_id, snapshot_id))
+                        del in_flight[snapshot_id]
+                    elif state == "error":
+                        log_step(region, volume_id, "snapshot_failed", snapshot_id, state)
+                        del in_flight[snapshot_id]
+                    elif state is None:
+                        not_found_polls[snapshot_id] = not_found_polls.get(snapshot_id, 0) + 1
+                        if not_found_polls[snapshot_id] < max_not_found_polls:
+                            continue
+                        del in_flight[snapshot_id]
+                        if snapshot_id in resumed_failures:
+                            # The snapshot of the earlier run really is gone, so the volume gets a new one
+                            to_start.append((region, volume_id))
+                        else:
+                            log_step(region, volume_id, "snapshot_failed", snapshot_id, "snapshot not found")
+
+            # Volumes are deleted as soon as their own snapshot is done
+            list(executor.map(lambda item: delete(*item), completed))
+
+            if max_wait is not None and time.monotonic() - started_at > max_wait:
+                # The log still says snapshot_started for these, so the next run resumes polling them
+                print(f"Stopped after {max_wait} seconds with {len(in_flight)} snapshots pending and {len(to_start)} volumes not started.")
+                break
+
+    return last_steps
\ No newline at end of file
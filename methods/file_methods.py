@@ -1,9 +1,12 @@
 from datetime import datetime
 import csv
+import json
+import os
 
 def write_to_csv(file_path, header, rows):
     """
     Write the instance details and tags to a CSV file.
+    Rows can be a generator, e.g. one of the collector iter_* functions; they are written as they arrive.
     
     :param file_path: Path where the CSV file will be saved.
     :param header: The header row to write in the CSV file.
@@ -14,6 +17,108 @@ def write_to_csv(file_path, header, rows):
         writer.writerow(header)  # Write the header row
         writer.writerows(rows)  # Write the data rows
 
+def collect_tag_keys(tagged_rows):
+    """
+    Collect the unique tag keys used by a list of tagged rows.
+
+    :param tagged_rows: List of (row, tags_dict) pairs.
+    :return: Sorted list of unique tag keys.
+    """
+    tag_keys = set()
+
+    for row, tags_dict in tagged_rows:
+        tag_keys.update(tags_dict)
+
+    return sorted(tag_keys)
+
+def layout_tag_columns(tagged_rows, tag_keys):
+    """
+    Lay out the tags of each tagged row as one column per tag key.
+
+    :param tagged_rows: Iterable of (row, tags_dict) pairs.
+    :param tag_keys: List of tag keys, in column order.
+    :return: Generator of rows with the tag values appended; missing tags are left empty.
+    """
+    for row, tags_dict in tagged_rows:
+        yield row + [tags_dict.get(key, '') for key in tag_keys]
+
+def write_tagged_rows_to_csv(file_path, header, tagged_rows):
+    """
+    Write tagged rows to a CSV file, adding one column per tag key found in the rows.
+
+    :param file_path: Path where the CSV file will be saved.
+    :param header: The header of the non-tag columns.
+    :param tagged_rows: List of (row, tags_dict) pairs.
+    :return: Sorted list of the tag keys written as columns.
+    """
+    tag_keys = collect_tag_keys(tagged_rows)
+
+    write_to_csv(file_path, header + tag_keys, layout_tag_columns(tagged_rows, tag_keys))
+
+    return tag_keys
+
+def stream_tagged_rows_to_csv(file_path, header, tagged_rows, failures = None, region_column = 0):
+    """
+    Write tagged rows to a CSV file as they arrive, without keeping them in memory.
+    Rows are first spilled to a temporary file with their tags as JSON; once the tag keys
+    are known the final file is written with one column per tag key.
+
+    :param file_path: Path where the CSV file will be saved.
+    :param header: The header of the non-tag columns.
+    :param tagged_rows: Iterable of (row, tags_dict) pairs, e.g. a collector generator.
+    :param failures: Optional dictionary of failed regions filled while tagged_rows is read, e.g. by
+                     iter_regions; the rows a region yielded before it failed are left out of the file,
+                     the same as fan_out_regions leaves failed regions out.
+    :param region_column: Index of the region in each row, or a tuple of indexes, see get_region_key.
+    :return: Sorted list of the tag keys written as columns.
+    """
+    spill_path = f"{file_path}.spill"
+    tag_keys = set()
+
+    try:
+        with open(spill_path, mode='w', newline='') as spill_file:
+            writer = csv.writer(spill_file)
+            for row, tags_dict in tagged_rows:
+                tag_keys.update(tags_dict)
+                writer.writerow(row + [json.dumps(tags_dict)])
+
+        tag_keys = sorted(tag_keys)
+
+        with open(spill_path, mode='r', newline='') as spill_file:
+            spilled_rows = (
+                (row[:-1], json.loads(row[-1])) for row in csv.reader(spill_file)
+                if not is_failed_region(get_region_key(row, region_column), failures)
+            )
+            write_to_csv(file_path, header + tag_keys, layout_tag_columns(spilled_rows, tag_keys))
+    finally:
+        if os.path.exists(spill_path):
+            os.remove(spill_path)
+
+    return tag_keys
+
+def get_region_key(row, region_column):
+    """
+    :param row: Report row.
+    :param region_column: Index of the region in the row, or a tuple of indexes such as (account, region).
+    :return: The region of the row, or a tuple of the values of the columns.
+    """
+    if isinstance(region_column, tuple):
+        return tuple(str(row[column]) for column in region_column)
+    return str(row[region_column])
+
+def is_failed_region(region_key, failures):
+    """
+    :param region_key: Region of a row as returned by get_region_key.
+    :param failures: Dictionary of failures keyed like region_key, e.g. {region: exception} or {(account, region): exception};
+                     for tuple keys a failure of the first value alone, e.g. a whole account, counts as well.
+    :return: True when the region of the row failed.
+    """
+    if not failures:
+        return False
+    if isinstance(region_key, tuple):
+        return region_key in failures or region_key[0] in failures
+    return region_key in failures
+
 def generate_output_filename(base_filename):
     """
     Generate a file name with the current date appended.
@@ -0,0 +1,196 @@
+import json
+from datetime import datetime, timezone
+
+# Filter spec fields that EC2 can evaluate server side, per resource type
+EC2_FILTER_NAMES = {
+    "instance": {
+        "states": "instance-state-name",
+        "instance_types": "instance-type",
+        "vpc_ids": "vpc-id"
+    },
+    "volume": {
+        "states": "status",
+        "volume_types": "volume-type"
+    }
+}
+
+# Timestamp compared against the launched_after/launched_before window, per resource type.
+# describe_* only supports wildcards on these, so the window is always checked client side.
+TIME_FIELDS = {
+    "instance": "LaunchTime",
+    "volume": "CreateTime"
+}
+
+def build_filter_spec(tags = None, tag_keys = None, states = None, instance_types = None, volume_types = None, vpc_ids = None, launched_after = None, launched_before = None):
+    """
+    Build a filter spec accepted by the EC2/EBS collectors.
+
+    :param tags: Dictionary of {tag key: value or list of values}; a resource must match every key.
+    :param tag_keys: List of tag keys a resource must carry, whatever the value.
+    :param states: Instance states (e.g. ["stopped"]) or volume states (e.g. ["available"]).
+    :param instance_types: Instance types, e.g. ["t3.micro"]; instances only.
+    :param volume_types: Volume types, e.g. ["gp2"]; volumes only.
+    :param vpc_ids: VPC IDs; instances only.
+    :param launched_after: Only resources launched (instances) or created (volumes) at or after this datetime.
+    :param launched_before: Only resources launched (instances) or created (volumes) before this datetime.
+    :return: Filter spec dictionary.
+    """
+    filter_spec = {
+        "tags": tags,
+        "tag_keys": tag_keys,
+        "states": states,
+        "instance_types": instance_types,
+        "volume_types": volume_types,
+        "vpc_ids": vpc_ids,
+        "launched_after": launched_after,
+        "launched_before": launched_before
+    }
+
+    return {name: value for name, value in filter_spec.items() if value is not None}
+
+def as_list(value):
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+def to_ec2_filters(filter_spec, resource_type):
+    """
+    Translate the server-side part of a filter spec into describe_* Filters.
+
+    :param filter_spec: Filter spec from build_filter_spec, or None.
+    :param resource_type: "instance" or "volume".
+    :return: List of EC2 filters.
+    """
+    filters = []
+    if not filter_spec:
+        return filters
+
+    filter_names = EC2_FILTER_NAMES[resource_type]
+
+    for name in ("instance_types", "volume_types", "vpc_ids"):
+        if name in filter_spec and name not in filter_names:
+            raise ValueError(f"Filter '{name}' does not apply to {resource_type} queries")
+
+    for name, filter_name in filter_names.items():
+        if name in filter_spec:
+            filters.append({'Name': filter_name, 'Values': as_list(filter_spec[name])})
+
+    for key, values in filter_spec.get("tags", {}).items():
+        filters.append({'Name': f"tag:{key}", 'Values': as_list(values)})
+
+    if filter_spec.get("tag_keys"):
+        # Values of a single filter are ORed, so each required key gets its own filter
+        for key in filter_spec["tag_keys"]:
+            filters.append({'Name': 'tag-key', 'Values': [key]})
+
+    return filters
+
+def filter_request_params(filter_spec, resource_type, extra_filters = None):
+    """
+    Build the describe_* request parameters for a filter spec.
+
+    :param filter_spec: Filter spec from build_filter_spec, or None.
+    :param resource_type: "instance" or "volume".
+    :param extra_filters: Filters the collector always applies, e.g. the available volume status.
+    :return: Dictionary with a Filters entry, or an empty dictionary when nothing is filtered.
+    """
+    filters = list(extra_filters or []) + to_ec2_filters(filter_spec, resource_type)
+
+    if not filters:
+        return {}
+
+    return {"Filters": filters}
+
+def matches_filter_spec(resource, filter_spec, resource_type):
+    """
+    Check the part of a filter spec that EC2 cannot evaluate server side.
+
+    :param resource: Instance or volume dictionary from describe_*.
+    :param filter_spec: Filter spec from build_filter_spec, or None.
+    :param resource_type: "instance" or "volume".
+    :return: True when the resource is inside the launch/create time window.
+    """
+    if not filter_spec:
+        return True
+
+    launched_after = filter_spec.get("launched_after")
+    launched_before = filter_spec.get("launched_before")
+    if launched_after is None and launched_before is None:
+        return True
+
+    resource_time = resource.get(TIME_FIELDS[resource_type])
+    if resource_time is None:
+        return False
+
+    if launched_after is not None and resource_time < as_utc(launched_after):
+        return False
+    if launched_before is not None and resource_time >= as_utc(launched_before):
+        return False
+
+    return True
+
+def as_utc(moment):
+    # AWS timestamps are timezone aware; naive datetimes given by callers are read as UTC
+    if isinstance(moment, datetime) and moment.tzinfo is None:
+        return moment.replace(tzinfo = timezone.utc)
+    return moment
+
+def normalize_filter_spec(filter_spec):
+    """
+    :param filter_spec: Filter spec from build_filter_spec, or None.
+    :return: Text that is the same for equal filter specs whatever the order of their values, e.g. to
+             keep the delta state of a filtered report apart; "" when nothing is filtered.
+    """
+    if not filter_spec:
+        return ""
+
+    normalized = {}
+    for name, value in filter_spec.items():
+        if name == "tags":
+            normalized[name] = {key: sorted(str(item) for item in as_list(values)) for key, values in value.items()}
+        elif isinstance(value, datetime):
+            normalized[name] = as_utc(value).isoformat()
+        else:
+            normalized[name] = sorted(str(item) for item in as_list(value))
+
+    return json.dumps(normalized, sort_keys = True)
+
+def add_filter_arguments(parser):
+    """
+    Add --tag, --state, --instance-type, --vpc-id, --launched-after and --launched-before switches to a script's argument parser.
+
+    :param parser: argparse.ArgumentParser of the script.
+    """
+    parser.add_argument("--tag", action = "append", default = [], metavar = "KEY=VALUE",
+                        help = "Only resources with this tag value (repeatable); KEY alone requires the tag key.")
+    parser.add_argument("--state", action = "append", default = None, help = "Only resources in this state (repeatable).")
+    parser.add_argument("--instance-type", action = "append", default = None, help = "Only instances of this type (repeatable).")
+    parser.add_argument("--vpc-id", action = "append", default = None, help = "Only instances in this VPC (repeatable).")
+    parser.add_argument("--launched-after", type = datetime.fromisoformat, default = None, help = "Only resources launched at or after this date (YYYY-MM-DD).")
+    parser.add_argument("--launched-before", type = datetime.fromisoformat, default = None, help = "Only resources launched before this date (YYYY-MM-DD).")
+
+def filter_spec_from_arguments(args):
+    """
+    Build a filter spec from arguments added by add_filter_arguments.
+
+    :param args: Parsed argparse namespace.
+    :return: Filter spec dictionary.
+    """
+    tags = {}
+    tag_keys = []
+    for tag in args.tag:
+        if "=" in tag:
+            key, value = tag.split("=", 1)
+            tags.setdefault(key, []).append(value)
+        else:
+            tag_keys.append(tag)
+
+    return build_filter_spec(
+        tags = tags or None,
+        tag_keys = tag_keys or None,
+        states = args.state,
+        instance_types = args.instance_type,
+        vpc_ids = args.vpc_id,
+        launched_after = args.launched_after,
+        launched_before = args.launched_before
+    )
@@ -1,124 +1,176 @@
-from methods.aws_methods import get_credentials
+from methods.aws_methods import paginate, fan_out_regions, iter_regions
+from methods.row_methods import VpcRow, RouteTableRow, LoadBalancerRow, SecurityGroupRow
 
 def get_vpcs(aws_profile, regions):
-    """Get all VPCs in the specified region."""
+    """Get all VPCs in the specified regions."""
     
-    vpc_details = []
-
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_vpcs")
-        for page in paginator.paginate():
-            for vpc in page['Vpcs']:
-                row = [
-                    region,
-                    vpc['VpcId'],
-                    vpc.get('CidrBlock', 'N/A'),
-                    vpc.get('IsDefault', 'N/A'),
-                    vpc.get('Tags', [])
-                ]
-                vpc_details.append(row)
+    vpc_details = fan_out_regions(get_vpcs_in_region, aws_profile, regions)
+
+    return vpc_details
+
+def get_vpcs_in_region(aws_profile, region):
+    """Get all VPCs in a single region."""
+
+    vpc_details = list(iter_vpcs_in_region(aws_profile, region))
+
     return vpc_details
 
+def iter_vpcs_in_region(aws_profile, region):
+    """Yield all VPCs in a single region."""
+
+    for page in paginate(aws_profile, region, "describe_vpcs"):
+        for vpc in page['Vpcs']:
+            row = VpcRow(
+                region,
+                vpc['VpcId'],
+                vpc.get('CidrBlock', 'N/A'),
+                vpc.get('IsDefault', 'N/A'),
+                vpc.get('Tags', [])
+            )
+            yield row
+
+def iter_vpcs(aws_profile, regions):
+    """Yield all VPCs in the specified regions, one region after the other, without holding them in memory."""
+
+    return iter_regions(iter_vpcs_in_region, aws_profile, regions)
+
 def get_route_tables(aws_profile, regions):
-    """Get all VPCs in the specified region."""
+    """Get all route tables in the specified regions."""
     
-    rt_tables_details = []
-
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_route_tables")
-        for page in paginator.paginate():
-            for tables in page['RouteTables']:
-                main_route_table = "N/A"  # Default value
-                subnets = []  # List to hold all associated subnets for the route table
-
-                # Loop through Associations to check for Main route table and gather subnet info
-                for association in tables.get('Associations', []):
-                    if association.get("Main"):
-                        main_route_table = "Yes"  # Mark as main route table
-                    subnet = association.get("SubnetId")
-                    if subnet:
-                        subnets.append(subnet)  # Collect associated subnets
-
-                # Process each route for the route table
-                for routes in tables['Routes']:
-                    destination = (
-                        routes.get("DestinationCidrBlock") or
-                        routes.get("DestinationIpv6CidrBlock") or
-                        routes.get("DestinationPrefixListId") or
-                        "N/A"
-                    )
-
-                    # Getting target with OR conditions
-                    target = (
-                        routes.get("EgressOnlyInternetGatewayId") or
-                        routes.get("GatewayId") or
-                        routes.get("InstanceId") or
-                        routes.get("NatGatewayId") or
-                        routes.get("TransitGatewayId") or
-                        routes.get("LocalGatewayId") or
-                        routes.get("CarrierGatewayId") or
-                        routes.get("NetworkInterfaceId") or
-                        routes.get("VpcPeeringConnectionId") or
-                        routes.get("CoreNetworkArn") or
-                        "N/A"
-                    )
-
-                    state = routes.get("State", "N/A")
-
-                    # Add a new row for each route
-                    row = [
-                        region,
-                        tables["VpcId"],
-                        tables["RouteTableId"],
-                        destination,
-                        target,
-                        state,
-                        tables.get("OwnerId", "N/A"),  # AWS Account Owner
-                        main_route_table,  # Whether it's the main route table for the VPC
-                        ",".join(subnets) if subnets else "N/A"  # Associated Subnets (comma-separated)
-                    ]
-                    rt_tables_details.append(row)
+    rt_tables_details = fan_out_regions(get_route_tables_in_region, aws_profile, regions)
 
     return rt_tables_details
 
-def get_load_balancers(aws_profile, regions):
-    """Get all load balancers (ALB and NLB) in the specified region."""
-    elb_details = []
-
-    for region in regions:
-        elb_client = get_credentials(aws_profile, region, service="elbv2")
-        paginator = elb_client.get_paginator("describe_load_balancers")
-        for page in paginator.paginate():
-            for lb in page['LoadBalancers']:
-                row = [
+def get_route_tables_in_region(aws_profile, region):
+    """Get all route tables in a single region, one row per route."""
+
+    rt_tables_details = list(iter_route_tables_in_region(aws_profile, region))
+
+    return rt_tables_details
+
+def iter_route_tables_in_region(aws_profile, region):
+    """Yield all route tables in a single region, one row per route."""
+
+    for page in paginate(aws_profile, region, "describe_route_tables"):
+        for tables in page['RouteTables']:
+            main_route_table = "N/A"  # Default value
+            subnets = []  # List to hold all associated subnets for the route table
+
+            # Loop through Associations to check for Main route table and gather subnet info
+            for association in tables.get('Associations', []):
+                if association.get("Main"):
+                    main_route_table = "Yes"  # Mark as main route table
+                subnet = association.get("SubnetId")
+                if subnet:
+                    subnets.append(subnet)  # Collect associated subnets
+
+            # Process each route for the route table
+            for routes in tables['Routes']:
+                destination = (
+                    routes.get("DestinationCidrBlock") or
+                    routes.get("DestinationIpv6CidrBlock") or
+                    routes.get("DestinationPrefixListId") or
+                    "N/A"
+                )
+
+                # Getting target with OR conditions
+                target = (
+                    routes.get("EgressOnlyInternetGatewayId") or
+                    routes.get("GatewayId") or
+                    routes.get("InstanceId") or
+                    routes.get("NatGatewayId") or
+                    routes.get("TransitGatewayId") or
+                    routes.get("LocalGatewayId") or
+                    routes.get("CarrierGatewayId") or
+                    routes.get("NetworkInterfaceId") or
+                    routes.get("VpcPeeringConnectionId") or
+                    routes.get("CoreNetworkArn") or
+                    "N/A"
+                )
+
+                state = routes.get("State", "N/A")
+
+                # Add a new row for each route
+                row = RouteTableRow(
                     region,
-                    lb['LoadBalancerName'],
-                    lb['DNSName'],
-                    lb['CreatedTime'],
-                    lb['Type'],
-                    lb['State']['Code'],
-                    lb.get('Tags', [])
-                ]
-                elb_details.append(row)
+                    tables["VpcId"],
+                    tables["RouteTableId"],
+                    destination,
+                    target,
+                    state,
+                    tables.get("OwnerId", "N/A"),  # AWS Account Owner
+                    main_route_table,  # Whether it's the main route table for the VPC
+                    ",".join(subnets) if subnets else "N/A"  # Associated Subnets (comma-separated)
+                )
+                yield row
+
+def iter_route_tables(aws_profile, regions):
+    """Yield all route tables in the specified regions, one row per route, without holding them in memory."""
+
+    return iter_regions(iter_route_tables_in_region, aws_profile, regions)
+
+def get_load_balancers(aws_profile, regions):
+    """Get all load balancers (ALB and NLB) in the specified regions."""
+    elb_details = fan_out_regions(get_load_balancers_in_region, aws_profile, regions)
+
     return elb_details
 
+def get_load_balancers_in_region(aws_profile, region):
+    """Get all load balancers (ALB and NLB) in a single region."""
+
+    elb_details = list(iter_load_balancers_in_region(aws_profile, region))
+
+    return elb_details
+
+def iter_load_balancers_in_region(aws_profile, region):
+    """Yield all load balancers (ALB and NLB) in a single region."""
+
+    for page in paginate(aws_profile, region, "describe_load_balancers", service = "elbv2"):
+        for lb in page['LoadBalancers']:
+            row = LoadBalancerRow(
+                region,
+                lb['LoadBalancerName'],
+                lb['DNSName'],
+                lb['CreatedTime'],
+                lb['Type'],
+                lb['State']['Code'],
+                lb.get('Tags', [])
+            )
+            yield row
+
+def iter_load_balancers(aws_profile, regions):
+    """Yield all load balancers (ALB and NLB) in the specified regions without holding them in memory."""
+
+    return iter_regions(iter_load_balancers_in_region, aws_profile, regions)
+
 def get_security_groups(aws_profile, regions):
-    """Get all security groups in the specified region."""
-    sg_details = []
-
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_security_groups")
-        for page in paginator.paginate():
-            for sg in page['SecurityGroups']:
-                row = [
-                    region,
-                    sg['GroupId'],
-                    sg['GroupName'],
-                    sg['Description'],
-                    sg.get('Tags', [])
-                ]
-            sg_details.append(row)
-    return sg_details
\ No newline at end of file
+    """Get all security groups in the specified regions."""
+    sg_details = fan_out_regions(get_security_groups_in_region, aws_profile, regions)
+
+    return sg_details
+
+def get_security_groups_in_region(aws_profile, region):
+    """Get all security groups in a single region."""
+
+    sg_details = list(iter_security_groups_in_region(aws_profile, region))
+
+    return sg_details
+
+def iter_security_groups_in_region(aws_profile, region):
+    """Yield all security groups in a single region."""
+
+    for page in paginate(aws_profile, region, "describe_security_groups"):
+        for sg in page['SecurityGroups']:
+            row = SecurityGroupRow(
+                region,
+                sg['GroupId'],
+                sg['GroupName'],
+                sg['Description'],
+                sg.get('Tags', [])
+            )
+            yield row
+
+def iter_security_groups(aws_profile, regions):
+    """Yield all security groups in the specified regions without holding them in memory."""
+
+    return iter_regions(iter_security_groups_in_region, aws_profile, regions)
\ No newline at end of file
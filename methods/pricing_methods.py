@@ -0,0 +1,254 @@
+import mmap
+import os
+import struct
+import threading
+from methods.cache_methods import DEFAULT_CACHE_DIR
+
+# Default location of the compiled price catalog, can be overridden with AWS_PRICE_CATALOG
+DEFAULT_PRICE_CATALOG = os.path.join(DEFAULT_CACHE_DIR, "price_catalog.bin")
+
+price_catalog_settings = {
+    "path": os.environ.get("AWS_PRICE_CATALOG", DEFAULT_PRICE_CATALOG)
+}
+
+# Catalog file layout: header, then fixed-width records sorted by key so lookups can bisect the mapped file
+#   header: magic, format version, key width, record count
+#   record: key padded with NUL bytes, price in USD per unit (GB-month for storage, hour for instances)
+CATALOG_MAGIC = b"AWSPRICE"
+CATALOG_VERSION = 1
+CATALOG_KEY_WIDTH = 88
+CATALOG_HEADER = struct.Struct("<8sIII")
+CATALOG_RECORD = struct.Struct(f"<{CATALOG_KEY_WIDTH}sd")
+
+# Separator of the key parts: kind, region, name (volume type, snapshot tier or instance type), operating system
+KEY_SEPARATOR = "\x1f"
+
+# Opened catalogs by path; the mapped file is shared by every thread of the process
+catalog_pool = {}
+catalog_lock = threading.Lock()
+
+def configure_price_catalog(path = None):
+    """
+    Select the compiled price catalog used by the cost functions.
+
+    :param path: Catalog file written by compile_price_catalog; defaults to AWS_PRICE_CATALOG or price_catalog.bin in the cache directory.
+    """
+    if path is not None:
+        price_catalog_settings["path"] = path
+
+def encode_price_key(kind, region, name, operating_system = ""):
+    """
+    :return: Catalog key of a price, padded to the record key width.
+    """
+    key = KEY_SEPARATOR.join([kind, region, name, operating_system]).encode("utf-8")
+    if len(key) > CATALOG_KEY_WIDTH:
+        raise ValueError(f"Price key too long for the catalog: {key!r}")
+
+    return key.ljust(CATALOG_KEY_WIDTH, b"\0")
+
+class PriceCatalog:
+    """
+    Read-only view of a compiled price catalog. The file is memory mapped and searched
+    with a binary search, so a lookup touches a few pages instead of loading the catalog.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as catalog_file:
+            self.data = mmap.mmap(catalog_file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        magic, version, key_width, self.record_count = CATALOG_HEADER.unpack_from(self.data, 0)
+        if magic != CATALOG_MAGIC or version != CATALOG_VERSION or key_width != CATALOG_KEY_WIDTH:
+            self.data.close()
+            raise ValueError(f"'{path}' is not a price catalog of this version, compile it again with compile_price_catalog")
+
+    def lookup(self, kind, region, name, operating_system = ""):
+        """
+        Find a single price.
+
+        :param kind: "volume", "snapshot" or "instance".
+        :param region: Region name, e.g. "eu-west-1".
+        :param name: Volume type ("gp3"), snapshot tier ("standard", "archive") or instance type ("m5.large").
+        :param operating_system: Operating system of instance prices, e.g. "Linux" or "Windows".
+        :return: On-demand price in USD per GB-month or per hour, or None when the catalog has no price for the key.
+        """
+        key = encode_price_key(kind, region, name, operating_system)
+
+        low, high = 0, self.record_count
+        while low < high:
+            middle = (low + high) // 2
+            offset = CATALOG_HEADER.size + middle * CATALOG_RECORD.size
+            if self.data[offset:offset + CATALOG_KEY_WIDTH] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.record_count:
+            record_key, price = CATALOG_RECORD.unpack_from(self.data, CATALOG_HEADER.size + low * CATALOG_RECORD.size)
+            if record_key == key:
+                return price
+
+        return None
+
+    def close(self):
+        self.data.close()
+
+class CatalogPriceTable:
+    """
+    Price table for methods.cost_methods backed by the catalog: get((region, key), default) reads
+    the catalog and falls back to a price dictionary for the prices the catalog does not have.
+    """
+
+    def __init__(self, catalog, kind, fallback):
+        self.catalog = catalog
+        self.kind = kind
+        self.fallback = fallback
+
+    def get(self, region_key, default = None):
+        region, key = region_key
+        price = self.catalog.lookup(self.kind, region, key) if region != "*" else None
+        if price is None:
+            return self.fallback.get(region_key, default)
+
+        return price
+
+def get_price_catalog():
+    """
+    :return: The configured PriceCatalog, opened on first use, or None when no catalog was compiled.
+    """
+    path = price_catalog_settings["path"]
+
+    with catalog_lock:
+        catalog = catalog_pool.get(path)
+        if catalog is None and path and os.path.exists(path):
+            catalog = catalog_pool[path] = PriceCatalog(path)
+
+    return catalog
+
+def get_instance_price(region, instance_type, operating_system = "Linux"):
+    """
+    :return: On-demand hourly price of a shared tenancy instance, or None when there is no catalog or no such price.
+    """
+    catalog = get_price_catalog()
+    if catalog is None:
+        return None
+
+    return catalog.lookup("instance", region, instance_type, operating_system)
+
+def get_offer_price_key(product):
+    """
+    Map a product of an AWS Price List offer file to its catalog key.
+
+    :param product: Product dictionary of the offer file's "products" section.
+    :return: Tuple of (kind, region, name, operating system), or None for products the catalog does not hold.
+    """
+    attributes = product.get("attributes", {})
+    region = attributes.get("regionCode")
+    if not region:
+        return None
+
+    product_family = product.get("productFamily")
+
+    if product_family == "Storage" and attributes.get("volumeApiName"):
+        return ("volume", region, attributes["volumeApiName"], "")
+
+    if product_family == "Storage Snapshot" and attributes.get("usagetype", "").endswith("EBS:SnapshotUsage"):
+        return ("snapshot", region, "standard", "")
+
+    if product_family == "Storage Snapshot" and attributes.get("usagetype", "").endswith("EBS:SnapshotArchiveStorage"):
+        return ("snapshot", region, "archive", "")
+
+    if (product_family == "Compute Instance" and attributes.get("tenancy") == "Shared"
+            and attributes.get("preInstalledSw") == "NA" and attributes.get("capacitystatus") == "Used"
+            and attributes.get("licenseModel") != "Bring your own license"):
+        return ("instance", region, attributes.get("instanceType", ""), attributes.get("operatingSystem", ""))
+
+    return None
+
+def get_on_demand_price(offer_terms):
+    """
+    :param offer_terms: On-demand terms of one SKU, {offer term code: term}.
+    :return: USD price of the first price dimension, or None when it has none.
+    """
+    for term in offer_terms.values():
+        for dimension in term.get("priceDimensions", {}).values():
+            usd_price = dimension.get("pricePerUnit", {}).get("USD")
+            if usd_price is not None:
+                return float(usd_price)
+
+    return None
+
+def compile_price_catalog(offer_paths, output_path = None):
+    """
+    Compile AWS Price List bulk offer files (e.g. the AmazonEC2 offer, which also holds the EBS prices)
+    into a price catalog. The JSON is streamed, so multi-GB files are compiled without being loaded:
+    a first pass keeps the SKUs of EBS volume, snapshot and shared tenancy instance products, a second
+    pass reads their on-demand prices. When several products map to the same key the lowest price is kept.
+
+    :param offer_paths: List of offer file paths, downloaded from the Price List bulk API.
+    :param output_path: Catalog file to write; defaults to the configured catalog path.
+    :return: Number of prices in the catalog.
+    """
+    try:
+        import ijson
+    except ImportError:
+        raise ImportError("Compiling the price catalog needs the ijson package to stream the offer files (pip install ijson)") from None
+
+    if output_path is None:
+        output_path = price_catalog_settings["path"]
+
+    prices = {}
+
+    for offer_path in offer_paths:
+        sku_keys = {}
+        with open(offer_path, "rb") as offer_file:
+            for sku, product in ijson.kvitems(offer_file, "products"):
+                price_key = get_offer_price_key(product)
+                if price_key is not None:
+                    sku_keys[sku] = encode_price_key(*price_key)
+
+        with open(offer_path, "rb") as offer_file:
+            for sku, offer_terms in ijson.kvitems(offer_file, "terms.OnDemand"):
+                key = sku_keys.get(sku)
+                if key is None:
+                    continue
+
+                price = get_on_demand_price(offer_terms)
+                if price is not None and (key not in prices or price < prices[key]):
+                    prices[key] = price
+
+    output_directory = os.path.dirname(output_path)
+    if output_directory:
+        os.makedirs(output_directory, exist_ok = True)
+
+    # Written next to the catalog and renamed, so running reports never map a half written file
+    temporary_path = f"{output_path}.tmp"
+    with open(temporary_path, "wb") as catalog_file:
+        catalog_file.write(CATALOG_HEADER.pack(CATALOG_MAGIC, CATALOG_VERSION, CATALOG_KEY_WIDTH, len(prices)))
+        for key in sorted(prices):
+            catalog_file.write(CATALOG_RECORD.pack(key, prices[key]))
+    os.replace(temporary_path, output_path)
+
+    with catalog_lock:
+        catalog = catalog_pool.pop(output_path, None)
+    if catalog is not None:
+        catalog.close()
+
+    return len(prices)
+
+def add_price_catalog_arguments(parser):
+    """
+    Add the --price-catalog switch to a script's argument parser.
+
+    :param parser: argparse.ArgumentParser of the script.
+    """
+    parser.add_argument("--price-catalog", default = None,
+                        help = "Compiled price catalog (python -m methods compile-prices); defaults to AWS_PRICE_CATALOG or the cache directory.")
+
+def apply_price_catalog_arguments(args):
+    """
+    Configure the price catalog from arguments added by add_price_catalog_arguments.
+
+    :param args: Parsed argparse namespace.
+    """
+    configure_price_catalog(args.price_catalog)
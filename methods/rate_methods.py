@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+
+# Retry settings for every pooled client: standard mode retries throttles with exponential backoff and jitter.
+# Not adaptive mode, whose own client-side rate limiter would back off a second time on top of the shared buckets.
+RETRY_CONFIG = {"mode": "standard", "max_attempts": 5}
+
+# Starting requests per second, burst size and floor per (account, region, API family).
+# Read-only calls (Describe/List/Get) get a larger share than mutating ones, like the EC2 request quotas.
+RATE_LIMITS = {
+    "read": {"rate": 20.0, "burst": 50.0, "min_rate": 1.0, "max_rate": 100.0},
+    "write": {"rate": 5.0, "burst": 10.0, "min_rate": 0.5, "max_rate": 20.0}
+}
+
+# Requests per second regained for every second of traffic without throttling
+RATE_STEP = 1.0
+
+# Seconds after a throttle during which further throttles do not lower the rate again
+THROTTLE_COOLDOWN = 1.0
+
+THROTTLE_ERROR_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException",
+    "RequestLimitExceeded", "TooManyRequestsException", "RequestThrottled", "SlowDown",
+    "ProvisionedThroughputExceededException", "BandwidthLimitExceeded", "EC2ThrottledException",
+    "PriorRequestNotComplete"
+}
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts to throttling: it halves when AWS throttles a request
+    and grows back slowly while requests succeed (additive increase, multiplicative decrease).
+    """
+
+    def __init__(self, rate, burst, min_rate, max_rate):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.last_throttle = 0.0
+        self.throttle_count = 0
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+        """
+        while True:
+            with self.lock:
+                self.refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            # Jitter keeps waiting threads from waking up and retrying in lockstep
+            time.sleep(wait * random.uniform(1.0, 1.5))
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + RATE_STEP / self.rate)
+
+    def on_throttle(self):
+        with self.lock:
+            self.throttle_count += 1
+            now = time.monotonic()
+            if now - self.last_throttle < THROTTLE_COOLDOWN:
+                return
+            self.last_throttle = now
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+
+# One bucket per (account, region, service, API family), shared by every client and thread
+rate_buckets = {}
+rate_buckets_lock = threading.Lock()
+
+def get_api_family(operation_name):
+    """
+    :param operation_name: API operation name, e.g. "DescribeInstances".
+    :return: "read" for Describe/List/Get calls, "write" for everything else.
+    """
+    if operation_name.startswith(("Describe", "List", "Get", "Head")):
+        return "read"
+    return "write"
+
+def get_rate_bucket(account, region, service, family):
+    """
+    Get the shared token bucket of an (account, region, service, API family), creating it on first use.
+
+    :return: TokenBucket instance.
+    """
+    key = (account, region, service, family)
+
+    with rate_buckets_lock:
+        bucket = rate_buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(**RATE_LIMITS[family])
+            rate_buckets[key] = bucket
+
+    return bucket
+
+def configure_rate_limits(family, rate = None, burst = None, min_rate = None, max_rate = None):
+    """
+    Change the starting rate limits of an API family. Buckets already in use keep their current rate.
+
+    :param family: "read" or "write".
+    :param rate: Starting requests per second.
+    :param burst: Number of requests that may be sent at once after an idle period.
+    :param min_rate: Lowest rate throttling can push the bucket down to.
+    :param max_rate: Highest rate the bucket grows back to.
+    """
+    settings = {"rate": rate, "burst": burst, "min_rate": min_rate, "max_rate": max_rate}
+
+    for name, value in settings.items():
+        if value is not None:
+            RATE_LIMITS[family][name] = value
+
+def is_throttle_response(response, caught_exception):
+    """
+    :param response: (http_response, parsed_response) tuple from botocore, or None.
+    :param caught_exception: Exception raised while sending the request, or None.
+    :return: True when AWS throttled the request.
+    """
+    if caught_exception is not None:
+        # Errors raised instead of returned carry their code in .response, e.g. ClientError
+        error_response = getattr(caught_exception, "response", None)
+        if isinstance(error_response, dict):
+            error_code = error_response.get("Error", {}).get("Code", "")
+        else:
+            error_code = type(caught_exception).__name__
+    elif response is not None:
+        error_code = response[1].get("Error", {}).get("Code", "")
+    else:
+        return False
+
+    return error_code in THROTTLE_ERROR_CODES
+
+def attach_rate_limiter(service_client, account, region, service):
+    """
+    Route every request attempt of a client through the shared token buckets.
+
+    :param service_client: boto3 client.
+    :param account: Account key of the buckets, e.g. the AWS CLI profile name.
+    :param region: Region of the client.
+    :param service: Client service name.
+    """
+    def before_send(event_name = "", **kwargs):
+        # Event names look like "before-send.ec2.DescribeInstances"
+        operation_name = event_name.rsplit(".", 1)[-1]
+        get_rate_bucket(account, region, service, get_api_family(operation_name)).acquire()
+
+    def needs_retry(response = None, caught_exception = None, operation = None, **kwargs):
+        bucket = get_rate_bucket(account, region, service, get_api_family(operation.name))
+        if is_throttle_response(response, caught_exception):
+            bucket.on_throttle()
+        elif caught_exception is None:
+            bucket.on_success()
+        # Returning None leaves the retry decision to botocore's retry handler
+
+    events = service_client.meta.events
+    events.register("before-send", before_send)
+    events.register_first("needs-retry", needs_retry)
+
+def get_rate_summary():
+    """
+    :return: List of (account, region, service, family, current rate, throttle count) for every bucket in use.
+    """
+    with rate_buckets_lock:
+        return [key + (round(bucket.rate, 2), bucket.throttle_count) for key, bucket in sorted(rate_buckets.items())]
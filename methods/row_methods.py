@@ -0,0 +1,158 @@
+class Row:
+    """
+    Compact report row with one slot per column instead of a positional list.
+
+    Subclasses list their columns in fields (also used as __slots__) and the matching CSV header.
+    Rows still behave like sequences where the writers need it: iterating, indexing and
+    concatenating with a list give the column values in header order, followed by the
+    enrichment values set by a ColumnRegistry.
+    """
+
+    __slots__ = ("extra",)
+    fields = ()
+    header = ()
+
+    def __init__(self, *values):
+        if len(values) != len(self.fields):
+            raise TypeError(f"{type(self).__name__} takes {len(self.fields)} values, got {len(values)}")
+
+        for name, value in zip(self.fields, values):
+            setattr(self, name, value)
+        self.extra = ()
+
+    def values(self):
+        """
+        :return: List of the column values followed by the enrichment values.
+        """
+        return [getattr(self, name) for name in self.fields] + list(self.extra)
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def __len__(self):
+        return len(self.fields) + len(self.extra)
+
+    def __getitem__(self, index):
+        if isinstance(index, int) and 0 <= index < len(self.fields):
+            return getattr(self, self.fields[index])
+        return self.values()[index]
+
+    def __add__(self, other):
+        return self.values() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.values()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(repr(value) for value in self.values())})"
+
+class InstanceRow(Row):
+    __slots__ = fields = (
+        "region", "instance_id", "instance_type", "state", "launch_time", "image_id", "vpc_id",
+        "subnet_id", "private_ip_address", "public_ip_address", "total_ebs_size"
+    )
+    header = [
+        "Region", "InstanceId", "InstanceType", "Instance_State", "LaunchTime", "ImageId", "VpcId",
+        "SubnetId", "PrivateIpAddress", "PublicIpAddress", "Total_EBS_Size_GiB"
+    ]
+
+class VolumeRow(Row):
+    __slots__ = fields = ("region", "volume_id", "volume_type", "size", "encrypted", "state", "snapshot_id", "create_time")
+    header = ["Region", "Volume_ID", "Volume_Type", "Size", "Encrypted", "State", "Snapshot_Id", "CreateTime"]
+
+class VpcRow(Row):
+    __slots__ = fields = ("region", "vpc_id", "cidr_block", "is_default", "tags")
+    header = ["Region", "VPCId", "CidrBlock", "IsDefault", "Tags"]
+
+class RouteTableRow(Row):
+    __slots__ = fields = ("region", "vpc_id", "route_table_id", "destination", "target", "state", "owner_id", "main", "subnets")
+    header = ["Region", "VpcId", "RouteTableId", "destination", "target", "State", "RTable_Owner", "Main", "Linked_Subnets"]
+
+class SecurityGroupRow(Row):
+    __slots__ = fields = ("region", "group_id", "group_name", "description", "tags")
+    header = ["Region", "GroupId", "GroupName", "Description", "Tags"]
+
+class LoadBalancerRow(Row):
+    __slots__ = fields = ("region", "name", "dns_name", "created_time", "type", "state", "tags")
+    header = ["Region", "LoadBalancerName", "DNSName", "CreatedTime", "Type", "State", "Tags"]
+
+class LambdaFunctionRow(Row):
+    __slots__ = fields = (
+        "region", "function_name", "runtime", "handler", "role", "code_size", "description",
+        "timeout", "memory_size", "last_modified", "tags"
+    )
+    header = ["Region", "FunctionName", "Runtime", "Handler", "Role", "CodeSize", "Description", "Timeout", "MemorySize", "LastModified", "Tags"]
+
+class ColumnRegistry:
+    """
+    Enrichment columns added to the rows of a report after collection, e.g. snapshot and cost
+    estimates for volumes. Each column is computed by a function called as compute(row, values),
+    where values holds the columns of the same row computed so far, in registration order.
+    Batch columns are computed for all rows at once, see register_batch.
+    """
+
+    def __init__(self, row_type):
+        self.row_type = row_type
+        self.columns = []
+
+    def register(self, name, compute):
+        """
+        Add an enrichment column after the ones already registered.
+
+        :param name: Column name in the CSV header.
+        :param compute: Function called as compute(row, values) returning the column value.
+        """
+        self.columns.append(((name,), compute, False))
+
+    def register_batch(self, names, compute):
+        """
+        Add enrichment columns that are computed for every row in one call, e.g. vectorized cost estimates.
+
+        :param names: Column names in the CSV header.
+        :param compute: Function called as compute(rows, columns), where columns is {name: list of values per row}
+                        of the columns computed so far, returning one sequence of values per row for each name.
+        """
+        self.columns.append((tuple(names), compute, True))
+
+    @property
+    def header(self):
+        """
+        :return: Header of the base columns followed by the enrichment columns.
+        """
+        return list(self.row_type.header) + [name for names, compute, batch in self.columns for name in names]
+
+    def enrich(self, row):
+        """
+        Compute every registered column for a row and store the values on it.
+
+        :param row: Row of the registry's row type.
+        :return: The same row.
+        """
+        self.enrich_rows([row])
+
+        return row
+
+    def enrich_rows(self, rows):
+        """
+        Compute every registered column for a list of rows and store the values on them.
+        Row columns are computed row by row, batch columns once for all rows.
+
+        :param rows: List of rows of the registry's row type.
+        :return: The same rows.
+        """
+        columns = {}
+        for names, compute, batch in self.columns:
+            if batch:
+                for name, column_values in zip(names, compute(rows, columns)):
+                    columns[name] = list(column_values)
+            else:
+                column_values = []
+                for index, row in enumerate(rows):
+                    values = {name: columns[name][index] for name in columns}
+                    column_values.append(compute(row, values))
+                columns[names[0]] = column_values
+
+        for index, row in enumerate(rows):
+            row.extra = tuple(columns[name][index] for name in columns)
+
+        return rows
@@ -1,27 +1,67 @@
-from methods.aws_methods import get_credentials
-def get_s3_buckets(aws_profile):
-    """Get S3 buckets in a given region"""
+from concurrent.futures import ThreadPoolExecutor
+from methods.aws_methods import get_credentials, paginate
+
+# Number of buckets whose tags are read at the same time
+MAX_BUCKET_WORKERS = 16
+
+def get_s3_buckets(aws_profile, max_workers = MAX_BUCKET_WORKERS):
+    """
+    Get all S3 buckets of the account with their tags.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param max_workers: Number of buckets whose tags are read at the same time.
+    :return: List of rows with bucket region, name, creation date and tags.
+    """
+    buckets = []
 
-    s3_client = get_credentials(aws_profile, service="s3")
-    s3_data = []
-    
     # List all buckets in the account
-    buckets = s3_client.list_buckets()["Buckets"]
-    
-    for bucket in buckets:
-        region = bucket.get("BucketRegion")
-        bucket_name = bucket.get("Name", '')
-        creation_date = bucket.get("CreationDate", '')
-
-        
-        # Get tags associated with each bucket
-        try:
-            tags = s3_client.get_bucket_tagging(Bucket=bucket_name)["TagSet"]
-            tags_dict = {tag["Key"]: tag["Value"] for tag in tags}
-            tags_str = ', '.join(f"{key}={value}" for key, value in tags_dict.items())
-        except s3_client.exceptions.ClientError as e:
-            tags_str = "No tags available"
-
-        s3_data.append([region, bucket_name, creation_date, tags_str])
+    for page in paginate(aws_profile, "us-east-1", "list_buckets", service = "s3"):
+        buckets.extend(page["Buckets"])
+
+    # Get tags associated with each bucket, each through a client of the bucket's own region
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        s3_data = list(executor.map(lambda bucket: get_s3_bucket_row(aws_profile, bucket), buckets))
     
-    return s3_data
\ No newline at end of file
+    return s3_data
+
+def get_s3_bucket_row(aws_profile, bucket):
+    """
+    Build the report row of a single bucket.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param bucket: Bucket dictionary from list_buckets.
+    :return: Row with bucket region, name, creation date and tags.
+    """
+    bucket_name = bucket.get("Name", '')
+    creation_date = bucket.get("CreationDate", '')
+    region = bucket.get("BucketRegion") or get_s3_bucket_region(aws_profile, bucket_name)
+
+    # Pooled client of the bucket's region, so the request is not redirected from us-east-1
+    s3_client = get_credentials(aws_profile, region, service = "s3")
+
+    try:
+        tags = s3_client.get_bucket_tagging(Bucket=bucket_name)["TagSet"]
+        tags_dict = {tag["Key"]: tag["Value"] for tag in tags}
+        tags_str = ', '.join(f"{key}={value}" for key, value in tags_dict.items())
+    except s3_client.exceptions.ClientError:
+        tags_str = "No tags available"
+
+    return [region, bucket_name, creation_date, tags_str]
+
+def get_s3_bucket_region(aws_profile, bucket_name):
+    """
+    Look up the region of a bucket when list_buckets did not return BucketRegion.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param bucket_name: Name of the bucket.
+    :return: Region name of the bucket.
+    """
+    s3_client = get_credentials(aws_profile, service = "s3")
+
+    try:
+        location = s3_client.get_bucket_location(Bucket=bucket_name).get("LocationConstraint")
+    except s3_client.exceptions.ClientError:
+        return "us-east-1"
+
+    # Buckets in us-east-1 report no location constraint
+    return location or "us-east-1"
\ No newline at end of file
@@ -1,37 +1,107 @@
-from methods.aws_methods import get_credentials
-
-def get_all_lambda_functions(aws_profile, regions):
-
-
-    lambda_details = []
-
-    for region in regions:
-        lambda_client = get_credentials(aws_profile, region, service= "lambda")
-        paginator = lambda_client.get_paginator('list_functions')
-        
-        page_iterator = paginator.paginate()
-        
-        for page in page_iterator:
-            for function in page['Functions']:
-                function_arn = function['FunctionArn']
-                function_details = lambda_client.get_function(FunctionName=function_arn)
-                
-                tags = lambda_client.list_tags(Resource=function_arn).get('Tags', {})
-                
-                row = {
-                    region,
-                    function['FunctionName'],
-                    function['Runtime'],
-                    function['Handler'],
-                    function['Role'],
-                    function['CodeSize'],
-                    function.get('Description', 'N/A'),
-                    function['Timeout'],
-                    function['MemorySize'],
-                    function['LastModified'],
-                    tags
-                }
-                
-                lambda_details.append(row)
+from concurrent.futures import ThreadPoolExecutor
+from methods.aws_methods import get_credentials, paginate, fan_out_regions, iter_regions
+from methods.row_methods import LambdaFunctionRow
+
+# Threads used per region when tags have to be read function by function
+MAX_TAG_WORKERS = 8
+
+def get_all_lambda_functions(aws_profile, regions, include_tags = True):
+    """
+    Get all Lambda functions in the specified regions.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param include_tags: Fetch the function tags; False skips every tag call.
+    :return: List of rows with function details.
+    """
+    lambda_details = fan_out_regions(get_lambda_functions_in_region, aws_profile, regions, include_tags)
     
-    return lambda_details
\ No newline at end of file
+    return lambda_details
+
+def get_lambda_functions_in_region(aws_profile, region, include_tags = True):
+    """
+    Get all Lambda functions in a single region.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param include_tags: Fetch the function tags; False skips every tag call.
+    :return: List of rows with function details.
+    """
+    lambda_details = list(iter_lambda_functions_in_region(aws_profile, region, include_tags))
+
+    return lambda_details
+
+def iter_lambda_functions_in_region(aws_profile, region, include_tags = True):
+    """
+    Yield all Lambda functions in a single region. Rows are built straight from the list_functions pages;
+    tags come from one bulk Resource Groups Tagging API pass instead of a call per function.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param include_tags: Fetch the function tags; False skips every tag call.
+    :return: Generator of rows with function details.
+    """
+    functions = []
+    for page in paginate(aws_profile, region, "list_functions", service = "lambda"):
+        functions.extend(page['Functions'])
+
+    function_tags = {}
+    if include_tags and functions:
+        function_tags = get_lambda_tags_in_region(aws_profile, region, [function['FunctionArn'] for function in functions])
+
+    for function in functions:
+        tags = function_tags.get(function['FunctionArn'], {})
+
+        row = LambdaFunctionRow(
+            region,
+            function['FunctionName'],
+            function.get('Runtime', 'N/A'),  # Container image functions have no runtime or handler
+            function.get('Handler', 'N/A'),
+            function['Role'],
+            function['CodeSize'],
+            function.get('Description', 'N/A'),
+            function['Timeout'],
+            function['MemorySize'],
+            function['LastModified'],
+            ', '.join(f"{key}={value}" for key, value in tags.items())
+        )
+
+        yield row
+
+def get_lambda_tags_in_region(aws_profile, region, function_arns):
+    """
+    Get the tags of the Lambda functions in a region.
+
+    Uses the Resource Groups Tagging API, which returns up to 100 tagged functions per call. If that API
+    is not allowed for the profile, the tags are read with list_tags calls spread over a thread pool.
+
+    :param aws_profile: The AWS CLI profile name to use.
+    :param region: Region name to query.
+    :param function_arns: ARNs of the functions whose tags are needed.
+    :return: Dictionary of {FunctionArn: {tag key: tag value}}.
+    """
+    function_tags = {}
+
+    try:
+        for page in paginate(aws_profile, region, "get_resources", service = "resourcegroupstaggingapi",
+                             ResourceTypeFilters=['lambda:function'], ResourcesPerPage=100):
+            for resource in page['ResourceTagMappingList']:
+                function_tags[resource['ResourceARN']] = {tag['Key']: tag['Value'] for tag in resource.get('Tags', [])}
+        return function_tags
+    except Exception as e:
+        print(f"Bulk tag lookup failed in region {region}, reading tags per function: {e}")
+
+    lambda_client = get_credentials(aws_profile, region, service = "lambda")
+
+    def list_function_tags(function_arn):
+        return function_arn, lambda_client.list_tags(Resource=function_arn).get('Tags', {})
+
+    with ThreadPoolExecutor(max_workers = MAX_TAG_WORKERS) as executor:
+        function_tags = dict(executor.map(list_function_tags, function_arns))
+
+    return function_tags
+
+def iter_all_lambda_functions(aws_profile, regions, include_tags = True):
+    """Yield all Lambda functions in the specified regions without holding them in memory."""
+
+    return iter_regions(iter_lambda_functions_in_region, aws_profile, regions, include_tags)
\ No newline at end of file
@@ -0,0 +1,134 @@
+from methods.aws_methods import paginate, fan_out_regions, MAX_REGION_WORKERS
+from methods.ec2_methods import (
+    select_from_pages, index_volume_pages, index_snapshot_pages, iter_instance_rows_from_pages,
+    iter_ebs_rows_from_pages, get_invalid_ec2_costcodes_from_pages, get_stopped_instance_records_from_pages
+)
+from methods.aging_methods import age_stopped_instances, AGE_THRESHOLDS
+
+# Request parameters of the shared fetch, per operation; everything else is fetched unfiltered
+SWEEP_REQUEST_PARAMS = {
+    "describe_snapshots": {"OwnerIds": ["self"]}
+}
+
+# A sweep report is a dictionary with:
+#   "name": report name, the key of its rows in the run_sweep result
+#   "operations": paginated EC2 operations the report reads
+#   "region_builder": function called as region_builder(region, pages) with pages = {operation: [page, ...]}
+#                     for one region, returning a list of rows
+#   "finalize": optional function called once with the rows of all regions, returning the report rows
+
+def instance_inventory_report():
+    """
+    Report of list_all_instances.py: (row, tags_dict) pairs of every instance with its total EBS size.
+    """
+    def region_builder(region, pages):
+        volume_index = index_volume_pages(pages["describe_volumes"])
+        return list(iter_instance_rows_from_pages(region, pages["describe_instances"], volume_index))
+
+    return {"name": "instances", "operations": ["describe_instances", "describe_volumes"], "region_builder": region_builder}
+
+def available_volumes_report():
+    """
+    Report of list_available_volumes.py: (row, tags_dict) pairs of the available (unattached) volumes.
+    """
+    def region_builder(region, pages):
+        available_pages = select_from_pages(pages["describe_volumes"], "describe_volumes", lambda vol: vol["State"] == "available")
+        return list(iter_ebs_rows_from_pages(region, available_pages))
+
+    return {"name": "available_volumes", "operations": ["describe_volumes"], "region_builder": region_builder}
+
+def snapshot_index_report():
+    """
+    Snapshot lookup of every region, as (region, snapshot index) pairs; dict() of the rows matches build_snapshot_indexes.
+    """
+    def region_builder(region, pages):
+        return [(region, index_snapshot_pages(pages["describe_snapshots"]))]
+
+    return {"name": "snapshot_indexes", "operations": ["describe_snapshots"], "region_builder": region_builder}
+
+def invalid_costcodes_report():
+    """
+    Report of retag_costcode.py: instances whose costcode tag is longer than 6 characters.
+    """
+    def region_builder(region, pages):
+        return get_invalid_ec2_costcodes_from_pages(region, pages["describe_instances"])
+
+    return {"name": "invalid_costcodes", "operations": ["describe_instances"], "region_builder": region_builder}
+
+def stopped_instances_report(stopped_days = 90):
+    """
+    Report of get_stopped_instances_grt_90days: instances stopped for at least stopped_days.
+    """
+    def region_builder(region, pages):
+        return get_stopped_instance_records_from_pages(region, pages["describe_instances"])
+
+    def finalize(records):
+        return age_stopped_instances(records, min_days = stopped_days)
+
+    return {"name": "stopped_instances", "operations": ["describe_instances"], "region_builder": region_builder, "finalize": finalize}
+
+def stopped_instance_aging_report(thresholds = AGE_THRESHOLDS):
+    """
+    Report of get_stopped_instance_aging: every stopped instance with its age bucket, e.g. 30/60/90/180 days.
+    """
+    def region_builder(region, pages):
+        return get_stopped_instance_records_from_pages(region, pages["describe_instances"])
+
+    def finalize(records):
+        return age_stopped_instances(records, thresholds)
+
+    return {"name": "stopped_instance_aging", "operations": ["describe_instances"], "region_builder": region_builder, "finalize": finalize}
+
+def sweep_region(aws_profile, region, reports, operations):
+    """
+    Fetch every operation of a region once and build the rows of every report from the same pages.
+
+    :return: List of (report name, rows) pairs.
+    """
+    pages = {
+        operation: list(paginate(aws_profile, region, operation, **SWEEP_REQUEST_PARAMS.get(operation, {})))
+        for operation in operations
+    }
+
+    report_rows = []
+    for report in reports:
+        try:
+            rows = report["region_builder"](region, pages)
+        except Exception as e:
+            # A failing report is reported but does not stop the reports sharing the pages
+            print(f"Error building {report['name']} in region {region}: {e}")
+            rows = []
+        report_rows.append((report["name"], rows))
+
+    return report_rows
+
+def run_sweep(reports, aws_profile, regions, max_workers = MAX_REGION_WORKERS, failures = None):
+    """
+    Run several EC2 reports from one sweep: each (region, operation) needed by any of the reports
+    is fetched once and its pages are fed to the row builder of every report.
+
+    :param reports: List of sweep report dictionaries, e.g. [instance_inventory_report(), stopped_instances_report()].
+    :param aws_profile: The AWS CLI profile name to use.
+    :param regions: List of region names to query.
+    :param max_workers: Maximum number of regions swept at the same time; each holds its pages in memory.
+    :param failures: Optional dictionary that receives {region: exception} for every region that failed.
+    :return: Dictionary of {report name: rows of all regions, in the same order as regions}.
+    """
+    operations = []
+    for report in reports:
+        for operation in report["operations"]:
+            if operation not in operations:
+                operations.append(operation)
+
+    region_rows = fan_out_regions(sweep_region, aws_profile, regions, reports, operations, max_workers = max_workers, failures = failures)
+
+    results = {report["name"]: [] for report in reports}
+    for report_name, rows in region_rows:
+        results[report_name].extend(rows)
+
+    # Reports that work on all regions at once, e.g. the vectorized instance ages
+    for report in reports:
+        if "finalize" in report:
+            results[report["name"]] = report["finalize"](results[report["name"]])
+
+    return results
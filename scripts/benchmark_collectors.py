@@ -0,0 +1,761 @@
+"""
+.DATE_CREATED
+2026-10-18
+
+.DESCRIPTION
+Offline benchmark for the collectors in methods/ and the report scripts.
+
+The script builds a synthetic AWS account in memory (regions, instances, volumes, snapshots,
+route tables, ...) and serves it to real boto3 clients: their HTTP requests are answered in botocore's
+before-send event, so nothing is sent to AWS while serialization, signing, retries, response parsing
+and the rate limiter and metrics hooks all run. Each benchmark case runs in its own forked process and records:
+   - wall time
+   - API calls per operation (one per HTTP attempt)
+   - peak traced Python memory and peak RSS of the process
+
+Results are written to a JSON file. When a previous result file is given with --baseline, any case
+whose API call count or peak memory grew beyond the tolerance is reported and the script exits with 1.
+
+Example:
+   PYTHONPATH=. python scripts/benchmark_collectors.py --scale 0.1 --output bench_baseline.json
+   PYTHONPATH=. python scripts/benchmark_collectors.py --scale 0.1 --baseline bench_baseline.json
+
+.CHANGE_LOG
+- [2026-10-18] Initial version created.
+- [2026-10-18] Serve real botocore clients instead of fake ones, add the snapshot/delete and retag batch cases.
+"""
+
+import argparse
+import fnmatch
+import importlib.util
+import json
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+from botocore import xform_name
+from botocore.awsrequest import AWSResponse
+
+import methods.aws_methods as aws_methods
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Size of the default synthetic account; --scale multiplies every count
+FLEET_SIZE = {
+    "regions": 20,
+    "instances": 10000,
+    "volumes": 50000,
+    "snapshots": 100000,
+    "route_tables": 5000,
+    "vpcs": 400,
+    "security_groups": 4000,
+    "load_balancers": 1000,
+    "lambda_functions": 3000,
+    "buckets": 2000
+}
+
+# Available volumes snapshotted and deleted by the snapshot_and_delete_volumes cases
+PIPELINE_VOLUMES = 200
+
+# Seconds between checks that a case's child process is still running
+CHILD_POLL_SECONDS = 1
+
+# Items per page returned when a request sets no page size, close to the AWS defaults
+PAGE_SIZES = {
+    "describe_instances": 1000,
+    "describe_volumes": 500,
+    "describe_snapshots": 1000,
+    "describe_route_tables": 100,
+    "describe_vpcs": 100,
+    "describe_security_groups": 1000,
+    "describe_load_balancers": 400,
+    "list_functions": 50,
+    "get_resources": 100,
+    "list_buckets": 1000
+}
+
+# Result key holding the items of each paginated operation
+RESULT_KEYS = {
+    "describe_instances": "Reservations",
+    "describe_volumes": "Volumes",
+    "describe_snapshots": "Snapshots",
+    "describe_route_tables": "RouteTables",
+    "describe_vpcs": "Vpcs",
+    "describe_security_groups": "SecurityGroups",
+    "describe_load_balancers": "LoadBalancers",
+    "list_functions": "Functions",
+    "get_resources": "ResourceTagMappingList",
+    "list_buckets": "Buckets"
+}
+
+def build_synthetic_account(scale = 1.0, seed = 7):
+    """
+    Build a synthetic account spread over FLEET_SIZE["regions"] regions.
+
+    :param scale: Multiplier applied to every resource count (not to the number of regions).
+    :param seed: Random seed, so every run benchmarks the same account.
+    :return: Dictionary of {"regions": [...], "global": {...}, region: {operation: [items]}}.
+    """
+    rng = random.Random(seed)
+    counts = {name: max(1, int(count * scale)) for name, count in FLEET_SIZE.items()}
+    counts["regions"] = FLEET_SIZE["regions"]
+
+    regions = [f"bench-region-{i:02d}" for i in range(counts["regions"])]
+    account = {"regions": regions, "global": {"list_buckets": [], "bucket_tags": {}}}
+    for region in regions:
+        account[region] = {operation: [] for operation in RESULT_KEYS}
+
+    base_time = datetime(2024, 1, 1, tzinfo = timezone.utc)
+    volume_types = ["gp2", "gp3", "io1", "st1", "sc1"]
+    instance_types = ["t3.micro", "t3.large", "m5.xlarge", "c5.2xlarge", "r5.large"]
+
+    # Instances, each with up to 3 attached volumes taken from the volume budget
+    volume_number = 0
+    for i in range(counts["instances"]):
+        region = regions[i % len(regions)]
+        state = "stopped" if i % 5 == 0 else "running"
+        block_devices = []
+        for device in range(rng.randint(1, 3)):
+            if volume_number >= counts["volumes"]:
+                break
+            volume_id = f"vol-{volume_number:08x}"
+            block_devices.append({"DeviceName": f"/dev/xvd{chr(97 + device)}", "Ebs": {"VolumeId": volume_id}})
+            account[region]["describe_volumes"].append({
+                "VolumeId": volume_id,
+                "VolumeType": rng.choice(volume_types),
+                "Size": rng.choice([8, 20, 50, 100, 500]),
+                "Encrypted": bool(i % 2),
+                "State": "in-use",
+                "SnapshotId": "",
+                "CreateTime": base_time + timedelta(days = rng.randint(0, 600)),
+                "Attachments": [{"InstanceId": f"i-{i:08x}", "Device": f"/dev/xvd{chr(97 + device)}", "State": "attached"}],
+                "Tags": [{"Key": "Name", "Value": f"vol-{i}-{device}"}]
+            })
+            volume_number += 1
+
+        stopped_at = base_time + timedelta(days = rng.randint(0, 600))
+        account[region]["describe_instances"].append({"Instances": [{
+            "InstanceId": f"i-{i:08x}",
+            "InstanceType": rng.choice(instance_types),
+            "State": {"Name": state},
+            "LaunchTime": base_time - timedelta(days = rng.randint(0, 900)),
+            "ImageId": "ami-00000000",
+            "VpcId": f"vpc-{i % max(1, counts['vpcs']):08x}",
+            "SubnetId": f"subnet-{i % 97:08x}",
+            "PrivateIpAddress": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            "StateTransitionReason": f"User initiated ({stopped_at.strftime('%Y-%m-%d %H:%M:%S')} GMT)" if state == "stopped" else "",
+            "BlockDeviceMappings": block_devices,
+            "Tags": [
+                {"Key": "Name", "Value": f"instance-{i}"},
+                {"Key": "costcode", "Value": f"CC-{100000 + i % 900000}-x" if i % 7 == 0 else str(100000 + i % 900000)},
+                {"Key": f"team-{i % 25}", "Value": "yes"}
+            ]
+        }]})
+
+    # Remaining volumes are unattached
+    while volume_number < counts["volumes"]:
+        region = regions[volume_number % len(regions)]
+        account[region]["describe_volumes"].append({
+            "VolumeId": f"vol-{volume_number:08x}",
+            "VolumeType": rng.choice(volume_types),
+            "Size": rng.choice([8, 20, 50, 100, 500]),
+            "Encrypted": False,
+            "State": "available",
+            "CreateTime": base_time + timedelta(days = rng.randint(0, 600)),
+            "Attachments": [],
+            "Tags": [{"Key": "owner", "Value": f"team-{volume_number % 25}"}]
+        })
+        volume_number += 1
+
+    all_volumes = [(region, volume["VolumeId"], volume["Size"]) for region in regions for volume in account[region]["describe_volumes"]]
+    for i in range(counts["snapshots"]):
+        region, volume_id, size = all_volumes[rng.randrange(len(all_volumes))]
+        account[region]["describe_snapshots"].append({
+            "SnapshotId": f"snap-{i:08x}",
+            "VolumeId": volume_id,
+            "VolumeSize": size,
+            "State": "completed",
+            "StartTime": base_time + timedelta(days = rng.randint(0, 600))
+        })
+
+    for i in range(counts["route_tables"]):
+        region = regions[i % len(regions)]
+        account[region]["describe_route_tables"].append({
+            "RouteTableId": f"rtb-{i:08x}",
+            "VpcId": f"vpc-{i % max(1, counts['vpcs']):08x}",
+            "OwnerId": "123456789012",
+            "Associations": [{"Main": i % 10 == 0, "SubnetId": f"subnet-{i % 97:08x}"}],
+            "Routes": [
+                {"DestinationCidrBlock": "10.0.0.0/16", "GatewayId": "local", "State": "active"},
+                {"DestinationCidrBlock": "0.0.0.0/0", "NatGatewayId": f"nat-{i:08x}", "State": "active"}
+            ]
+        })
+
+    for i in range(counts["vpcs"]):
+        account[regions[i % len(regions)]]["describe_vpcs"].append({"VpcId": f"vpc-{i:08x}", "CidrBlock": "10.0.0.0/16", "IsDefault": i < len(regions)})
+
+    for i in range(counts["security_groups"]):
+        account[regions[i % len(regions)]]["describe_security_groups"].append({"GroupId": f"sg-{i:08x}", "GroupName": f"sg-{i}", "Description": "bench"})
+
+    for i in range(counts["load_balancers"]):
+        account[regions[i % len(regions)]]["describe_load_balancers"].append({
+            "LoadBalancerName": f"lb-{i}", "DNSName": f"lb-{i}.elb.amazonaws.com", "CreatedTime": base_time,
+            "Type": "application", "State": {"Code": "active"}
+        })
+
+    for i in range(counts["lambda_functions"]):
+        region = regions[i % len(regions)]
+        function_arn = f"arn:aws:lambda:{region}:123456789012:function:fn-{i}"
+        account[region]["list_functions"].append({
+            "FunctionName": f"fn-{i}", "FunctionArn": function_arn, "Runtime": "python3.12", "Handler": "app.handler",
+            "Role": "arn:aws:iam::123456789012:role/bench", "CodeSize": 1024, "Timeout": 30, "MemorySize": 128,
+            "LastModified": "2024-01-01T00:00:00.000+0000"
+        })
+        account[region]["get_resources"].append({"ResourceARN": function_arn, "Tags": [{"Key": "team", "Value": f"team-{i % 25}"}]})
+
+    for i in range(counts["buckets"]):
+        bucket_name = f"bench-bucket-{i}"
+        account["global"]["list_buckets"].append({"Name": bucket_name, "CreationDate": base_time, "BucketRegion": regions[i % len(regions)]})
+        if i % 3:
+            account["global"]["bucket_tags"][bucket_name] = [{"Key": "team", "Value": f"team-{i % 25}"}]
+
+    return account
+
+def matches_filters(operation, item, filters):
+    """
+    Apply the describe_* Filters the collectors use to one synthetic item.
+    """
+    for each_filter in filters or []:
+        name, values = each_filter["Name"], each_filter["Values"]
+        instance = item["Instances"][0] if operation == "describe_instances" else item
+        tags = {tag["Key"]: tag["Value"] for tag in instance.get("Tags", [])}
+
+        if name == "instance-state-name":
+            actual = [instance["State"]["Name"]]
+        elif name == "status":
+            actual = [instance["State"]]
+        elif name == "instance-type":
+            actual = [instance["InstanceType"]]
+        elif name == "volume-type":
+            actual = [instance["VolumeType"]]
+        elif name == "vpc-id":
+            actual = [instance.get("VpcId")]
+        elif name == "volume-id":
+            actual = [instance.get("VolumeId")]
+        elif name == "attachment.instance-id":
+            actual = [attachment["InstanceId"] for attachment in instance.get("Attachments", [])]
+        elif name == "tag-key":
+            actual = list(tags)
+        elif name.startswith("tag:"):
+            actual = [tags.get(name[4:])]
+        else:
+            raise ValueError(f"Filter '{name}' is not supported by the synthetic account")
+
+        # EC2 filter values accept the * and ? wildcards
+        if not any(fnmatch.fnmatchcase(str(value), pattern) for value in actual if value is not None for pattern in values):
+            return False
+
+    return True
+
+def xml_text(shape, value):
+    """
+    Text of a scalar value as the XML protocols send it.
+    """
+    if shape.type_name == "boolean":
+        return "true" if value else "false"
+    if shape.type_name == "timestamp" and isinstance(value, datetime):
+        return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    return escape(str(value))
+
+def append_xml(shape, value, name, parts):
+    """
+    Serialize a value of a botocore shape as XML into parts, the way the ec2, query and rest-xml protocols send it.
+    """
+    if shape.type_name == "structure":
+        parts.append(f"<{name}>")
+        for member_name, member_shape in shape.members.items():
+            # Header and payload members are not part of the XML body
+            if value.get(member_name) is None or "location" in member_shape.serialization:
+                continue
+            append_xml(member_shape, value[member_name], member_shape.serialization.get("name", member_name), parts)
+        parts.append(f"</{name}>")
+    elif shape.type_name == "list":
+        item_name = shape.member.serialization.get("name", "member")
+        if shape.serialization.get("flattened"):
+            for item in value:
+                append_xml(shape.member, item, name, parts)
+        else:
+            parts.append(f"<{name}>")
+            for item in value:
+                append_xml(shape.member, item, item_name, parts)
+            parts.append(f"</{name}>")
+    elif shape.type_name == "map":
+        key_name = shape.key.serialization.get("name", "key")
+        value_name = shape.value.serialization.get("name", "value")
+        parts.append(f"<{name}>")
+        for key, item in value.items():
+            parts.append(f"<entry><{key_name}>{escape(key)}</{key_name}>")
+            append_xml(shape.value, item, value_name, parts)
+            parts.append("</entry>")
+        parts.append(f"</{name}>")
+    else:
+        parts.append(f"<{name}>{xml_text(shape, value)}</{name}>")
+
+def to_json(shape, value):
+    """
+    Convert a value of a botocore shape to what the json and rest-json protocols send.
+    """
+    if shape.type_name == "structure":
+        return {
+            member_shape.serialization.get("name", member_name): to_json(member_shape, value[member_name])
+            for member_name, member_shape in shape.members.items()
+            if value.get(member_name) is not None and "location" not in member_shape.serialization
+        }
+    if shape.type_name == "list":
+        return [to_json(shape.member, item) for item in value]
+    if shape.type_name == "map":
+        return {key: to_json(shape.value, item) for key, item in value.items()}
+    if shape.type_name == "timestamp" and isinstance(value, datetime):
+        return value.timestamp()
+
+    return value
+
+def serialize_response(operation_model, result):
+    """
+    Build the HTTP body AWS would send for an operation result.
+
+    :return: Tuple of (body bytes, content type).
+    """
+    protocol = operation_model.metadata["protocol"]
+    output_shape = operation_model.output_shape
+    operation_name = operation_model.name
+
+    if protocol in ("json", "rest-json"):
+        body = to_json(output_shape, result) if output_shape is not None else {}
+        return json.dumps(body).encode(), "application/x-amz-json-1.1"
+
+    parts = []
+    if output_shape is not None:
+        for member_name, member_shape in output_shape.members.items():
+            if result.get(member_name) is not None and "location" not in member_shape.serialization:
+                append_xml(member_shape, result[member_name], member_shape.serialization.get("name", member_name), parts)
+    members = "".join(parts)
+
+    if protocol == "query":
+        result_wrapper = operation_model.output_shape.serialization.get("resultWrapper", f"{operation_name}Result") if output_shape is not None else f"{operation_name}Result"
+        body = (f"<{operation_name}Response><{result_wrapper}>{members}</{result_wrapper}>"
+                f"<ResponseMetadata><RequestId>benchmark</RequestId></ResponseMetadata></{operation_name}Response>")
+    elif protocol == "ec2":
+        body = f"<{operation_name}Response>{members}<requestId>benchmark</requestId></{operation_name}Response>"
+    else:
+        body = f"<{operation_name}Output>{members}</{operation_name}Output>"
+
+    return body.encode(), "text/xml"
+
+def serialize_error(operation_model, code, message):
+    """
+    Build the HTTP error body AWS would send for an error code.
+
+    :return: Tuple of (body bytes, content type).
+    """
+    protocol = operation_model.metadata["protocol"]
+
+    if protocol in ("json", "rest-json"):
+        return json.dumps({"__type": code, "message": message}).encode(), "application/x-amz-json-1.1"
+    if protocol == "ec2":
+        body = f"<Response><Errors><Error><Code>{code}</Code><Message>{escape(message)}</Message></Error></Errors><RequestID>benchmark</RequestID></Response>"
+    elif protocol == "query":
+        body = f"<ErrorResponse><Error><Type>Sender</Type><Code>{code}</Code><Message>{escape(message)}</Message></Error><RequestId>benchmark</RequestId></ErrorResponse>"
+    else:
+        body = f"<Error><Code>{code}</Code><Message>{escape(message)}</Message><RequestId>benchmark</RequestId></Error>"
+
+    return body.encode(), "text/xml"
+
+class SyntheticError(Exception):
+    def __init__(self, status_code, code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+class SyntheticBody:
+    # Raw body of an AWSResponse, read through stream() like a urllib3 response
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, *args, **kwargs):
+        yield self.body
+
+class SyntheticAWS:
+    """
+    Answer the HTTP requests of real botocore clients from the synthetic account.
+
+    The answer is given in the before-send event, the last one before botocore would open a connection.
+    Everything up to it (parameter validation, serialization, signing, the rate limiter and metrics hooks)
+    and everything after it (retry handling, response parsing, pagination) runs as it does against AWS.
+    """
+
+    def __init__(self, account):
+        self.account = account
+        self.call_counts = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.paginator_models = {}
+        self.snapshot_number = 0
+
+    def register(self, events):
+        events.register("before-parameter-build", self.remember_call)
+        events.register("before-send", self.send)
+
+    def remember_call(self, params, model, context, **kwargs):
+        # before-send only sees the serialized request; keep the call it was built from
+        self.local.call = (model, dict(params), context.get("client_region"))
+
+    def send(self, request, **kwargs):
+        operation_model, request_params, region = self.local.call
+        service = operation_model.service_model.service_name
+        operation = xform_name(operation_model.name)
+
+        with self.lock:
+            key = f"{service}.{operation}"
+            self.call_counts[key] = self.call_counts.get(key, 0) + 1
+
+        headers = {"x-amzn-RequestId": "benchmark"}
+        try:
+            status_code = 200
+            body, content_type = serialize_response(operation_model, self.respond(operation_model, operation, request_params, region))
+        except SyntheticError as e:
+            status_code = e.status_code
+            body, content_type = serialize_error(operation_model, e.code, e.message)
+            headers["x-amzn-ErrorType"] = e.code
+        headers.update({"Content-Type": content_type, "Content-Length": str(len(body))})
+
+        return AWSResponse(request.url, status_code, headers, SyntheticBody(body))
+
+    def get_paginator_model(self, operation_model):
+        service = operation_model.service_model.service_name
+        if service not in self.paginator_models:
+            self.paginator_models[service] = aws_methods.get_model_loader().load_service_model(service, "paginators-1")["pagination"]
+
+        return self.paginator_models[service].get(operation_model.name)
+
+    def select(self, operation, request_params, region):
+        if operation == "list_buckets":
+            return self.account["global"]["list_buckets"]
+
+        items = self.account.get(region, {}).get(operation, [])
+
+        if operation == "describe_instances" and "InstanceIds" in request_params:
+            wanted = set(request_params["InstanceIds"])
+            items = [item for item in items if item["Instances"][0]["InstanceId"] in wanted]
+        if operation == "describe_volumes" and "VolumeIds" in request_params:
+            wanted = set(request_params["VolumeIds"])
+            items = [item for item in items if item["VolumeId"] in wanted]
+        if operation == "describe_snapshots" and "SnapshotIds" in request_params:
+            wanted = set(request_params["SnapshotIds"])
+            items = [item for item in items if item["SnapshotId"] in wanted]
+            missing = wanted - {item["SnapshotId"] for item in items}
+            if missing:
+                raise SyntheticError(400, "InvalidSnapshot.NotFound", f"The snapshot '{sorted(missing)[0]}' does not exist.")
+            # Snapshots started by a case complete once they have been seen pending
+            pending = [item for item in items if item["State"] == "pending"]
+            items = [dict(item) for item in items]
+            for item in pending:
+                item["State"] = "completed"
+
+        if request_params.get("Filters"):
+            items = [item for item in items if matches_filters(operation, item, request_params["Filters"])]
+
+        return items
+
+    def respond(self, operation_model, operation, request_params, region):
+        """
+        :return: The parsed result of one API call, as a boto3 client would return it.
+        """
+        if operation in RESULT_KEYS:
+            items = self.select(operation, request_params, region)
+            paginator_model = self.get_paginator_model(operation_model) or {}
+            input_token = paginator_model.get("input_token")
+            output_token = paginator_model.get("output_token")
+
+            start = int(request_params.get(input_token) or 0) if input_token else 0
+            page_size = request_params.get(paginator_model.get("limit_key")) or PAGE_SIZES[operation]
+            result = {RESULT_KEYS[operation]: items[start:start + page_size]}
+            if output_token and start + page_size < len(items):
+                result[output_token] = str(start + page_size)
+            return result
+
+        if operation == "describe_regions":
+            return {"Regions": [{"RegionName": each_region} for each_region in self.account["regions"]]}
+
+        if operation == "create_snapshot":
+            with self.lock:
+                self.snapshot_number += 1
+                snapshot_id = f"snap-b{self.snapshot_number:07x}"
+            volume_id = request_params["VolumeId"]
+            volume = next((item for item in self.account[region]["describe_volumes"] if item["VolumeId"] == volume_id), None)
+            if volume is None:
+                raise SyntheticError(400, "InvalidVolume.NotFound", f"The volume '{volume_id}' does not exist.")
+            snapshot = {"SnapshotId": snapshot_id, "VolumeId": volume_id, "VolumeSize": volume["Size"], "State": "pending",
+                        "StartTime": datetime.now(timezone.utc), "Description": request_params.get("Description", "")}
+            self.account[region]["describe_snapshots"].append(snapshot)
+            return snapshot
+
+        if operation == "delete_volume":
+            if request_params.get("DryRun"):
+                raise SyntheticError(412, "DryRunOperation", "Request would have succeeded, but DryRun flag is set.")
+            volumes = self.account[region]["describe_volumes"]
+            volumes[:] = [item for item in volumes if item["VolumeId"] != request_params["VolumeId"]]
+            return {}
+
+        if operation == "create_tags":
+            if request_params.get("DryRun"):
+                raise SyntheticError(412, "DryRunOperation", "Request would have succeeded, but DryRun flag is set.")
+            return {}
+
+        if operation == "get_bucket_tagging":
+            if request_params["Bucket"] not in self.account["global"]["bucket_tags"]:
+                raise SyntheticError(404, "NoSuchTagSet", "The TagSet does not exist")
+            return {"TagSet": self.account["global"]["bucket_tags"][request_params["Bucket"]]}
+
+        if operation == "list_tags":
+            return {"Tags": {}}
+
+        raise SyntheticError(400, "InvalidAction", f"{operation_model.name} is not served by the synthetic account")
+
+def install_synthetic_account(account):
+    """
+    Serve every pooled client from the synthetic account, whatever profile a collector or script uses.
+    The clients are real boto3 clients with dummy credentials; only their HTTP requests are answered locally.
+
+    :return: Dictionary that receives the API call count per "service.operation" (one per HTTP attempt).
+    """
+    synthetic_aws = SyntheticAWS(account)
+    create_boto3_session = aws_methods.create_boto3_session
+
+    # Keep the benchmark away from the local AWS configuration and the instance metadata service
+    for variable in ("AWS_PROFILE", "AWS_DEFAULT_PROFILE", "AWS_SESSION_TOKEN"):
+        os.environ.pop(variable, None)
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "AWS_CONFIG_FILE": os.devnull,
+        "AWS_SHARED_CREDENTIALS_FILE": os.devnull,
+        "AWS_EC2_METADATA_DISABLED": "true"
+    })
+
+    def create_synthetic_session(aws_profile = None, credential_provider = None):
+        aws_con = create_boto3_session(None, credential_provider)
+        synthetic_aws.register(aws_con.events)
+        return aws_con
+
+    aws_methods.clear_client_pool()
+    aws_methods.create_boto3_session = create_synthetic_session
+
+    return synthetic_aws.call_counts
+
+def load_script(script_name):
+    """
+    Import a script from scripts/ as a module so its main() can be benchmarked.
+    """
+    spec = importlib.util.spec_from_file_location(script_name, os.path.join(SCRIPTS_DIR, f"{script_name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+def get_benchmark_cases(account):
+    """
+    :return: Dictionary of {case name: function(profile) running the case}.
+    """
+    from methods import ec2_methods, networking_methods, serverless_methods, s3_methods
+    from methods.file_methods import stream_tagged_rows_to_csv
+
+    regions = account["regions"]
+    available_filter = {'Name': 'status', 'Values': ['available']}
+
+    # The snapshot/delete pipeline runs over a few available volumes per region, it is bound by the write rate limits
+    delete_rows = [
+        [region, volume["VolumeId"]]
+        for region in regions
+        for volume in [volume for volume in account[region]["describe_volumes"] if volume["State"] == "available"][:max(1, PIPELINE_VOLUMES // len(regions))]
+    ]
+    snapshot_tags = [{'Key': 'delete_after', 'Value': '2025-01-31'}]
+
+    def run_script(script_name):
+        sys.argv = [script_name]
+        load_script(script_name).main()
+
+    def retag_invalid_costcodes(profile):
+        tag_requests = [
+            {"region": instance["region"], "resource_id": instance["instanceId"], "value": ec2_methods.determine_costcode_values(instance["invalid_costcode"])}
+            for instance in ec2_methods.get_invalid_ec2_costcodes(profile, regions)
+        ]
+        return ec2_methods.apply_tags_in_batches(profile, tag_requests, "costcode")
+
+    return {
+        "get_instance_tags+get_instance_details": lambda profile: ec2_methods.get_instance_details(profile, regions, ec2_methods.get_instance_tags(profile, regions)),
+        "get_instance_inventory": lambda profile: ec2_methods.get_instance_inventory(profile, regions),
+        "iter_instance_inventory+stream": lambda profile: stream_tagged_rows_to_csv("instances.csv", ["c"] * 11, ec2_methods.iter_instance_inventory(profile, regions)),
+        "get_ebs_tags+get_ebs_details": lambda profile: ec2_methods.get_ebs_details(profile, regions, ec2_methods.get_ebs_tags(profile, regions, available_filter)),
+        "get_ebs_inventory": lambda profile: ec2_methods.get_ebs_inventory(profile, regions, available_filter),
+        "build_snapshot_indexes": lambda profile: ec2_methods.build_snapshot_indexes(profile, regions),
+        "get_invalid_ec2_costcodes": lambda profile: ec2_methods.get_invalid_ec2_costcodes(profile, regions),
+        "get_stopped_instances_grt_90days": lambda profile: ec2_methods.get_stopped_instances_grt_90days(profile, regions),
+        "get_vpcs": lambda profile: networking_methods.get_vpcs(profile, regions),
+        "get_route_tables": lambda profile: networking_methods.get_route_tables(profile, regions),
+        "get_security_groups": lambda profile: networking_methods.get_security_groups(profile, regions),
+        "get_load_balancers": lambda profile: networking_methods.get_load_balancers(profile, regions),
+        "get_all_lambda_functions": lambda profile: serverless_methods.get_all_lambda_functions(profile, regions),
+        "get_s3_buckets": lambda profile: s3_methods.get_s3_buckets(profile),
+        "get_invalid_ec2_costcodes+apply_tags_in_batches": retag_invalid_costcodes,
+        "snapshot_and_delete_volumes": lambda profile: ec2_methods.snapshot_and_delete_volumes(
+            profile, delete_rows, "benchmark", snapshot_tags, "delete_log.jsonl", poll_interval = 0, dry_run = False),
+        "snapshot_and_delete_volumes (dry run)": lambda profile: ec2_methods.snapshot_and_delete_volumes(
+            profile, delete_rows, "benchmark", snapshot_tags, "delete_log.jsonl", poll_interval = 0, dry_run = True),
+        "list_all_instances.main": lambda profile: run_script("list_all_instances"),
+        "list_available_volumes.main": lambda profile: run_script("list_available_volumes"),
+        "list_all_resources.main": lambda profile: run_script("list_all_resources"),
+        "retag_costcode.main": lambda profile: run_script("retag_costcode"),
+        "ec2_nightly_sweep.main": lambda profile: run_script("ec2_nightly_sweep")
+    }
+
+def run_case(account, case_name, result_queue):
+    """
+    Run one benchmark case in a forked child process and report its measurements.
+    """
+    call_counts = install_synthetic_account(account)
+    case = get_benchmark_cases(account)[case_name]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Scripts write their reports to the working directory
+        os.chdir(work_dir)
+        sys.stdout = open(os.devnull, "w")
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        error = ""
+        try:
+            case("benchmark")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        wall_time = time.perf_counter() - start_time
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    result_queue.put({
+        "case": case_name,
+        "wall_time_s": round(wall_time, 3),
+        "api_calls": sum(call_counts.values()),
+        "api_calls_by_operation": dict(sorted(call_counts.items())),
+        "peak_traced_mb": round(traced_peak / 1024 / 1024, 2),
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        "error": error
+    })
+
+def wait_for_case(child, case_name, result_queue):
+    """
+    Wait for the measurements of a case without blocking forever when its child process dies first.
+
+    :return: The measurements of the case, or a result holding the error when the child exited without reporting.
+    """
+    while True:
+        try:
+            return result_queue.get(timeout = CHILD_POLL_SECONDS)
+        except queue.Empty:
+            if child.is_alive():
+                continue
+        # The child may have put its result just before exiting
+        try:
+            return result_queue.get(timeout = CHILD_POLL_SECONDS)
+        except queue.Empty:
+            return {
+                "case": case_name,
+                "wall_time_s": 0.0,
+                "api_calls": 0,
+                "api_calls_by_operation": {},
+                "peak_traced_mb": 0.0,
+                "peak_rss_mb": 0.0,
+                "error": f"child process exited with code {child.exitcode}"
+            }
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    :return: List of messages for every case whose API calls or peak memory grew beyond the tolerance.
+    """
+    if baseline.get("scale") != results["scale"]:
+        return [f"baseline was recorded at scale {baseline.get('scale')}, this run used scale {results['scale']}"]
+
+    regressions = []
+    baseline_cases = {case["case"]: case for case in baseline.get("cases", [])}
+
+    for case in results["cases"]:
+        previous = baseline_cases.get(case["case"])
+        if previous is None:
+            continue
+        for metric in ("api_calls", "peak_traced_mb"):
+            if case[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{case['case']}: {metric} {previous[metric]} -> {case[metric]}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the collectors against a synthetic AWS account.")
+    parser.add_argument("--scale", type = float, default = 1.0, help = "Multiplier for the synthetic fleet size.")
+    parser.add_argument("--case", action = "append", default = None, help = "Only run this case (repeatable).")
+    parser.add_argument("--output", default = "bench_baseline.json", help = "JSON file the results are written to.")
+    parser.add_argument("--baseline", default = None, help = "Earlier results to compare against.")
+    parser.add_argument("--tolerance", type = float, default = 0.10, help = "Allowed growth before a metric counts as a regression.")
+    args = parser.parse_args()
+
+    account = build_synthetic_account(args.scale)
+    case_names = args.case or list(get_benchmark_cases(account))
+
+    # fork shares the synthetic account with every case without copying or pickling it
+    context = multiprocessing.get_context("fork")
+    results = {
+        "created": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        "scale": args.scale,
+        "fleet": {
+            name: sum(len(account[region].get(name, [])) for region in account["regions"] + ["global"])
+            for name in RESULT_KEYS
+        },
+        "cases": []
+    }
+
+    print(f"{'Case':45} {'Wall s':>8} {'API calls':>10} {'Traced MB':>10} {'RSS MB':>8}")
+    for case_name in case_names:
+        result_queue = context.Queue()
+        child = context.Process(target = run_case, args = (account, case_name, result_queue))
+        child.start()
+        case_result = wait_for_case(child, case_name, result_queue)
+        child.join()
+
+        results["cases"].append(case_result)
+        print(f"{case_name:45} {case_result['wall_time_s']:8.2f} {case_result['api_calls']:10} {case_result['peak_traced_mb']:10.1f} {case_result['peak_rss_mb']:8.1f} {case_result['error']}")
+
+    with open(args.output, mode = 'w') as output_file:
+        json.dump(results, output_file, indent = 2)
+    print(f"Results written to '{args.output}'.")
+
+    if args.baseline:
+        with open(args.baseline, mode = 'r') as baseline_file:
+            regressions = compare_with_baseline(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+.DATE_CREATED
+2026-10-18
+
+.DESCRIPTION
+Compiles locally downloaded AWS Price List bulk offer files into the price catalog used by the cost
+estimates of the reports. The EC2 offer holds the EBS volume and snapshot prices as well, e.g.:
+
+    https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/AmazonEC2/current/index.json
+
+The offer files are streamed, so the multi-GB JSON is never loaded. Rerun the script when prices
+change; the reports read the catalog at runtime without calling the Pricing API.
+
+.CHANGE_LOG
+- [2026-10-18] Initial version created.
+"""
+
+import argparse
+from methods.pricing_methods import compile_price_catalog, price_catalog_settings
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Compile AWS Price List offer files into the price catalog used by the cost estimates.")
+    parser.add_argument("offer_files", nargs = "+", help = "Offer files downloaded from the Price List bulk API, e.g. the AmazonEC2 index.json.")
+    parser.add_argument("--output", default = None,
+                        help = "Catalog file to write; defaults to AWS_PRICE_CATALOG or price_catalog.bin in the cache directory.")
+    args = parser.parse_args(argv)
+
+    output_path = args.output or price_catalog_settings["path"]
+    price_count = compile_price_catalog(args.offer_files, output_path)
+
+    print(f"Price catalog '{output_path}' created successfully with {price_count} prices.")
+
+
+if __name__ == "__main__":
+    main()
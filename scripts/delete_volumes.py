@@ -1,35 +1,42 @@
+import argparse
 from methods.file_methods import import_csv_file
-from methods.ec2_methods import create_snapshot
-from methods.aws_methods import get_credentials
+from methods.ec2_methods import snapshot_and_delete_volumes
 
 
-def main():
-    
-    aws_profile = ""
-    file_path = ""
-    tags = [{'Key': 'delete_after', 'Value': '2025-01-31'}]
-    description = ""
-
-    volume_rows = import_csv_file(file_path)
-
-    for row in volume_rows:
-        region = row[0]
-        volume = row[1]
-        vol_backups = create_snapshot(aws_profile, region, volume, description, tags)
-        
-        print("Region: {} Volume: {}  Snapshot_ID_Created: {}".format(vol_backups[0], vol_backups[1], vol_backups[2]))
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Snapshot the volumes listed in a CSV file and delete them once their snapshot completed.")
+    parser.add_argument("--profile", default = "", help = "AWS CLI profile name to use.")
+    parser.add_argument("--file", default = "", help = "CSV file with the region and volume ID in the first two columns, e.g. a list_available_volumes report.")
+    parser.add_argument("--description", default = "", help = "Description of the snapshots.")
+    parser.add_argument("--delete", action = "store_true", help = "Delete the volumes; without it the run is a dry run.")
+    args = parser.parse_args(argv)
 
-        #Delete the volumes
-        ec2_client = get_credentials(aws_profile, region)
-
-        print(volume, "deleted test")
-
-        # response  = ec2_client.delete_volume(
-        #     VolumeId=volume,
-        #     DryRun=False #Set to True for deletion
-        # )
-        
-        # print(response)
+    aws_profile = args.profile
+    file_path = args.file
+    tags = [{'Key': 'delete_after', 'Value': '2025-01-31'}]
+    description = args.description
+
+    # Every step is appended here; rerunning with the same log continues where the last run stopped
+    log_path = file_path + ".delete_log.jsonl"
+
+    # --delete actually deletes the volumes once their snapshots completed
+    dry_run = not args.delete
+
+    # Only rows holding a volume ID, so the header row of a report is not taken for a volume
+    volume_rows = [row for row in import_csv_file(file_path) if len(row) > 1 and row[1].startswith("vol-")]
+
+    # All snapshots are started up front and each volume is deleted as soon as its snapshot completes
+    snapshot_and_delete_volumes(
+        aws_profile,
+        volume_rows,
+        description,
+        tags,
+        log_path,
+        max_in_flight = 50,
+        max_workers = 8,
+        poll_interval = 15,
+        dry_run = dry_run
+    )
 
 if __name__ == "__main__":
     main()
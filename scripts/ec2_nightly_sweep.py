@@ -0,0 +1,128 @@
+"""
+.DATE_CREATED
+2026-10-18
+
+.DESCRIPTION
+Nightly EC2 job: builds the instance inventory, the available volumes report, the stopped instances report,
+the stopped instance aging report and the invalid costcode list from a single sweep of EC2. describe_instances,
+describe_volumes and describe_snapshots are fetched once per region and the pages are shared by every report, instead of
+list_all_instances.py, list_available_volumes.py, retag_costcode.py and the stopped instances report
+each paginating them on their own.
+
+Costcodes are only retagged when --retag is given.
+
+.CHANGE_LOG
+- [2026-10-18] Initial version created.
+- [2026-10-18] --profile replaces the hardcoded profile; also available as "python -m methods nightly".
+- [2026-10-18] Stopped instance aging report, bucketed by --age-thresholds in one pass.
+- [2026-10-18] --output sets the prefix of the report files.
+"""
+
+import argparse
+from methods.ec2_methods import get_all_regions, get_available_volume_columns, determine_costcode_values, apply_tags_in_batches
+from methods.file_methods import write_to_csv, write_tagged_rows_to_csv, generate_output_filename
+from methods.cache_methods import add_cache_arguments, apply_cache_arguments
+from methods.metrics_methods import add_metrics_arguments, report_metrics
+from methods.pricing_methods import add_price_catalog_arguments, apply_price_catalog_arguments
+from methods.row_methods import InstanceRow
+from methods.sweep_methods import (
+    run_sweep, instance_inventory_report, available_volumes_report, snapshot_index_report,
+    invalid_costcodes_report, stopped_instances_report, stopped_instance_aging_report
+)
+from methods.aging_methods import AGE_THRESHOLDS
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Build the nightly EC2 reports from a single sweep of EC2.")
+    parser.add_argument("--profile", default = "", help = "AWS CLI profile name to use.")
+    parser.add_argument("--output", default = "",
+                        help = "Prefix of the CSV files, e.g. a directory followed by a file prefix; the report name and date are appended.")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    add_price_catalog_arguments(parser)
+    parser.add_argument("--stopped-days", type = int, default = 90, help = "Report instances stopped for at least this many days.")
+    parser.add_argument("--age-thresholds", type = int, nargs = "+", default = list(AGE_THRESHOLDS), metavar = "DAYS",
+                        help = "Age buckets of the stopped instance aging report (default: 30 60 90 180).")
+    parser.add_argument("--retag", action = "store_true", help = "Retag the instances with an invalid costcode.")
+    args = parser.parse_args(argv)
+    apply_cache_arguments(args)
+    apply_price_catalog_arguments(args)
+
+    #set aws profile
+    aws_profile = args.profile
+    base_instances_file = f"{args.output}ec2_instances"
+    base_volumes_file = f"{args.output}available_volumes"
+    base_stopped_file = f"{args.output}stopped_instances"
+    base_costcodes_file = f"{args.output}invalid_costcodes"
+    base_aging_file = f"{args.output}stopped_instance_aging"
+
+    #price of volume types missing from the price catalog and methods.cost_methods
+    VOLUME_COST_PER_GB_PER_MONTH = 0.08
+
+    stopped_header = [
+        "Region", "InstanceId", "Name", "CostCenter", "InstanceType", "Instance_State",
+        "LaunchTime", "PrivateIpAddress", "State_Transition", "Report_RunTime", "Time_Since_Last_Started", "Error"
+    ]
+    aging_header = stopped_header + ["Stopped_Days", "Age_Bucket"]
+    costcode_header = ["Region", "InstanceId", "Invalid_Costcode", "Valid_Costcode"]
+
+    regions = get_all_regions(aws_profile)
+
+    reports = [
+        instance_inventory_report(),
+        available_volumes_report(),
+        snapshot_index_report(),
+        invalid_costcodes_report(),
+        stopped_instances_report(args.stopped_days),
+        stopped_instance_aging_report(sorted(set(args.age_thresholds)))
+    ]
+
+    results = run_sweep(reports, aws_profile, regions)
+
+    # Instances
+    output_file = generate_output_filename(base_instances_file)
+    write_tagged_rows_to_csv(output_file, list(InstanceRow.header), results["instances"])
+    print(f"CSV file '{output_file}' created successfully.")
+
+    # Available volumes, with the snapshot and cost columns
+    volume_columns = get_available_volume_columns(aws_profile, dict(results["snapshot_indexes"]), VOLUME_COST_PER_GB_PER_MONTH)
+    volume_columns.enrich_rows([row for row, tags_dict in results["available_volumes"]])
+
+    output_file = generate_output_filename(base_volumes_file)
+    write_tagged_rows_to_csv(output_file, volume_columns.header, results["available_volumes"])
+    print(f"CSV file '{output_file}' created successfully.")
+
+    # Stopped instances
+    output_file = generate_output_filename(base_stopped_file)
+    write_to_csv(output_file, stopped_header, results["stopped_instances"])
+    print(f"CSV file '{output_file}' created successfully.")
+
+    # Stopped instance aging, all thresholds from the same pages
+    output_file = generate_output_filename(base_aging_file)
+    write_to_csv(output_file, aging_header, results["stopped_instance_aging"])
+    print(f"CSV file '{output_file}' created successfully.")
+
+    # Invalid costcodes
+    tag_requests = []
+    costcode_rows = []
+    for instance in results["invalid_costcodes"]:
+        valid_costcode = determine_costcode_values(instance["invalid_costcode"])
+        costcode_rows.append([instance["region"], instance["instanceId"], instance["invalid_costcode"], valid_costcode or ""])
+        if valid_costcode:
+            tag_requests.append({"region": instance["region"], "resource_id": instance["instanceId"], "value": valid_costcode})
+
+    output_file = generate_output_filename(base_costcodes_file)
+    write_to_csv(output_file, costcode_header, costcode_rows)
+    print(f"CSV file '{output_file}' created successfully.")
+
+    if args.retag:
+        tag_results = apply_tags_in_batches(aws_profile, tag_requests, "costcode")
+        for result in tag_results:
+            if result["status"] != "success":
+                print(f"Error not able to update. InstanceId {result['resource_id']} in region {result['region']}: {result['error']}")
+        print(f"{sum(result['status'] == 'success' for result in tag_results)} costcodes retagged.")
+
+    report_metrics(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,189 +22,86 @@ The generated report can be used for tracking resource usage, auditing, or manag
 
 .CHANGE_LOG
 - [2024-11-19] Initial version created.
+- [2026-10-18] Clients come from the shared client pool in methods.aws_methods.
+- [2026-10-18] Instance collection and EBS sizing use methods.ec2_methods (one describe_volumes pass per region).
+- [2026-10-18] Rows and tag keys are collected in a single describe_instances pass.
+- [2026-10-18] Rows are streamed to the CSV file page by page instead of being held in memory.
+- [2026-10-18] --max-age/--refresh serve reruns from the local inventory cache.
+- [2026-10-18] --tag/--state/--instance-type/--vpc-id/--launched-after/--launched-before narrow the report, server side where EC2 supports it.
+- [2026-10-18] --delta only writes the instances added, changed or removed since the previous --delta run.
+- [2026-10-18] --accounts collects several profiles or role ARNs in parallel processes into one report with an Account column.
+- [2026-10-18] --profile/--output replace the hardcoded settings; also available as "python -m methods instances".
 
 """
 
-import boto3
-import boto3.session
-from datetime import datetime
-import csv
-
-def get_credentials(aws_profile, region = "us-east-1", service = "ec2"):
-    """
-    Get the AWS credentials for local runs
-    
-    :param profile_name: The AWS CLI profile name to use.
-    :param region: region to use.
-    :param service: client service to connect to.
-    :return: List of region names (e.g., ['us-east-1', 'us-west-2']).
-    """
-    aws_con = boto3.session.Session(profile_name = aws_profile, region_name = region)
-    ec2_client = aws_con.client(service)
-
-    return ec2_client
-
-def get_all_regions(ec2_client):
-    """
-    Get the list of all available AWS regions.
-    
-    :param profile_name: The AWS CLI profile name to use.
-    :return: List of region names (e.g., ['us-east-1', 'us-west-2']).
-    """
-    region_response = ec2_client.describe_regions()
-    regions = [region["RegionName"] for region in region_response["Regions"]]
-
-    return regions
-
-def get_instance_details(aws_profile, regions, tag_keys):
-    """
-    Retrieve details of all EC2 instances including tags, across multiple regions.
-    
-    :param aws_con: The boto3 session object.
-    :param regions: List of region names to query.
-    :param tag_keys: List of tag keys to extract from instances.
-    :return: List of rows with instance details and corresponding tag values.
-    """    
-    instance_details = []
-
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_instances")
-
-        for page in paginator.paginate():
-            for reservation in page['Reservations']:
-                for instance in reservation['Instances']:
-
-                   # Start with the basic instance details
-                    row = [
-                        region,
-                        instance["InstanceId"],
-                        instance["InstanceType"],
-                        instance["State"]["Name"],
-                        instance["LaunchTime"].strftime('%Y-%m-%d %H:%M:%S'),  # Formatting LaunchTime
-                        instance.get("ImageId", ""),
-                        instance.get("VpcId", ""),
-                        instance.get("SubnetId", ""),
-                        instance.get("PrivateIpAddress", ""),
-                        instance.get("PublicIpAddress", "")
-                    ]
-
-                    # Step to calculate the total size of all EBS volumes attached to this instance
-                    total_ebs_size = calculate_total_ebs_size(ec2_client, instance["InstanceId"])
-                    row.append(total_ebs_size)
-
-                    # Create a dictionary of tags for easy lookup
-                    tags_dict = {tag['Key']: tag['Value'] for tag in instance.get("Tags", [])}
-
-                    # Add tag values to the row; if tag doesn't exist, leave it empty
-                    row.extend(tags_dict.get(key, '') for key in tag_keys)                    
-
-                    instance_details.append(row)
-
-    return instance_details
-
-def generate_output_filename(base_filename):
-    """
-    Generate a file name with the current date appended.
-    
-    :param base_filename: The base file name (without date).
-    :return: The full file name with the current date appended (e.g., "instance_tags_with_details_2024-11-19.csv").
-    """
-    current_date = datetime.now().strftime('%Y-%m-%d')
-    return f"{base_filename}_{current_date}.csv"  
-
-def write_to_csv(file_path, header, rows):
-    """
-    Write the instance details and tags to a CSV file.
-    
-    :param file_path: Path where the CSV file will be saved.
-    :param header: The header row to write in the CSV file.
-    :param rows: The rows of data to write in the CSV file.
-    """
-    with open(file_path, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(header)  # Write the header row
-        writer.writerows(rows)  # Write the data rows
-
-def get_instance_tags(aws_profile, regions):
-    """
-    Collect all unique tag keys across all EC2 instances in the provided regions.
-    
-    :param aws_con: The boto3 session object.
-    :param regions: List of region names to query.
-    :return: Sorted list of unique tag keys.
-    """
-    # Prepare to collect all unique tag keys across all instances
-    tag_keys = set()
-
-    # First pass to collect unique tag keys
-    for region in regions:
-        ec2_client = get_credentials(aws_profile, region)
-        paginator = ec2_client.get_paginator("describe_instances")
-
-        for page in paginator.paginate():
-            for each_item in page["Reservations"]:
-                for instance in each_item["Instances"]:
-                    for each_tag in instance.get("Tags", []):
-                        tag_keys.add(each_tag['Key'])
-    tag_keys = sorted(tag_keys)
-    return tag_keys        
-
-
-def calculate_total_ebs_size(ec2_client, instance_id):
-    """
-    Calculate the total sum of all EBS volumes attached to an EC2 instance.
-    
-    :param instance_id: The ID of the EC2 instance.
-    :param region: The AWS region where the instance is located.
-    :return: The total size of all attached EBS volumes in GiB.
-    """
-
-    # Get the list of volumes attached to the EC2 instance
-    response = ec2_client.describe_instances(InstanceIds=[instance_id])
-
-    # Initialize total size variable
-    total_size = 0
-
-    # Iterate over each instance to get the attached volumes
-    for reservation in response['Reservations']:
-        for instance in reservation['Instances']:
-            # Check for the 'BlockDeviceMappings' field (attached volumes)
-            if 'BlockDeviceMappings' in instance:
-                for block_device in instance['BlockDeviceMappings']:
-                    # Get the volume ID from the block device mapping
-                    volume_id = block_device['Ebs']['VolumeId']
-                    
-                    # Get the volume's size
-                    volume_response = ec2_client.describe_volumes(VolumeIds=[volume_id])
-                    for volume in volume_response['Volumes']:
-                        total_size += volume['Size']  # Add the size of this volume
-
-    return total_size
-
-def main():
-    #set aws profile
-    aws_profile = ""
-    base_output_filename = ""
-
-    ec2_client = get_credentials(aws_profile)
-    regions  = get_all_regions(ec2_client)
-
-    tag_keys = get_instance_tags(aws_profile, regions)
+import argparse
+from methods.aws_methods import configure_role_source
+from methods.ec2_methods import get_all_regions, iter_instance_inventory, get_instance_inventory
+from methods.file_methods import stream_tagged_rows_to_csv, generate_output_filename
+from methods.cache_methods import add_cache_arguments, apply_cache_arguments
+from methods.metrics_methods import add_metrics_arguments, report_metrics
+from methods.delta_methods import add_delta_arguments, diff_tagged_rows, get_delta_report_name, DELTA_COLUMNS
+from methods.row_methods import InstanceRow
+from methods.account_methods import add_account_arguments, run_accounts
+from methods.filter_methods import add_filter_arguments, filter_spec_from_arguments
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "List EC2 instances with tags and total EBS size across all regions.")
+    parser.add_argument("--profile", default = "", help = "AWS CLI profile name to use.")
+    parser.add_argument("--output", default = "", help = "Base name of the CSV file; the date is appended.")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    add_filter_arguments(parser)
+    add_delta_arguments(parser)
+    add_account_arguments(parser)
+    args = parser.parse_args(argv)
+    apply_cache_arguments(args)
+    filter_spec = filter_spec_from_arguments(args)
 
-    header = [
-        "Region", "InstanceId", "InstanceType", "Instance_State", "LaunchTime", "ImageId", "VpcId",
-        "SubnetId", "PrivateIpAddress", "PublicIpAddress", "Total_EBS_Size_GiB"
-    ] + tag_keys
-    
-    instance_rows = get_instance_details(aws_profile, regions, tag_keys)
+    #set aws profile
+    aws_profile = args.profile
+    base_output_filename = args.output
+
+    header = list(InstanceRow.header)
+    failures = {}
+
+    if args.accounts:
+        # One worker process per account, each on its own credentials and API quotas; regions are looked up per account
+        configure_role_source(args.role_source_profile)
+        instance_rows = run_accounts(get_instance_inventory, args.accounts, filter_spec, max_processes = args.max_processes, failures = failures)
+        header = ["Account"] + header
+        # Rows of a failed account or of a region that failed in an account are not reported as removed in delta mode
+        delta_report, id_column, failure_column = get_delta_report_name("instances", ",".join(sorted(args.accounts)), filter_spec), 2, (0, 1)
+    else:
+        regions = get_all_regions(aws_profile)
+
+        # Single describe_instances pass; rows are streamed to disk and tag columns are added at the end
+        instance_rows = iter_instance_inventory(aws_profile, regions, filter_spec, failures = failures)
+        delta_report, id_column, failure_column = get_delta_report_name("instances", aws_profile, filter_spec, regions), 1, 0
+
+    # Rows a region streamed before it failed are left out of the report, see methods.aws_methods.iter_regions
+    output_failure_column = failure_column
+
+    if args.delta:
+        # Only resources that changed since the previous run are written
+        instance_rows = diff_tagged_rows(delta_report, header, instance_rows, id_column = id_column, region_column = failure_column,
+                                         state_path = args.delta_state, failures = failures)
+        header = DELTA_COLUMNS + header
+        base_output_filename = f"{base_output_filename}_delta"
+        # The delta columns come first in the written rows
+        if isinstance(failure_column, tuple):
+            output_failure_column = tuple(column + len(DELTA_COLUMNS) for column in failure_column)
+        else:
+            output_failure_column = failure_column + len(DELTA_COLUMNS)
 
     output_file = generate_output_filename(base_output_filename)
 
-    write_to_csv(output_file, header, instance_rows)
+    stream_tagged_rows_to_csv(output_file, header, instance_rows, failures = failures, region_column = output_failure_column)
 
     print(f"CSV file '{output_file}' created successfully.")
 
+    report_metrics(args)
+
 
 if __name__ == "__main__":
     main()
@@ -1,67 +1,62 @@
-from methods.aws_methods import get_credentials
+import argparse
 from methods.ec2_methods import get_all_regions
 from methods.s3_methods import get_s3_buckets
-from methods.file_methods import write_to_csv, generate_output_filename
-from methods.networking_methods import get_vpcs, get_security_groups, get_load_balancers, get_route_tables
-from methods.serverless_methods import get_lambda
+from methods.file_methods import generate_output_filename
+from methods.networking_methods import get_vpcs_in_region, get_security_groups_in_region, get_load_balancers_in_region, get_route_tables_in_region
+from methods.serverless_methods import get_lambda_functions_in_region
+from methods.cache_methods import add_cache_arguments, apply_cache_arguments
+from methods.metrics_methods import add_metrics_arguments, report_metrics
+from methods.async_methods import run_reports, MAX_CONCURRENT_UNITS
+from methods.row_methods import VpcRow, SecurityGroupRow, LoadBalancerRow, RouteTableRow, LambdaFunctionRow
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "List S3, VPC, security group, load balancer, route table and Lambda resources.")
+    parser.add_argument("--profile", default = "hbm", help = "AWS CLI profile name to use.")
+    parser.add_argument("--output", default = "D:\\HBM\\Documents\\Personal\\CertsLearning\\boto3-AWS-oreilly\\pythonProject\\Output\\list_all_",
+                        help = "Prefix of the CSV files, e.g. a directory followed by a file prefix; the resource type and date are appended.")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    parser.add_argument("--max-concurrency", type = int, default = MAX_CONCURRENT_UNITS,
+                        help = "Maximum number of (service, region) units collected at the same time.")
+    args = parser.parse_args(argv)
+    apply_cache_arguments(args)
 
-def main():
     #set aws profile
-    aws_profile = "hbm"
-    base_s3_file = "D:\\HBM\\Documents\\Personal\\CertsLearning\\boto3-AWS-oreilly\\pythonProject\\Output\\list_all_s3buckets"
-    base_vpc_file = "D:\\HBM\\Documents\\Personal\\CertsLearning\\boto3-AWS-oreilly\\pythonProject\\Output\\list_all_vpcs"
-    base_sg_file = "D:\\HBM\\Documents\\Personal\\CertsLearning\\boto3-AWS-oreilly\\pythonProject\\Output\\list_all_sgs"
-    base_elb_file = "D:\\HBM\\Documents\\Personal\\CertsLearning\\boto3-AWS-oreilly\\pythonProject\\Output\\list_all_elbs"
-    base_rt_tables_file = "D:\\HBM\\Documents\\Personal\\CertsLearning\\boto3-AWS-oreilly\\pythonProject\\Output\\list_all_route_tables"
+    aws_profile = args.profile
+    base_s3_file = f"{args.output}s3buckets"
+    base_vpc_file = f"{args.output}vpcs"
+    base_sg_file = f"{args.output}sgs"
+    base_elb_file = f"{args.output}elbs"
+    base_rt_tables_file = f"{args.output}route_tables"
+    base_lambda_file = f"{args.output}lambdas"
 
     #headers
     s3_headers = ["Region", "BucketName", "CreationDate", "Tags"]
-    vpc_headers = ["Region", "VPCId", "CidrBlock", "IsDefault", "Tags"]
-    sg_headers = ["Region", "GroupId", "GroupName", "Description", "Tags"]
-    lb_headers = ["Region", "LoadBalancerName", "DNSName", "CreatedTime", "Type", "State", "Tags"]  
-    rt_headers = ["Region", "VpcId", "RouteTableId", "destination", "target", "State", "RTable_Owner", "Main", "Linked_Subnets"]   
+    vpc_headers = VpcRow.header
+    sg_headers = SecurityGroupRow.header
+    lb_headers = LoadBalancerRow.header
+    rt_headers = RouteTableRow.header
+    lambda_headers = LambdaFunctionRow.header
 
     regions  = get_all_regions(aws_profile)
 
-    # # for region in regions:
-        
-    # # Get S3 Buckets
-    # s3_buckets = get_s3_buckets(aws_profile)
+    # Every (resource type, region) pair is one unit; all units run together and
+    # each report is written as soon as its last unit finishes
+    reports = [
+        {"name": "s3", "account_worker": get_s3_buckets, "header": s3_headers, "output_file": generate_output_filename(base_s3_file)},
+        {"name": "vpcs", "region_worker": get_vpcs_in_region, "header": vpc_headers, "output_file": generate_output_filename(base_vpc_file)},
+        {"name": "security_groups", "region_worker": get_security_groups_in_region, "header": sg_headers, "output_file": generate_output_filename(base_sg_file)},
+        {"name": "load_balancers", "region_worker": get_load_balancers_in_region, "header": lb_headers, "output_file": generate_output_filename(base_elb_file)},
+        {"name": "route_tables", "region_worker": get_route_tables_in_region, "header": rt_headers, "output_file": generate_output_filename(base_rt_tables_file)},
+        {"name": "lambda", "region_worker": get_lambda_functions_in_region, "header": lambda_headers, "output_file": generate_output_filename(base_lambda_file)}
+    ]
 
-    # # Get VPCs
-    # vpc_rows = get_vpcs(aws_profile, regions)
+    row_counts = run_reports(reports, aws_profile, regions, args.max_concurrency)
 
-    # # Get Security Groups
-    # sg_rows = get_security_groups(aws_profile, regions)
+    for report_name, row_count in row_counts.items():
+        print(f"{report_name}: {row_count} rows")
 
-    # # Get Load Balancers
-    # elb_rows = get_load_balancers(aws_profile, regions)
-
-    # Get Load Balancers
-    rt_tables_rows = get_route_tables(aws_profile, regions)    
-
-    #Get Lambda
-    # lambda_rows = get_lambda(aws_profile, regions)
-           
-    # if s3_buckets:
-    #     output_file = generate_output_filename(base_s3_file)    
-    #     write_to_csv(output_file, s3_headers, s3_buckets)
-
-    # if vpc_rows:
-    #     output_file = generate_output_filename(base_vpc_file)
-    #     write_to_csv(output_file, vpc_headers, vpc_rows)
-
-    # if sg_rows:
-    #     output_file = generate_output_filename(base_sg_file)
-    #     write_to_csv(output_file, sg_headers, sg_rows)
-
-    # if elb_rows:
-    #     output_file = generate_output_filename(base_elb_file)
-    #     write_to_csv(output_file, lb_headers, elb_rows)                 
-
-    if rt_tables_rows:
-        output_file = generate_output_filename(base_rt_tables_file)
-        write_to_csv(output_file, rt_headers, rt_tables_rows)   
+    report_metrics(args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,53 +1,78 @@
-from methods.ec2_methods import get_all_regions, get_ebs_snapshots, calculate_storage_costs, estimate_snapshot_cost, get_ebs_tags, get_ebs_details
-from methods.file_methods import write_to_csv, generate_output_filename
+import argparse
+from methods.ec2_methods import get_all_regions, build_snapshot_indexes, get_ebs_inventory, get_available_volume_columns
+from methods.file_methods import write_to_csv, write_tagged_rows_to_csv, generate_output_filename
+from methods.cache_methods import add_cache_arguments, apply_cache_arguments
+from methods.metrics_methods import add_metrics_arguments, report_metrics
+from methods.pricing_methods import add_price_catalog_arguments, apply_price_catalog_arguments
+from methods.delta_methods import add_delta_arguments, diff_tagged_rows, get_delta_report_name, DELTA_COLUMNS
+from methods.cost_methods import get_cost_rollup_rows
 
 
-def main():
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "List available (unattached) EBS volumes with snapshot and cost estimates.")
+    parser.add_argument("--profile", default = "", help = "AWS CLI profile name to use.")
+    parser.add_argument("--output", default = "", help = "Base name of the CSV file; the date is appended.")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    add_price_catalog_arguments(parser)
+    add_delta_arguments(parser)
+    parser.add_argument("--measure-snapshots", action = "store_true",
+                        help = "Measure the bytes stored by each volume's snapshots with the EBS direct APIs (cached per snapshot).")
+    parser.add_argument("--cost-rollup", default = None, metavar = "region|tag:KEY",
+                        help = "Also write the estimated costs totalled per region or per value of a tag.")
+    args = parser.parse_args(argv)
+    apply_cache_arguments(args)
+    apply_price_catalog_arguments(args)
+
     
-    aws_profile = ""
-    base_output_filename = ""
+    aws_profile = args.profile
+    base_output_filename = args.output
     
-    #minimum costs, might vary slightly per region
+    #price of volume types missing from the price catalog and methods.cost_methods
     VOLUME_COST_PER_GB_PER_MONTH = 0.08  
      
     vol_filter = {'Name': 'status','Values': ['available']}
 
     regions = get_all_regions(aws_profile)
 
-    tag_keys = get_ebs_tags(aws_profile, regions, vol_filter)
+    # Single describe_volumes pass; tag columns are added when the file is written
+    failures = {}
+    volume_rows = get_ebs_inventory(aws_profile, regions, vol_filter, failures = failures)
+
+    # One describe_snapshots pass per region that has available volumes
+    snapshot_indexes = build_snapshot_indexes(aws_profile, sorted({row.region for row, tags_dict in volume_rows}))
 
-    header = ["Region", "Volume_ID", "Volume_Type", "Size", "Encrypted", "State", "Snapshot_Id", "CreateTime", "Snapshots", "Total_EBS_Size_GB", "Estimate_Snapshot_Cost", "Estimate_Volume_Cost"] + tag_keys
+    # Snapshot and cost columns follow the volume columns, the tag columns follow at write time
+    volume_columns = get_available_volume_columns(aws_profile, snapshot_indexes, VOLUME_COST_PER_GB_PER_MONTH, measure_snapshots = args.measure_snapshots)
 
-    volume_rows = get_ebs_details(aws_profile, regions, tag_keys)
+    header = volume_columns.header
 
-    for row in volume_rows:
-        region_id = row[0]
-        volume_id = row[1]
-        volume_size = row[3]
+    # Cost columns are estimated for all volumes in one pass
+    volume_columns.enrich_rows([row for row, tags_dict in volume_rows])
 
-        # Fetch snapshots
-        snapshots = get_ebs_snapshots(volume_id, aws_profile, region_id)
-        
-        snapshot_cost = ""
-        if snapshots:
-            snapshot_cost = estimate_snapshot_cost(volume_size)
+    if args.cost_rollup:
+        rollup_header, rollup_rows = get_cost_rollup_rows(volume_rows, header, args.cost_rollup, ["Estimate_Volume_Cost", "Estimate_Snapshot_Cost"])
+        rollup_file = generate_output_filename(f"{base_output_filename}_cost_by_{args.cost_rollup.replace(':', '_')}")
+        write_to_csv(rollup_file, rollup_header, rollup_rows)
+        print(f"CSV file '{rollup_file}' created successfully.")
 
-        volume_cost = calculate_storage_costs(volume_size, VOLUME_COST_PER_GB_PER_MONTH)
-        
-        # Append snapshot and volume data to the row
-        row.insert(8, snapshots)  
-        row.insert(9, volume_size)
-        row.insert(10, snapshot_cost)  
-        row.insert(11, volume_cost)  
+    if args.delta:
+        # Only volumes that changed since the previous run are written
+        delta_report = get_delta_report_name("available_volumes", aws_profile, regions = regions)
+        volume_rows = list(diff_tagged_rows(delta_report, header, volume_rows, state_path = args.delta_state, failures = failures))
+        header = DELTA_COLUMNS + header
+        base_output_filename = f"{base_output_filename}_delta"
 
     # Generate the output filename for the CSV
     output_file = generate_output_filename(base_output_filename)
 
     # Write the header and instance rows to the CSV file
-    write_to_csv(output_file, header, volume_rows)
+    write_tagged_rows_to_csv(output_file, header, volume_rows)
 
     print(f"CSV file '{output_file}' created successfully.")
 
+    report_metrics(args)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file